@@ -0,0 +1,91 @@
+"""
+Measures collection artifact download proxy throughput.
+
+A large artifact is served from memory by a local HTTP server standing in
+for Pulp content app and downloaded through the download view with
+different chunk sizes.
+
+Usage:
+
+    GALAXY_SECRET_KEY=x python benchmarks/artifact_download.py
+"""
+import http.server
+import os
+import socketserver
+import threading
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'galaxy_api.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from galaxy_api.api.v3 import viewsets  # noqa: E402
+from galaxy_api.auth.models import User  # noqa: E402
+
+ARTIFACT_SIZE = 256 * 1024 ** 2
+CHUNK_SIZES = (4 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2)
+REPEAT = 3
+
+AUTH = {'rh_identity': {'entitlements': {'insights': {'is_entitled': True}}}}
+ARTIFACT = os.urandom(1024 ** 2) * (ARTIFACT_SIZE // 1024 ** 2)
+
+
+class _ContentHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/gzip')
+        self.send_header('Content-Length', str(len(ARTIFACT)))
+        self.end_headers()
+        self.wfile.write(ARTIFACT)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ContentServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+def _download(view, factory, user):
+    request = factory.get(
+        f'/{settings.API_PATH_PREFIX}/v3/artifacts/collections/ansible-nginx-1.2.3.tar.gz')
+    force_authenticate(request, user=user, token=AUTH)
+    response = view(request, filename='ansible-nginx-1.2.3.tar.gz')
+    assert response.status_code == 200, response.status_code
+    size = sum(len(chunk) for chunk in response.streaming_content)
+    response.close()
+    assert size == ARTIFACT_SIZE, size
+
+
+def main():
+    server = _ContentServer(('127.0.0.1', 0), _ContentHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    factory = APIRequestFactory()
+    view = viewsets.CollectionArtifactDownloadView.as_view()
+    user = User(username='benchmark')
+
+    print(f'{"chunk size (KiB)":>17} {"throughput (MiB/s)":>19}')
+    with override_settings(PULP_CONTENT_HOST='127.0.0.1', PULP_CONTENT_PORT=server.server_port):
+        for chunk_size in CHUNK_SIZES:
+            with override_settings(PULP_CONTENT_CHUNK_SIZE=chunk_size):
+                _download(view, factory, user)
+                start = time.perf_counter()
+                for _ in range(REPEAT):
+                    _download(view, factory, user)
+                elapsed = (time.perf_counter() - start) / REPEAT
+            throughput = ARTIFACT_SIZE / 1024 ** 2 / elapsed
+            print(f'{chunk_size // 1024:>17} {throughput:>19.1f}')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures collection artifact pre-flight inspection time and peak memory.
+
+Artifacts are generated in a temporary directory: one with large
+incompressible files and one with many small files.
+
+Usage:
+
+    python benchmarks/artifact_inspection.py
+"""
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+import tracemalloc
+
+from galaxy_api.api.utils import inspect_collection_artifact
+
+FILENAME = 'ansible-nginx-1.2.3.tar.gz'
+LIMITS = {'max_files': 100000, 'max_unpacked_size': 4 * 1024 ** 3}
+REPEAT = 3
+
+ARTIFACTS = {
+    'large files (4 x 32 MiB)': [(f'files/data{i}.bin', 32 * 1024 ** 2) for i in range(4)],
+    'small files (20000 x 2 KiB)': [(f'plugins/module{i}.py', 2048) for i in range(20000)],
+}
+
+
+def _build_artifact(path, files):
+    manifest = {'collection_info': {'namespace': 'ansible', 'name': 'nginx', 'version': '1.2.3'}}
+    manifest = json.dumps(manifest).encode()
+    with tarfile.open(path, mode='w:gz', compresslevel=1) as tar:
+        info = tarfile.TarInfo('MANIFEST.json')
+        info.size = len(manifest)
+        tar.addfile(info, io.BytesIO(manifest))
+        for name, size in files:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            tar.addfile(info, io.BytesIO(os.urandom(size)))
+
+
+def _run(path):
+    best = None
+    for _ in range(REPEAT):
+        with open(path, 'rb') as fp:
+            start = time.perf_counter()
+            inspect_collection_artifact(fp, FILENAME, **LIMITS)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    with open(path, 'rb') as fp:
+        inspect_collection_artifact(fp, FILENAME, **LIMITS)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, files in ARTIFACTS.items():
+            path = os.path.join(tmpdir, FILENAME)
+            _build_artifact(path, files)
+            size = os.path.getsize(path)
+
+            elapsed, peak = _run(path)
+            print(f'{label}: {size / 1024 ** 2:.1f} MiB, {elapsed * 1000:.0f} ms, '
+                  f'{size / 1024 ** 2 / elapsed:.0f} MiB/s, peak memory {peak / 1024:.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Measures database queries and time per request of X-RH-Identity authentication.
+
+The previous implementation, which ran get_or_create of the account group
+and update_or_create of the user on every request, is compared with the
+current one with identity cache disabled and enabled. A test database is
+created for the run.
+
+Usage:
+
+    GALAXY_SECRET_KEY=x python benchmarks/rh_identity_auth.py
+"""
+import base64
+import json
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'galaxy_api.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment,
+)
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from galaxy_api.auth import auth  # noqa: E402
+from galaxy_api.auth.models import Group, User  # noqa: E402
+
+NUMBER = 1000
+
+HEADER = base64.b64encode(json.dumps({
+    'entitlements': {'insights': {'is_entitled': True}},
+    'identity': {
+        'account_number': '12345',
+        'user': {
+            'username': 'benchmark',
+            'email': 'benchmark@example.invalid',
+            'first_name': 'Bench',
+            'last_name': 'Mark',
+        },
+    },
+}).encode()).decode()
+
+
+class PreviousRHIdentityAuthentication(auth.RHIdentityAuthentication):
+    def authenticate(self, request):
+        header = self._decode_header(request.META[self.header])
+        identity = header['identity']
+        user = identity['user']
+        group, _ = Group.objects.get_or_create_identity(
+            auth.RH_ACCOUNT_SCOPE, identity['account_number'])
+        with transaction.atomic():
+            user, created = User.objects.update_or_create(
+                username=user['username'],
+                defaults={name: user.get(name, '')
+                          for name in ('email', 'first_name', 'last_name')},
+            )
+            if created:
+                user.groups.add(group)
+        return user, {'rh_identity': header}
+
+
+def _run(authentication):
+    request = APIRequestFactory().get('/', HTTP_X_RH_IDENTITY=HEADER)
+    auth.identity_cache.clear()
+    authentication.authenticate(request)
+
+    with CaptureQueriesContext(connection) as queries:
+        authentication.authenticate(request)
+    start = time.perf_counter()
+    for _ in range(NUMBER):
+        authentication.authenticate(request)
+    elapsed = (time.perf_counter() - start) / NUMBER
+    return len(queries.captured_queries), elapsed
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f'{"implementation":>16} {"queries/request":>16} {"time (us)":>10}')
+        runs = (
+            ('previous', PreviousRHIdentityAuthentication(), {}),
+            ('cache disabled', auth.RHIdentityAuthentication(), {'RH_IDENTITY_CACHE_SIZE': 0}),
+            ('cache enabled', auth.RHIdentityAuthentication(), {}),
+        )
+        for label, authentication, overrides in runs:
+            with override_settings(**overrides):
+                queries, elapsed = _run(authentication)
+            print(f'{label:>16} {queries:>16} {elapsed * 1e6:>10.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Compares v3 collection list response times with and without Pulp JSON passthrough.
+
+Pulp API responses are served from memory, so the benchmark measures only
+the work done by galaxy-api (deserialization, serialization, rendering).
+
+Usage:
+
+    GALAXY_SECRET_KEY=x python benchmarks/v3_passthrough.py
+"""
+import io
+import json
+import os
+import timeit
+from unittest import mock
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'galaxy_api.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from urllib3 import HTTPResponse  # noqa: E402
+
+from galaxy_api.api.v3 import viewsets  # noqa: E402
+from galaxy_api.auth.models import User  # noqa: E402
+from galaxy_api.common import pulp  # noqa: E402
+
+PAGE_SIZES = (10, 100)
+NUMBER = 200
+
+AUTH = {'rh_identity': {'entitlements': {'insights': {'is_entitled': True}}}}
+
+
+def _make_page(limit):
+    prefix = settings.API_PATH_PREFIX
+    results = []
+    for i in range(limit):
+        href = f'/{prefix}/v3/collections/namespace_{i}/collection_{i}/'
+        results.append({
+            'href': href,
+            'namespace': f'namespace_{i}',
+            'name': f'collection_{i}',
+            'deprecated': False,
+            'versions_url': f'{href}versions/',
+            'highest_version': {'href': f'{href}versions/1.0.{i}/', 'version': f'1.0.{i}'},
+            'created_at': '2019-11-05T10:14:45.117536Z',
+            'updated_at': '2019-11-05T10:14:45.117546Z',
+        })
+    page = {'count': 1000, 'next': None, 'previous': None, 'results': results}
+    return json.dumps(page).encode('utf-8')
+
+
+def _run(limit):
+    payload = _make_page(limit)
+
+    def pulp_request(*args, **kwargs):
+        return HTTPResponse(
+            body=io.BytesIO(payload),
+            status=200,
+            headers={'Content-Type': 'application/json'},
+            preload_content=False,
+        )
+
+    factory = APIRequestFactory()
+    view = viewsets.CollectionViewSet.as_view({'get': 'list'})
+    user = User(username='benchmark')
+
+    def call():
+        request = factory.get(f'/{settings.API_PATH_PREFIX}/v3/collections/',
+                              {'limit': limit})
+        force_authenticate(request, user=user, token=AUTH)
+        response = view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        assert response.status_code == 200, response.status_code
+        return response
+
+    pool_manager = pulp.get_client().rest_client.pool_manager
+    with mock.patch.object(pool_manager, 'request', side_effect=pulp_request):
+        timings = {}
+        for passthrough in (False, True):
+            with override_settings(PULP_API_PASSTHROUGH=passthrough, PULP_CACHE_TIMEOUTS={}):
+                call()
+                timings[passthrough] = timeit.timeit(call, number=NUMBER) / NUMBER
+    return timings
+
+
+def main():
+    print(f'{"page size":>10} {"models (ms)":>12} {"passthrough (ms)":>17} {"speedup":>8}')
+    for limit in PAGE_SIZES:
+        timings = _run(limit)
+        models, passthrough = timings[False] * 1000, timings[True] * 1000
+        print(f'{limit:>10} {models:>12.3f} {passthrough:>17.3f} {models / passthrough:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -15,9 +15,29 @@ class NamespaceLinkAdmin(admin.ModelAdmin):
 
 @admin.register(api_models.CollectionImport)
 class CollectionImportAdmin(admin.ModelAdmin):
-    list_display = ('task_id', 'created_at', 'namespace', 'name', 'version')
-    fields = ('task_id', 'created_at', 'namespace', 'name', 'version')
-    readonly_fields = ('name', 'version')
+    list_display = ('task_id', 'created_at', 'namespace', 'name', 'version', 'state')
+    list_filter = ('state',)
+    fields = ('task_id', 'pulp_task_id', 'created_at', 'namespace', 'name', 'version', 'state',
+              'started_at', 'finished_at', 'error')
+    readonly_fields = ('pulp_task_id', 'name', 'version', 'state', 'started_at', 'finished_at',
+                       'error')
     date_hierarchy = 'created_at'
     search_fields = ['namespace__name', 'namespace__company', 'name']
     view_on_site = True
+
+
+@admin.register(api_models.UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', 'updated_at', 'namespace', 'filename', 'state')
+    list_filter = ('state',)
+    readonly_fields = ('filename', 'size', 'sha256', 'state', 'ranges', 'attempts', 'retry_at',
+                       'task')
+    date_hierarchy = 'created_at'
+    search_fields = ['namespace__name', 'filename']
+
+
+@admin.register(api_models.CollectionArtifact)
+class CollectionArtifactAdmin(admin.ModelAdmin):
+    list_display = ('namespace', 'name', 'version', 'sha256', 'created_at')
+    readonly_fields = ('namespace', 'name', 'version', 'sha256', 'task')
+    search_fields = ['namespace__name', 'name', 'sha256']
@@ -0,0 +1,81 @@
+"""Admission control of collection artifact uploads."""
+
+import contextlib
+import datetime
+import random
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from galaxy_api.api import models
+from galaxy_api.common import metrics
+
+
+@contextlib.contextmanager
+def upload_slot(namespace=None):
+    """
+    Hold an upload slot for the duration of the block.
+
+    Without ``namespace`` a slot is taken from the global limit of in-flight
+    uploads, otherwise from the limit of ``namespace``. Slots are kept in the
+    database, so that the limits apply across worker processes.
+
+    Raises ``Throttled`` when all slots are taken.
+    """
+    if namespace is None:
+        token = _acquire('global', settings.UPLOAD_MAX_IN_FLIGHT)
+    else:
+        token = _acquire(f'namespace:{namespace.pk}', settings.UPLOAD_MAX_IN_FLIGHT_PER_NAMESPACE,
+                         namespace=namespace)
+    gauge = metrics.collection_uploads_in_flight.labels(
+        scope='global' if namespace is None else 'namespace')
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+        if token is not None:
+            # Slot taken over after expiry belongs to another upload
+            models.UploadSlot.objects.filter(token=token).delete()
+
+
+def _acquire(scope, limit, namespace=None):
+    if not limit:
+        return None
+
+    now = timezone.now()
+    expires_at = now + datetime.timedelta(seconds=settings.UPLOAD_ADMISSION_SLOT_TIMEOUT)
+    taken = set(
+        models.UploadSlot.objects
+        .filter(scope=scope, expires_at__gt=now)
+        .values_list('index', flat=True)
+    )
+    # Try free slots in random order so that concurrent requests do not compete for the same ones
+    free = [index for index in range(limit) if index not in taken]
+    random.shuffle(free)
+    for index in free:
+        token = uuid.uuid4()
+        # Take over slot of a crashed holder
+        if models.UploadSlot.objects.filter(
+                scope=scope, index=index, expires_at__lte=now,
+        ).update(token=token, expires_at=expires_at):
+            return token
+        try:
+            with transaction.atomic():
+                models.UploadSlot.objects.create(
+                    scope=scope, index=index, token=token, expires_at=expires_at)
+        except IntegrityError:
+            # Taken by a concurrent request
+            continue
+        return token
+
+    metrics.collection_upload_rejections.labels(
+        scope='global' if namespace is None else 'namespace').inc()
+    if namespace is None:
+        detail = 'Too many collection uploads in progress.'
+    else:
+        detail = f'Too many collection uploads in progress for namespace "{namespace.name}".'
+    raise Throttled(wait=settings.UPLOAD_ADMISSION_RETRY_AFTER, detail=detail)
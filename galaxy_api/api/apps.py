@@ -4,3 +4,6 @@ from django import apps
 class AppConfig(apps.AppConfig):
     name = 'galaxy_api.api'
     label = 'galaxy_api'
+
+    def ready(self):
+        from galaxy_api.api import signals  # noqa: F401
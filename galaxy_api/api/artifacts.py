@@ -0,0 +1,413 @@
+"""Collection artifact publishing to Pulp."""
+
+import datetime
+import json
+import logging
+import mimetypes
+import uuid
+from concurrent import futures
+
+import galaxy_pulp
+from django.conf import settings
+from django.core.files.base import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from urllib3.exceptions import HTTPError
+
+from galaxy_api import constants
+from galaxy_api.api import models
+from galaxy_api.api.exceptions import Conflict
+from galaxy_api.api.utils import inspect_collection_artifact, parse_collection_filename
+from galaxy_api.common import metrics
+from galaxy_api.common import pulp
+
+log = logging.getLogger(__name__)
+
+
+def publish(namespace, data, user):
+    """
+    Upload a collection artifact to Pulp and track the created import task.
+
+    ``data`` holds the ``file``, its parsed ``filename``, ``mimetype`` and
+    ``sha256``, as validated by ``CollectionUploadSerializer``.
+
+    Returns a tuple of the created import, Pulp upload response data and
+    status code.
+    """
+    filename = data['filename']
+    task_detail, upload_response_data, status = _upload(namespace, data)
+
+    log.info('Publishing of artifact %s to namespace=%s by user=%s created pulp import task_id=%s', # noqa
+             data['file'].name, namespace, user, task_detail.id)
+
+    task = models.CollectionImport(
+        task_id=task_detail.id,
+        pulp_task_id=task_detail.id,
+        created_at=task_detail.created_at,
+        namespace=namespace,
+        name=filename.name,
+        version=filename.version,
+        sha256=data['sha256'] or '',
+    )
+    task.set_task_fields(task_detail)
+    task.save()
+    pulp.response_cache.invalidate(filename.namespace, filename.name)
+
+    return task, upload_response_data, status
+
+
+def enqueue(session, sha256):
+    """
+    Queue artifact spooled by a complete upload session for publishing.
+
+    The artifact is published by ``publish_queued``. Returns a tuple of
+    the queued import, response data and status code.
+    """
+    filename = parse_collection_filename(session.filename)
+    with transaction.atomic():
+        task = models.CollectionImport.objects.create(
+            task_id=uuid.uuid4(),
+            created_at=timezone.now(),
+            namespace=session.namespace,
+            name=filename.name,
+            version=filename.version,
+            sha256=sha256,
+            state=constants.ImportTaskState.QUEUED.value,
+        )
+        session.sha256 = sha256
+        session.state = constants.UploadSessionState.QUEUED.value
+        session.task = task
+        session.save(update_fields=['sha256', 'state', 'task', 'updated_at'])
+
+    return task, {'task': task.get_absolute_url()}, 202
+
+
+def publish_queued(workers=None):
+    """
+    Publish up to ``workers`` queued artifacts to Pulp concurrently.
+
+    Queued sessions are claimed in a short transaction, so concurrent
+    callers pick different ones. Artifacts are uploaded outside of any
+    transaction and the result of each upload is saved in its own one.
+    Failed uploads are retried with exponential backoff, client errors and
+    the last failed attempt mark the import failed. Claims of crashed
+    callers expire after ``COLLECTION_PUBLISH_CLAIM_TIMEOUT`` seconds.
+    The Pulp import task URL is saved as soon as an artifact is uploaded,
+    later attempts only fetch the task details.
+
+    Returns number of processed artifacts.
+    """
+    workers = workers or settings.COLLECTION_PUBLISH_WORKERS
+
+    sessions = _claim_queued(workers)
+    if not sessions:
+        return 0
+
+    # Threads only talk to Pulp, database is updated from this thread
+    with futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='publish') as executor:
+        upload_futures = {
+            executor.submit(_upload_session, session): session
+            for session in sessions if not session.task_href
+        }
+        task_futures = {
+            executor.submit(_fetch_task_detail, session.task_href): session
+            for session in sessions if session.task_href
+        }
+        for future in futures.as_completed(upload_futures):
+            session = upload_futures[future]
+            try:
+                task_href = _save_upload_result(session, future)
+            except Exception:
+                # Uploaded again when the claim expires
+                log.exception('Failed to save upload result of queued artifact %s',
+                              session.filename)
+                continue
+            if task_href:
+                task_futures[executor.submit(_fetch_task_detail, task_href)] = session
+
+        for future in futures.as_completed(task_futures):
+            session = task_futures[future]
+            try:
+                _save_result(session, future)
+            except Exception:
+                # Published again when the claim expires
+                log.exception('Failed to save publish result of queued artifact %s',
+                              session.filename)
+
+    return len(sessions)
+
+
+def check_not_imported(namespace, filename, sha256=None):
+    """
+    Raises Conflict if the collection version is in the artifact index.
+
+    The error code tells whether the indexed artifact has the given digest.
+    """
+    artifact = models.CollectionArtifact.objects.filter(
+        namespace=namespace, name=filename.name, version=filename.version).first()
+    if artifact is None:
+        return
+
+    metrics.collection_import_duplicates.inc()
+    version = f'{filename.namespace}.{filename.name}:{filename.version}'
+    if sha256 and artifact.sha256 == sha256:
+        raise Conflict(f'Artifact of collection version {version} is already imported.',
+                       code='duplicate_artifact')
+    raise Conflict(f'Collection version {version} already exists.')
+
+
+def index_import(task):
+    """Add artifact of a completed import to the artifact index."""
+    if not task.sha256:
+        return
+    models.CollectionArtifact.objects.update_or_create(
+        namespace=task.namespace,
+        name=task.name,
+        version=task.version,
+        defaults={'sha256': task.sha256, 'task': task},
+    )
+
+
+def reconcile_index(page_size=1000):
+    """
+    Synchronize the artifact index with collection versions in pulp.
+
+    Removes entries of versions missing in pulp and adds versions that were
+    imported without a local record. Returns a tuple of numbers of added and
+    removed entries.
+    """
+    api = galaxy_pulp.PulpCollectionsApi(pulp.get_client())
+    versions = set()
+    offset = 0
+    while True:
+        page = api.list(fields='namespace,name,version', offset=offset, limit=page_size)
+        versions.update((item['namespace'], item['name'], item['version'])
+                        for item in page.results)
+        offset += page_size
+        if offset >= page.count:
+            break
+
+    indexed = {
+        (namespace, name, version): pk
+        for namespace, name, version, pk in models.CollectionArtifact.objects.values_list(
+            'namespace__name', 'name', 'version', 'pk')
+    }
+    removed, _ = models.CollectionArtifact.objects.filter(pk__in=[
+        pk for key, pk in indexed.items() if key not in versions
+    ]).delete()
+
+    missing = versions - indexed.keys()
+    namespaces = models.Namespace.objects.in_bulk(
+        {namespace for namespace, _, _ in missing}, field_name='name')
+    versions_api = galaxy_pulp.GalaxyCollectionVersionsApi(pulp.get_client())
+    sha256_futures = {
+        key: pulp.executor.submit(_fetch_artifact_sha256, versions_api, *key)
+        for key in missing if key[0] in namespaces
+    }
+
+    artifacts = []
+    for (namespace, name, version), future in sha256_futures.items():
+        sha256 = future.result()
+        if sha256:
+            artifacts.append(models.CollectionArtifact(
+                namespace=namespaces[namespace], name=name, version=version, sha256=sha256))
+    models.CollectionArtifact.objects.bulk_create(artifacts, ignore_conflicts=True)
+
+    return len(artifacts), removed
+
+
+def inspect(fileobj, filename):
+    """Inspects artifact contents with limits from settings."""
+    return inspect_collection_artifact(
+        fileobj,
+        filename,
+        max_files=settings.COLLECTION_MAX_FILES,
+        max_unpacked_size=settings.COLLECTION_MAX_UNPACKED_SIZE,
+    )
+
+
+def file_data(file, filename, sha256=None):
+    """Returns upload data as expected by ``publish`` for an artifact file."""
+    return {
+        'file': File(file, name=filename),
+        'filename': parse_collection_filename(filename),
+        'mimetype': (mimetypes.guess_type(filename)[0] or 'application/octet-stream'),
+        'sha256': sha256,
+    }
+
+
+def _upload(namespace, data):
+    upload_response_data, status = _post_artifact(namespace, data)
+    task_detail = _fetch_task_detail(upload_response_data['task'])
+    return task_detail, upload_response_data, status
+
+
+def _post_artifact(namespace, data):
+    api = pulp.get_client()
+    url = '{host}/{prefix}/{path}'.format(
+        host=api.configuration.host,
+        path='v3/artifacts/collections/',
+        prefix=settings.API_PATH_PREFIX
+    )
+    headers = {}
+    headers.update(api.default_headers)
+
+    api.update_params_for_auth(headers, tuple(), api.configuration.auth_settings())
+
+    body = pulp.MultipartBody(_prepare_post_params(data))
+    try:
+        upload_response = pulp.post_multipart(api, url, headers, body)
+    except galaxy_pulp.ApiException:
+        log.exception('Failed to publish artifact %s (namespace=%s, sha256=%s) to pulp at url=%s',  # noqa
+                      data['file'].name, namespace, data.get('sha256'), url)
+        raise
+
+    return json.loads(upload_response.data), upload_response.status
+
+
+def _fetch_task_detail(task_href):
+    return pulp.get_client().call_api(
+        task_href,
+        'GET',
+        auth_settings=['BasicAuth'],
+        response_type='CollectionImport',
+        _return_http_data_only=True,
+    )
+
+
+def _fetch_artifact_sha256(api, namespace, name, version):
+    try:
+        response = api.get(
+            prefix=settings.API_PATH_PREFIX, namespace=namespace, name=name, version=version)
+    except galaxy_pulp.ApiException as exc:
+        log.warning('Failed to get collection version %s.%s:%s from pulp: %s',
+                    namespace, name, version, exc)
+        return None
+    return (response.get('artifact') or {}).get('sha256')
+
+
+def _claim_queued(count):
+    now = timezone.now()
+    with transaction.atomic():
+        sessions = list(
+            models.UploadSession.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('namespace', 'task')
+            .filter(state__in=(constants.UploadSessionState.QUEUED.value,
+                               constants.UploadSessionState.PUBLISHING.value))
+            .filter(Q(retry_at__isnull=True) | Q(retry_at__lte=now))
+            .order_by('updated_at')[:count]
+        )
+        claim_expiry = now + datetime.timedelta(seconds=settings.COLLECTION_PUBLISH_CLAIM_TIMEOUT)
+        for session in sessions:
+            if session.state == constants.UploadSessionState.PUBLISHING.value:
+                log.warning('Claim of queued artifact %s expired, publishing it again',
+                            session.filename)
+            session.state = constants.UploadSessionState.PUBLISHING.value
+            session.retry_at = claim_expiry
+            session.save(update_fields=['state', 'retry_at', 'updated_at'])
+    return sessions
+
+
+def _save_upload_result(session, future):
+    try:
+        upload_response_data, _ = future.result()
+    except Exception as exc:
+        with transaction.atomic():
+            _publish_failed(session, exc)
+        return None
+
+    session.task_href = upload_response_data['task']
+    session.save(update_fields=['task_href', 'updated_at'])
+    return session.task_href
+
+
+def _save_result(session, future):
+    try:
+        task_detail = future.result()
+    except Exception as exc:
+        with transaction.atomic():
+            _publish_failed(session, exc)
+    else:
+        with transaction.atomic():
+            _published(session, task_detail)
+
+
+def _upload_session(session):
+    with open(session.path, 'rb') as fp:
+        data = file_data(fp, session.filename, session.sha256 or None)
+        return _post_artifact(session.namespace, data)
+
+
+def _published(session, task_detail):
+    task = session.task
+    log.info('Queued artifact %s in namespace=%s created pulp import task_id=%s',
+             session.filename, session.namespace, task_detail.id)
+
+    task.pulp_task_id = task_detail.id
+    task.set_task_fields(task_detail)
+    task.save()
+    pulp.response_cache.invalidate(session.namespace.name, task.name)
+
+    _finish_session(session)
+    metrics.collection_publish_queue.labels(result='published').inc()
+
+
+def _publish_failed(session, exc):
+    session.attempts += 1
+    if _is_retryable(exc) and session.attempts < settings.COLLECTION_PUBLISH_MAX_ATTEMPTS:
+        delay = settings.COLLECTION_PUBLISH_RETRY_DELAY * 2 ** (session.attempts - 1)
+        log.warning('Failed to publish queued artifact %s (attempt %d), retrying in %ds: %s',
+                    session.filename, session.attempts, delay, exc)
+        session.state = constants.UploadSessionState.QUEUED.value
+        session.retry_at = timezone.now() + datetime.timedelta(seconds=delay)
+        session.save(update_fields=['state', 'attempts', 'retry_at', 'updated_at'])
+        metrics.collection_publish_queue.labels(result='retried').inc()
+        return
+
+    log.error('Failed to publish queued artifact %s (attempt %d): %s',
+              session.filename, session.attempts, exc)
+    task = session.task
+    task.state = constants.ImportTaskState.FAILED.value
+    task.finished_at = timezone.now()
+    task.error = {'code': 'publish_failed', 'description': _error_description(exc)}
+    task.save(update_fields=['state', 'finished_at', 'error'])
+
+    _finish_session(session)
+    metrics.collection_import_failures.inc()
+    metrics.collection_publish_queue.labels(result='failed').inc()
+
+
+def _finish_session(session):
+    session.state = constants.UploadSessionState.COMMITTED.value
+    session.retry_at = None
+    session.save(update_fields=['state', 'attempts', 'retry_at', 'updated_at'])
+    session.remove_file()
+
+
+def _is_retryable(exc):
+    if isinstance(exc, galaxy_pulp.ApiException):
+        return exc.status is None or exc.status >= 500 or exc.status == 429
+    return isinstance(exc, (HTTPError, OSError))
+
+
+def _error_description(exc):
+    if isinstance(exc, galaxy_pulp.ApiException) and exc.body:
+        body = exc.body
+        return body.decode('utf-8', 'replace') if isinstance(body, bytes) else str(body)
+    return str(exc) or type(exc).__name__
+
+
+def _prepare_post_params(data):
+    filename = data['filename']
+    post_params = [
+        ('file', (data['file'].name, data['file'], data['mimetype'])),
+        ('expected_namespace', filename.namespace),
+        ('expected_name', filename.name),
+        ('expected_version', filename.version),
+    ]
+    if data['sha256']:
+        post_params.append(('sha256', data['sha256']))
+    return post_params
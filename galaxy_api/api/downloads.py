@@ -0,0 +1,122 @@
+"""Buffered counting of collection version downloads."""
+
+import atexit
+import collections
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+
+from galaxy_api.api import models
+from galaxy_api.common import metrics
+
+log = logging.getLogger(__name__)
+
+
+class DownloadCounter:
+    """
+    Counts collection version downloads in memory of a worker process.
+
+    Counts are added to ``CollectionDownloadCount`` by a background thread
+    every ``DOWNLOAD_COUNT_FLUSH_INTERVAL`` seconds and when the process
+    exits. With zero interval counts are saved on every download.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = collections.Counter()
+        self._pid = None
+
+    def add(self, namespace, name, version):
+        interval = settings.DOWNLOAD_COUNT_FLUSH_INTERVAL
+        with self._lock:
+            if interval and self._pid != os.getpid():
+                # Counts copied from the parent process are flushed by the parent
+                self._counts.clear()
+                self._pid = os.getpid()
+                self._start_flusher(interval)
+            self._counts[(namespace, name, version)] += 1
+        if not interval:
+            self.flush()
+
+    def flush(self):
+        """Adds counted downloads to the database."""
+        with self._lock:
+            counts, self._counts = self._counts, collections.Counter()
+        if counts:
+            save_counts(counts)
+
+    def _start_flusher(self, interval):
+        thread = threading.Thread(
+            target=self._run_flusher, args=(interval,), name='download-counts', daemon=True)
+        thread.start()
+        atexit.register(self.flush)
+
+    def _run_flusher(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Failed to save collection download counts')
+            finally:
+                connection.close()
+
+
+def save_counts(counts):
+    """
+    Adds counts of downloads keyed by (namespace, name, version) to the database.
+
+    Downloads of versions in unknown namespaces are dropped.
+    """
+    namespaces = models.Namespace.objects.in_bulk(
+        {namespace for namespace, _, _ in counts}, field_name='name')
+
+    saved = 0
+    with transaction.atomic():
+        # Update rows in the same order in all processes to avoid deadlocks
+        for (namespace, name, version), count in sorted(counts.items()):
+            if namespace not in namespaces:
+                continue
+            lookup = {'namespace': namespaces[namespace], 'name': name, 'version': version}
+            if not _increment(lookup, count):
+                try:
+                    with transaction.atomic():
+                        models.CollectionDownloadCount.objects.create(**lookup, count=count)
+                except IntegrityError:
+                    # Created by another process meanwhile
+                    _increment(lookup, count)
+            saved += count
+    metrics.collection_download_counts_saved.inc(saved)
+
+
+def get_collection_counts(collections):
+    """
+    Returns download counts of all versions of collections given as
+    (namespace, name) pairs, keyed by the pairs.
+    """
+    collections = list(collections)
+    if not collections:
+        return {}
+
+    queryset = (
+        models.CollectionDownloadCount.objects
+        .filter(namespace__name__in={namespace for namespace, _ in collections},
+                name__in={name for _, name in collections})
+        .values_list('namespace__name', 'name')
+        .annotate(Sum('count'))
+        .order_by()
+    )
+    return {(namespace, name): count for namespace, name, count in queryset}
+
+
+def _increment(lookup, count):
+    return models.CollectionDownloadCount.objects.filter(**lookup).update(
+        count=F('count') + count)
+
+
+download_counter = DownloadCounter()
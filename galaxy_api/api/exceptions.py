@@ -7,6 +7,12 @@ from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
 
+class Conflict(exceptions.APIException):
+    status_code = 409
+    default_detail = 'Request conflicts with the current state of the resource.'
+    default_code = 'conflict'
+
+
 def _get_errors(detail, *, status, title, source=None):
     if isinstance(detail, list):
         for item in detail:
@@ -0,0 +1,243 @@
+"""Collection import task state retrieval and local mirroring."""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+
+import galaxy_pulp
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from urllib3.exceptions import HTTPError
+
+from galaxy_api import constants
+from galaxy_api.api import artifacts, models
+from galaxy_api.common import metrics, pulp
+
+
+log = logging.getLogger(__name__)
+
+
+def get_task_infos(tasks):
+    """
+    Return pulp import task details for a list of CollectionImport objects.
+
+    Details of finished and queued tasks are built from the local mirror.
+    Other tasks are fetched from pulp concurrently and their mirror is
+    updated. If pulp fails to return a task, its last known local state
+    is used. Tasks unknown to pulp are marked failed.
+    """
+    api = galaxy_pulp.GalaxyImportsApi(pulp.get_client())
+    task_futures = {
+        task.pk: pulp.executor.submit(_fetch_task_info, api, task)
+        for task in tasks if not (task.is_finished or task.is_queued)
+    }
+
+    task_infos = []
+    for task in tasks:
+        task_info = None
+        if task.pk in task_futures:
+            task_info = task_futures[task.pk].result()
+        if task_info is None:
+            task_info = task_info_from_model(task)
+        else:
+            update_task(task, task_info)
+            # Imports are identified by local task id
+            task_info.id = str(task.pk)
+        task_infos.append(task_info)
+    return task_infos
+
+
+def get_task_info(task):
+    """Return pulp import task details for a CollectionImport object."""
+    return get_task_infos([task])[0]
+
+
+def task_info_from_model(task):
+    return galaxy_pulp.CollectionImport(
+        id=str(task.pk),
+        created_at=task.created_at,
+        **{field: getattr(task, field) for field in task.TASK_FIELDS}
+    )
+
+
+def update_task(task, task_info):
+    """Update local mirror of an import task from pulp task details."""
+    was_completed = task.state == constants.ImportTaskState.COMPLETED.value
+
+    changed = task.set_task_fields(task_info)
+    if not changed:
+        return
+    task.save(update_fields=changed)
+
+    if task.state == constants.ImportTaskState.COMPLETED.value and not was_completed:
+        # A new collection version is available
+        pulp.response_cache.invalidate(task.namespace.name, task.name)
+        artifacts.index_import(task)
+
+
+def sync_unfinished_tasks(batch_size=100):
+    """
+    Refresh local mirror of all unfinished import tasks.
+
+    Returns number of tasks that reached a final state.
+    """
+    queryset = (
+        models.CollectionImport.objects
+        .exclude(state__in=constants.IMPORT_TASK_FINAL_STATES)
+        .exclude(state=constants.ImportTaskState.QUEUED.value)
+        .select_related('namespace')
+        .order_by('created_at')
+    )
+    tasks = list(queryset)
+
+    finished = 0
+    for start in range(0, len(tasks), batch_size):
+        batch = tasks[start:start + batch_size]
+        get_task_infos(batch)
+        finished += sum(1 for task in batch if task.is_finished)
+    return finished
+
+
+def slice_messages(data, messages_since):
+    """
+    Keep only import task messages after the ``messages_since`` cursor.
+
+    Adds ``next_messages_since`` cursor to be used by the next request.
+    """
+    messages = data.get('messages') or []
+    data['messages'] = messages[messages_since:]
+    data['next_messages_since'] = len(messages)
+    return data
+
+
+class WaiterLimit:
+    """
+    Limits number of request threads of a process waiting for import task
+    changes to ``IMPORT_TASK_MAX_WAITERS``, so that others stay available.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Yields whether the calling thread may wait."""
+        with self._lock:
+            admitted = self._count < settings.IMPORT_TASK_MAX_WAITERS
+            if admitted:
+                self._count += 1
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                with self._lock:
+                    self._count -= 1
+
+
+waiter_limit = WaiterLimit()
+
+
+def wait_for_task_info(task, timeout, since_state=None, since_messages=None):
+    """
+    Wait until import task changes and return its pulp task details.
+
+    Returns as soon as the task state differs from ``since_state`` or its
+    message count differs from ``since_messages``, when the task is finished
+    or after ``timeout`` seconds. If neither is given, waits for a change
+    of the current state or message count. Returns current task details
+    without waiting if ``IMPORT_TASK_MAX_WAITERS`` threads of the process
+    are already waiting.
+
+    Pulp is polled at most once per ``IMPORT_TASK_POLL_INTERVAL`` for each
+    task, other waiters use task details stored in the shared cache.
+    """
+    with waiter_limit.slot() as admitted:
+        if not admitted:
+            metrics.import_task_wait_rejections.inc()
+            return _poll_task_info(task)
+        return _wait_for_task_info(task, timeout, since_state, since_messages)
+
+
+def _wait_for_task_info(task, timeout, since_state, since_messages):
+    deadline = time.monotonic() + timeout
+    task_info = _poll_task_info(task)
+
+    if since_state is None and since_messages is None:
+        since_state = task_info.state
+        since_messages = len(task_info.messages or [])
+
+    while True:
+        if since_state is not None and task_info.state != since_state:
+            return task_info
+        if since_messages is not None and len(task_info.messages or []) != since_messages:
+            return task_info
+
+        remaining = deadline - time.monotonic()
+        if task.is_finished or remaining <= 0:
+            return task_info
+        time.sleep(min(settings.IMPORT_TASK_POLL_INTERVAL, remaining))
+        task_info = _poll_task_info(task)
+
+
+def _poll_task_info(task):
+    if task.is_queued:
+        # Queued imports are updated by the publishing worker
+        task.refresh_from_db(fields=('pulp_task_id',) + task.TASK_FIELDS)
+    if task.is_finished or task.is_queued:
+        return task_info_from_model(task)
+
+    cache = caches[settings.PULP_CACHE_ALIAS]
+    interval = settings.IMPORT_TASK_POLL_INTERVAL
+    key = f'imports:task:{task.pk}'
+
+    data = cache.get(key)
+    if data is not None:
+        task_info = galaxy_pulp.CollectionImport(**data)
+        task.set_task_fields(task_info)
+        return task_info
+
+    # Lock expires in case the polling process dies before releasing it
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, os.getpid(), interval):
+        try:
+            api = galaxy_pulp.GalaxyImportsApi(pulp.get_client())
+            task_info = _fetch_task_info(api, task)
+            if task_info is not None:
+                task_info.id = str(task.pk)
+                cache.set(key, task_info.to_dict(), interval)
+                update_task(task, task_info)
+                return task_info
+        finally:
+            cache.delete(lock_key)
+    else:
+        # Another waiter polled pulp within the interval, the loaded task
+        # may be older than the state it saved
+        task.refresh_from_db(fields=task.TASK_FIELDS)
+
+    return task_info_from_model(task)
+
+
+def _fetch_task_info(api, task):
+    try:
+        return api.get(prefix=settings.API_PATH_PREFIX, id=str(task.pulp_task_id))
+    except galaxy_pulp.ApiException as exc:
+        if exc.status == 404:
+            log.error('Import task %s not found in pulp, marking it failed', task.pulp_task_id)
+            return _unknown_task_info(task)
+        log.warning('Failed to get import task %s from pulp: %s', task.pulp_task_id, exc)
+    except HTTPError as exc:
+        log.warning('Failed to get import task %s from pulp: %s', task.pulp_task_id, exc)
+    return None
+
+
+def _unknown_task_info(task):
+    # Final state, so that the task is not polled anymore
+    task_info = task_info_from_model(task)
+    task_info.state = constants.ImportTaskState.FAILED.value
+    task_info.finished_at = timezone.now()
+    task_info.error = {'code': 'not_found', 'description': 'Import task not found in pulp.'}
+    return task_info
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from galaxy_api.api import uploads
+
+
+class Command(BaseCommand):
+    help = 'Remove expired collection artifact upload sessions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=None,
+            help='Remove sessions not updated for MAX_AGE seconds '
+                 '(defaults to UPLOAD_SESSION_MAX_AGE setting).',
+        )
+
+    def handle(self, *args, **options):
+        count = uploads.cleanup_sessions(max_age=options['max_age'])
+        if options['verbosity'] > 1:
+            self.stdout.write(f'{count} upload sessions removed')
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from galaxy_api.api import artifacts
+
+
+class Command(BaseCommand):
+    help = 'Publish queued collection artifacts to Pulp.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Keep running and check the queue every INTERVAL seconds when it is empty.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of artifacts published concurrently '
+                 '(defaults to COLLECTION_PUBLISH_WORKERS setting).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = artifacts.publish_queued(workers=options['workers'])
+            if options['verbosity'] > 1 and processed:
+                self.stdout.write(f'{processed} queued artifacts processed')
+
+            if processed:
+                continue
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from galaxy_api.api import artifacts
+
+
+class Command(BaseCommand):
+    help = 'Synchronize the collection artifact index with collection versions in pulp.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size', type=int, default=1000,
+            help='Number of collection versions requested from pulp at once.',
+        )
+
+    def handle(self, *args, **options):
+        added, removed = artifacts.reconcile_index(page_size=options['page_size'])
+        if options['verbosity'] > 1:
+            self.stdout.write(f'{added} artifacts added, {removed} artifacts removed')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from galaxy_api.api import imports
+
+
+class Command(BaseCommand):
+    help = 'Refresh state of unfinished collection imports from Pulp.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Keep running and refresh every INTERVAL seconds.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of tasks fetched from Pulp concurrently.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            finished = imports.sync_unfinished_tasks(batch_size=options['batch_size'])
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{finished} collection imports finished')
+
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
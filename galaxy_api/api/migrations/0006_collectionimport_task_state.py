@@ -0,0 +1,54 @@
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('galaxy_api', '0005_collectionimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collectionimport',
+            name='error',
+            field=django.contrib.postgres.fields.jsonb.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='collectionimport',
+            name='finished_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='collectionimport',
+            name='messages',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='collectionimport',
+            name='started_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='collectionimport',
+            name='state',
+            field=models.CharField(
+                choices=[
+                    ('waiting', 'waiting'),
+                    ('skipped', 'skipped'),
+                    ('running', 'running'),
+                    ('completed', 'completed'),
+                    ('failed', 'failed'),
+                    ('canceled', 'canceled'),
+                ],
+                db_index=True,
+                default='waiting',
+                max_length=32,
+            ),
+        ),
+        migrations.AddField(
+            model_name='collectionimport',
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_pulp_task_id(apps, schema_editor):
+    CollectionImport = apps.get_model('galaxy_api', 'CollectionImport')
+    CollectionImport.objects.update(pulp_task_id=F('task_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('galaxy_api', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collectionimport',
+            name='pulp_task_id',
+            field=models.UUIDField(null=True, unique=True),
+        ),
+        migrations.RunPython(set_pulp_task_id, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='collectionimport',
+            name='state',
+            field=models.CharField(
+                choices=[
+                    ('queued', 'queued'),
+                    ('waiting', 'waiting'),
+                    ('skipped', 'skipped'),
+                    ('running', 'running'),
+                    ('completed', 'completed'),
+                    ('failed', 'failed'),
+                    ('canceled', 'canceled'),
+                ],
+                db_index=True,
+                default='waiting',
+                max_length=32,
+            ),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='retry_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='state',
+            field=models.CharField(
+                choices=[
+                    ('open', 'open'),
+                    ('committing', 'committing'),
+                    ('queued', 'queued'),
+                    ('committed', 'committed'),
+                ],
+                default='open',
+                max_length=32,
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('galaxy_api', '0008_collectionimport_queued'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collectionimport',
+            name='sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.CreateModel(
+            name='CollectionArtifact',
+            fields=[
+                ('id', models.AutoField(
+                    auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('version', models.CharField(max_length=128)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('namespace', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, to='galaxy_api.Namespace')),
+                ('task', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.SET_NULL,
+                    to='galaxy_api.CollectionImport')),
+            ],
+            options={
+                'unique_together': {('namespace', 'name', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('galaxy_api', '0009_collectionartifact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionDownloadCount',
+            fields=[
+                ('id', models.AutoField(
+                    auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('version', models.CharField(max_length=128)),
+                ('count', models.BigIntegerField(default=0)),
+                ('namespace', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, to='galaxy_api.Namespace')),
+            ],
+            options={
+                'unique_together': {('namespace', 'name', 'version')},
+            },
+        ),
+    ]
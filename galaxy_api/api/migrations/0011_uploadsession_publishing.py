@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('galaxy_api', '0010_collectiondownloadcount'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='state',
+            field=models.CharField(
+                choices=[
+                    ('open', 'open'),
+                    ('committing', 'committing'),
+                    ('queued', 'queued'),
+                    ('publishing', 'publishing'),
+                    ('committed', 'committed'),
+                ],
+                default='open',
+                max_length=32,
+            ),
+        ),
+    ]
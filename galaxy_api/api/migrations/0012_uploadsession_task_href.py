@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('galaxy_api', '0011_uploadsession_publishing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='task_href',
+            field=models.CharField(blank=True, max_length=256),
+        ),
+    ]
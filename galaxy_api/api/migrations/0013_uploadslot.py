@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('galaxy_api', '0012_uploadsession_task_href'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSlot',
+            fields=[
+                ('id', models.AutoField(
+                    auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64)),
+                ('index', models.PositiveIntegerField()),
+                ('token', models.UUIDField(default=uuid.uuid4)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'unique_together': {('scope', 'index')},
+            },
+        ),
+    ]
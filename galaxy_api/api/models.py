@@ -1,9 +1,15 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
 from django.db import models
 from django.db import transaction
 from django.urls import reverse
 
 from django_prometheus.models import ExportModelOperationsMixin
 
+from galaxy_api import constants
 from galaxy_api.auth import models as auth_models
 
 
@@ -83,25 +89,250 @@ class CollectionImport(ExportModelOperationsMixin('collectionimport'), models.Mo
     """
     A model representing a mapping between pulp task id and task parameters.
 
+    Task state fields mirror the pulp import task. Once the task reaches
+    a final state they never change and are served without asking pulp.
+
+    Imports published asynchronously are created in the queued state with
+    a local task id, and get a pulp task id once a worker publishes them.
+
     Fields:
         task_id: Task UUID.
+        pulp_task_id: Pulp task UUID.
         created_at: Task creation date time.
         name: Collection name.
         version: Collection version.
+        sha256: Artifact sha256 digest.
+        state: Last known task state.
+        updated_at: Task update date time.
+        started_at: Task start date time.
+        finished_at: Task finish date time.
+        error: Task error details.
+        messages: Task import log messages.
 
     Relations:
         namespace: Reference to a namespace.
     """
+    TASK_FIELDS = ('state', 'updated_at', 'started_at', 'finished_at', 'error', 'messages')
+
     task_id = models.UUIDField(primary_key=True)
+    pulp_task_id = models.UUIDField(null=True, unique=True)
 
     created_at = models.DateTimeField()
 
     namespace = models.ForeignKey(Namespace, on_delete=models.CASCADE)
     name = models.CharField(max_length=64, editable=False)
     version = models.CharField(max_length=32, editable=False)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
+
+    state = models.CharField(
+        max_length=32,
+        default=constants.ImportTaskState.WAITING.value,
+        choices=[(state.value, state.value) for state in constants.ImportTaskState],
+        db_index=True,
+    )
+    updated_at = models.DateTimeField(null=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    error = JSONField(null=True)
+    messages = JSONField(default=list)
 
     class Meta:
         ordering = ['-task_id']
 
     def get_absolute_url(self):
         return reverse('api:v3:collection-imports', args=[str(self.task_id)])
+
+    @property
+    def is_finished(self):
+        return self.state in constants.IMPORT_TASK_FINAL_STATES
+
+    @property
+    def is_queued(self):
+        return self.state == constants.ImportTaskState.QUEUED.value
+
+    def set_task_fields(self, task_info):
+        """
+        Copy task state from pulp import task details.
+
+        Returns names of changed fields.
+        """
+        changed = []
+        for field in self.TASK_FIELDS:
+            value = getattr(task_info, field)
+            if field == 'messages' and value is None:
+                value = []
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed.append(field)
+        return changed
+
+
+class CollectionArtifact(ExportModelOperationsMixin('collectionartifact'), models.Model):
+    """
+    A model representing an index of collection artifacts imported to pulp.
+
+    Entries are added when imports complete and reconciled with pulp by
+    the reconcile_artifact_index management command.
+
+    Fields:
+        name: Collection name.
+        version: Collection version.
+        sha256: Artifact sha256 digest.
+        created_at: Entry creation date time.
+
+    Relations:
+        namespace: Reference to a namespace.
+        task: Reference to the import of the artifact, if known.
+    """
+
+    namespace = models.ForeignKey(Namespace, on_delete=models.CASCADE)
+    name = models.CharField(max_length=64)
+    version = models.CharField(max_length=128)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    task = models.ForeignKey(CollectionImport, null=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        unique_together = ('namespace', 'name', 'version')
+
+    def __str__(self):
+        return f'{self.namespace.name}-{self.name}-{self.version}'
+
+
+class CollectionDownloadCount(
+        ExportModelOperationsMixin('collectiondownloadcount'), models.Model):
+    """
+    A model representing number of downloads of a collection version.
+
+    Downloads are counted in memory by worker processes and added here
+    in batches.
+
+    Fields:
+        name: Collection name.
+        version: Collection version.
+        count: Number of downloads.
+
+    Relations:
+        namespace: Reference to a namespace.
+    """
+
+    namespace = models.ForeignKey(Namespace, on_delete=models.CASCADE)
+    name = models.CharField(max_length=64)
+    version = models.CharField(max_length=128)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('namespace', 'name', 'version')
+
+    def __str__(self):
+        return f'{self.namespace.name}-{self.name}-{self.version}'
+
+
+class UploadSlot(models.Model):
+    """
+    A model representing an upload slot held by an in-flight upload.
+
+    Slots are shared by worker processes, so that limits of in-flight
+    uploads apply across them.
+
+    Fields:
+        scope: Limit the slot belongs to, global or of a namespace.
+        index: Slot number within the scope.
+        token: Random token of the holder, so that only it releases the slot.
+        expires_at: Date time the slot of a crashed holder may be taken over.
+    """
+
+    scope = models.CharField(max_length=64)
+    index = models.PositiveIntegerField()
+    token = models.UUIDField(default=uuid.uuid4)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('scope', 'index')
+
+    def __str__(self):
+        return f'{self.scope}:{self.index}'
+
+
+class UploadSession(ExportModelOperationsMixin('uploadsession'), models.Model):
+    """
+    A model representing a resumable collection artifact upload.
+
+    Received byte ranges are written to a spool file on local disk until
+    the session is committed and the artifact is published to pulp.
+
+    Fields:
+        id: Session UUID.
+        created_at: Session creation date time.
+        updated_at: Last session update date time.
+        filename: Collection artifact file name.
+        size: Collection artifact size in bytes.
+        sha256: Optional expected artifact sha256 digest.
+        state: Session state.
+        ranges: Received byte ranges as sorted list of ``[start, end)`` pairs.
+        attempts: Number of failed attempts to publish a queued artifact.
+        retry_at: Earliest date time of the next publish attempt, or expiry
+            of the claim of a worker publishing the artifact.
+        task_href: Pulp import task URL, saved once the queued artifact is
+            uploaded, so that publish attempts do not upload it again.
+
+    Relations:
+        namespace: Reference to a namespace.
+        task: Reference to the import created on commit.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    namespace = models.ForeignKey(Namespace, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=256)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+
+    state = models.CharField(
+        max_length=32,
+        default=constants.UploadSessionState.OPEN.value,
+        choices=[(state.value, state.value) for state in constants.UploadSessionState],
+    )
+    ranges = JSONField(default=list)
+    attempts = models.PositiveIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True)
+    task_href = models.CharField(max_length=256, blank=True)
+
+    task = models.OneToOneField(
+        CollectionImport, null=True, on_delete=models.SET_NULL, related_name='upload_session'
+    )
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def path(self):
+        return os.path.join(settings.UPLOAD_SESSION_DIR, str(self.pk))
+
+    @property
+    def received(self):
+        return sum(end - start for start, end in self.ranges)
+
+    @property
+    def is_complete(self):
+        return self.ranges == [[0, self.size]]
+
+    def remove_file(self):
+        """Remove the spool file, if any."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def add_range(self, start, end):
+        """Merge byte range ``[start, end)`` into received ranges."""
+        ranges = []
+        for range_start, range_end in sorted(self.ranges + [[start, end]]):
+            if ranges and range_start <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], range_end)
+            else:
+                ranges.append([range_start, range_end])
+        self.ranges = ranges
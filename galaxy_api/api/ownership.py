@@ -0,0 +1,65 @@
+"""Index of namespaces owned by users through their groups."""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from galaxy_api.api import models
+from galaxy_api.auth.models import User
+
+
+def get_owned_namespaces(request):
+    """
+    Returns IDs of namespaces owned by groups of the request user.
+
+    The IDs are loaded once per request, and shared by requests of the user
+    for ``NAMESPACE_OWNERSHIP_CACHE_TIMEOUT`` seconds if it's set.
+    """
+    namespace_ids = getattr(request, '_owned_namespaces', None)
+    if namespace_ids is None:
+        namespace_ids = _load_owned_namespaces(request.user)
+        request._owned_namespaces = namespace_ids
+    return namespace_ids
+
+
+def invalidate_users(user_ids):
+    """Drops namespaces owned by users shared by requests."""
+    caches[settings.NAMESPACE_OWNERSHIP_CACHE_ALIAS].delete_many(
+        [_owned_namespaces_key(user_id) for user_id in user_ids])
+
+
+def invalidate_groups(group_ids):
+    """Drops namespaces owned by members of groups shared by requests."""
+    if not settings.NAMESPACE_OWNERSHIP_CACHE_TIMEOUT:
+        return
+    user_ids = User.groups.through.objects.filter(
+        group_id__in=group_ids).values_list('user_id', flat=True)
+    invalidate_users(set(user_ids))
+
+
+def _load_owned_namespaces(user):
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    timeout = settings.NAMESPACE_OWNERSHIP_CACHE_TIMEOUT
+    if not timeout:
+        return _query_owned_namespaces(user)
+
+    cache = caches[settings.NAMESPACE_OWNERSHIP_CACHE_ALIAS]
+    key = _owned_namespaces_key(user.pk)
+    namespace_ids = cache.get(key)
+    if namespace_ids is None:
+        namespace_ids = _query_owned_namespaces(user)
+        cache.set(key, namespace_ids, timeout)
+    return namespace_ids
+
+
+def _query_owned_namespaces(user):
+    return frozenset(
+        models.Namespace.groups.through.objects
+        .filter(group__user=user)
+        .values_list('namespace_id', flat=True)
+    )
+
+
+def _owned_namespaces_key(user_id):
+    return f'galaxy_api:owned_namespaces:{user_id}'
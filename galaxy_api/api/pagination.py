@@ -1,3 +1,6 @@
+import json
+
+from django.http import HttpResponse
 from rest_framework import pagination
 from rest_framework.response import Response
 from rest_framework.utils.urls import remove_query_param, replace_query_param
@@ -45,18 +48,19 @@ class LimitOffsetPagination(pagination.LimitOffsetPagination):
 
     def get_paginated_response(self, data):
         """Returns paginated response."""
-        return Response(
-            {
-                "meta": {"count": self.count},
-                "links": {
-                    "first": self.get_first_link(),
-                    "previous": self.get_previous_link(),
-                    "next": self.get_next_link(),
-                    "last": self.get_last_link(),
-                },
-                "data": data,
-            }
-        )
+        return Response(self._get_paginated_data(data))
+
+    def _get_paginated_data(self, data):
+        return {
+            "meta": {"count": self.count},
+            "links": {
+                "first": self.get_first_link(),
+                "previous": self.get_previous_link(),
+                "next": self.get_next_link(),
+                "last": self.get_last_link(),
+            },
+            "data": data,
+        }
 
     # Custom methods for working with pulp client
     def init_from_request(self, request):
@@ -71,3 +75,18 @@ class LimitOffsetPagination(pagination.LimitOffsetPagination):
             self.display_page_controls = True
 
         return self.get_paginated_response(data)
+
+    def paginate_raw_proxy_response(self, page):
+        """
+        Returns paginated response for a pulp list response parsed from raw JSON.
+
+        Results are passed through as they are, without constructing client
+        models or running DRF serializers and renderers.
+        """
+        self.count = page['count']
+
+        data = self._get_paginated_data(page['results'])
+        return HttpResponse(
+            json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+            content_type='application/json',
+        )
@@ -1,6 +1,8 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
 from galaxy_api.api.models import Namespace
+from galaxy_api.api.ownership import get_owned_namespaces
+from galaxy_api.auth.auth import get_user_groups
 from galaxy_api.auth.models import SYSTEM_SCOPE
 
 
@@ -12,7 +14,7 @@ class IsPartnerEngineer(BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        return request.user.groups.filter(name=self.GROUP_NAME).exists()
+        return self.GROUP_NAME in get_user_groups(request)
 
 
 class IsNamespaceOwner(BasePermission):
@@ -33,7 +35,7 @@ class IsNamespaceOwner(BasePermission):
                 f" not have \"namespace\" attribute. "
             )
 
-        return namespace.groups.filter(pk__in=request.user.groups.all()).exists()
+        return namespace.pk in get_owned_namespaces(request)
 
 
 class IsNamespaceOwnerOrReadOnly(BasePermission):
@@ -0,0 +1,35 @@
+from django.contrib.auth import models as django_auth_models
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from galaxy_api.api import models, ownership
+from galaxy_api.auth.models import Group, User
+
+
+@receiver(m2m_changed, sender=models.Namespace.groups.through)
+def namespace_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drops cached namespaces of members of groups added to or removed from namespaces."""
+    if reverse and action in ('post_add', 'post_remove', 'pre_clear'):
+        ownership.invalidate_groups([instance.pk])
+    elif not reverse and action == 'pre_clear':
+        ownership.invalidate_groups(instance.groups.values_list('pk', flat=True))
+    elif not reverse and action in ('post_add', 'post_remove'):
+        ownership.invalidate_groups(pk_set)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drops cached namespaces of users added to or removed from groups."""
+    if reverse and action == 'pre_clear':
+        ownership.invalidate_groups([instance.pk])
+    elif not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        ownership.invalidate_users([instance.pk])
+    elif reverse and action in ('post_add', 'post_remove'):
+        ownership.invalidate_users(pk_set)
+
+
+@receiver(pre_delete, sender=Group)
+@receiver(pre_delete, sender=django_auth_models.Group)
+def group_deleted(sender, instance, **kwargs):
+    """Drops cached namespaces of members of deleted groups."""
+    ownership.invalidate_groups([instance.pk])
@@ -7,6 +7,7 @@ from .collection import (
     CollectionVersionBaseSerializer,
 )
 from .imports import (
+    ImportTaskDetailQuerySerializer,
     ImportTaskDetailSerializer,
     ImportTaskListSerializer,
 )
@@ -28,6 +29,7 @@ __all__ = (
     'CertificationSerializer',
     'CollectionVersionDetailSerializer',
     'CollectionVersionBaseSerializer',
+    'ImportTaskDetailQuerySerializer',
     'ImportTaskDetailSerializer',
     'ImportTaskListSerializer',
     'NamespaceSerializer',
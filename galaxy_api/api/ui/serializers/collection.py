@@ -91,13 +91,17 @@ class _CollectionSerializer(serializers.Serializer):
     id = serializers.UUIDField()
     namespace = serializers.SerializerMethodField()
     name = serializers.CharField()
-    download_count = serializers.IntegerField(default=0)
+    download_count = serializers.SerializerMethodField()
     latest_version = CollectionVersionSerializer(source='*')
     deprecated = serializers.BooleanField()
 
     def _get_namespace(self, obj):
         raise NotImplementedError
 
+    def get_download_count(self, obj):
+        download_counts = self.context.get('download_counts', {})
+        return download_counts.get((obj['namespace'], obj['name']), 0)
+
     def get_namespace(self, obj):
         namespace = self._get_namespace(obj)
         return NamespaceSummarySerializer(namespace).data
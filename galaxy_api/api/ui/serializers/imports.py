@@ -24,3 +24,7 @@ class ImportTaskDetailSerializer(ImportTaskListSerializer):
 
     error = serializers.JSONField()
     messages = serializers.JSONField()
+
+
+class ImportTaskDetailQuerySerializer(serializers.Serializer):
+    messages_since = serializers.IntegerField(required=False, default=None, min_value=0)
@@ -9,9 +9,9 @@ from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from galaxy_api.api import models, permissions
+from galaxy_api.api import downloads, imports, models, permissions
 from galaxy_api.api.ui import serializers
-from galaxy_api.common import pulp
+from galaxy_api.common import metrics, pulp
 from galaxy_api import constants
 
 from galaxy_pulp.models import CertificationInfo
@@ -38,24 +38,77 @@ class CollectionViewSet(viewsets.GenericViewSet):
 
         api = galaxy_pulp.PulpCollectionsApi(pulp.get_client())
 
-        response = api.list(
-            is_highest=True,
-            exclude_fields='docs_blob',
-            **params
-        )
-
-        namespaces = set(collection['namespace'] for collection in response.results)
+        sort = params.get('sort')
+        if sort in ('download_count', '-download_count'):
+            results, count, download_counts = self._list_by_downloads(api, params, sort)
+        else:
+            response = pulp.response_cache.get_or_call(
+                'pulp_collections',
+                api.list,
+                is_highest=True,
+                exclude_fields='docs_blob',
+                **params
+            )
+            results = response.results
+            count = response.count
+            download_counts = downloads.get_collection_counts(
+                (collection['namespace'], collection['name']) for collection in results)
+
+        namespaces = set(collection['namespace'] for collection in results)
         namespaces = self._query_namespaces(namespaces)
 
         data = serializers.CollectionListSerializer(
-            response.results, many=True,
-            context={'namespaces': namespaces}
+            results, many=True,
+            context={'namespaces': namespaces, 'download_counts': download_counts}
         ).data
-        return self.paginator.paginate_proxy_response(data, response.count)
+        return self.paginator.paginate_proxy_response(data, count)
+
+    def _list_by_downloads(self, api, params, sort):
+        """
+        Pulp does not know download counts, the first collections are sorted here.
+
+        Only names of the collections are listed for sorting, shared by all
+        pages through the response cache. Details are fetched for the
+        collections of the requested page only.
+        """
+        del params['sort']
+        filter_params = {key: value for key, value in params.items()
+                         if key not in ('offset', 'limit')}
+        response = pulp.response_cache.get_or_call(
+            'pulp_collections',
+            api.list,
+            is_highest=True,
+            fields='namespace,name',
+            offset=0,
+            limit=settings.UI_COLLECTION_SORT_MAX_COLLECTIONS,
+            **filter_params
+        )
+        keys = [(collection['namespace'], collection['name'])
+                for collection in response.results]
+        download_counts = downloads.get_collection_counts(keys)
+        keys.sort(key=lambda key: download_counts.get(key, 0), reverse=sort.startswith('-'))
+
+        offset = self.paginator.offset
+        collection_futures = [
+            pulp.executor.submit(
+                pulp.response_cache.get_or_call,
+                'pulp_collections',
+                api.list,
+                is_highest=True,
+                exclude_fields='docs_blob',
+                **{**filter_params, 'namespace': namespace, 'name': name}
+            ) for namespace, name in keys[offset:offset + self.paginator.limit]
+        ]
+        # Collections removed meanwhile are skipped
+        results = [collection for future in collection_futures
+                   for collection in future.result().results[:1]]
+
+        # Collections past the limit are not sorted, do not link pages of them
+        count = min(response.count, settings.UI_COLLECTION_SORT_MAX_COLLECTIONS)
+        return results, count, download_counts
 
     def retrieve(self, request, *args, **kwargs):
         namespace, name = self.kwargs['collection'].split('/')
-        namespace_obj = get_object_or_404(models.Namespace, name=namespace)
 
         params_dict = self.request.query_params.dict()
 
@@ -74,35 +127,55 @@ class CollectionViewSet(viewsets.GenericViewSet):
         else:
             params['version'] = version
 
-        response = api.list(**params)
-
-        if not response.results:
-            raise NotFound()
+        # Unknown namespaces are rejected before calling pulp
+        with metrics.ui_collection_detail_call_seconds.labels(call='namespace').time():
+            namespace_obj = get_object_or_404(models.Namespace, name=namespace)
 
-        all_versions = api.list(
+        # Pulp lookups are independent, run them concurrently
+        response_future = pulp.executor.submit(
+            self._timed_call, 'version', pulp.response_cache.get_or_call,
+            'pulp_collections', api.list, **params,
+        )
+        all_versions_future = pulp.executor.submit(
+            self._timed_call, 'all_versions', pulp.response_cache.get_or_call,
+            'pulp_collections',
+            api.list,
             namespace=namespace,
             name=name,
             fields='version,id,pulp_created,artifact',
             certification=constants.CertificationStatus.CERTIFIED.value
         )
 
+        response = response_future.result()
+        if not response.results:
+            raise NotFound()
+
         all_versions = [
             {
                 'version': collection['version'],
                 'id': collection['id'],
                 'created': collection['pulp_created']
-            } for collection in all_versions.results
+            } for collection in all_versions_future.result().results
         ]
 
         collection = response.results[0]
 
         data = serializers.CollectionDetailSerializer(
             collection,
-            context={'namespace': namespace_obj, 'all_versions': all_versions}
+            context={
+                'namespace': namespace_obj,
+                'all_versions': all_versions,
+                'download_counts': downloads.get_collection_counts([(namespace, name)]),
+            }
         ).data
 
         return Response(data)
 
+    @staticmethod
+    def _timed_call(call, func, *args, **kwargs):
+        with metrics.ui_collection_detail_call_seconds.labels(call=call).time():
+            return func(*args, **kwargs)
+
     @staticmethod
     def _query_namespaces(names):
         queryset = models.Namespace.objects.filter(name__in=names)
@@ -129,7 +202,8 @@ class CollectionVersionViewSet(viewsets.GenericViewSet):
             del params['sort']
 
         api = galaxy_pulp.PulpCollectionsApi(pulp.get_client())
-        response = api.list(exclude_fields='docs_blob', **params)
+        response = pulp.response_cache.get_or_call(
+            'pulp_collections', api.list, exclude_fields='docs_blob', **params)
 
         data = serializers.CollectionVersionSerializer(response.results, many=True).data
         return self.paginator.paginate_proxy_response(data, response.count)
@@ -138,7 +212,14 @@ class CollectionVersionViewSet(viewsets.GenericViewSet):
         namespace, name, version = self.kwargs['version'].split('/')
 
         api = galaxy_pulp.PulpCollectionsApi(pulp.get_client())
-        response = api.list(namespace=namespace, name=name, version=version, limit=1)
+        response = pulp.response_cache.get_or_call(
+            'pulp_collections',
+            api.list,
+            namespace=namespace,
+            name=name,
+            version=version,
+            limit=1,
+        )
 
         if not response.results:
             raise NotFound()
@@ -174,6 +255,7 @@ class CollectionVersionViewSet(viewsets.GenericViewSet):
             version=version,
             certification_info=CertificationInfo(certification),
         )
+        pulp.response_cache.invalidate(namespace, name)
         return Response(response)
 
 
@@ -187,12 +269,12 @@ class CollectionImportFilter(filterset.FilterSet):
 
     class Meta:
         model = models.CollectionImport
-        fields = ['namespace', 'name', 'version']
+        fields = ['namespace', 'name', 'version', 'state']
 
 
 class CollectionImportViewSet(viewsets.GenericViewSet):
     lookup_field = 'task_id'
-    queryset = models.CollectionImport.objects.all()
+    queryset = models.CollectionImport.objects.select_related('namespace')
 
     filter_backends = [DjangoFilterBackend]
     filterset_class = CollectionImportFilter
@@ -203,18 +285,20 @@ class CollectionImportViewSet(viewsets.GenericViewSet):
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
 
-        api = galaxy_pulp.GalaxyImportsApi(pulp.get_client())
-
         results = []
-        for task in page:
-            task_info = api.get(prefix=settings.API_PATH_PREFIX, id=str(task.pk))
+        for task, task_info in zip(page, imports.get_task_infos(page)):
             data = serializers.ImportTaskListSerializer(task_info, context={'task_obj': task}).data
             results.append(data)
         return self.get_paginated_response(results)
 
     def retrieve(self, request, *args, **kwargs):
-        api = galaxy_pulp.GalaxyImportsApi(pulp.get_client())
+        query_serializer = serializers.ImportTaskDetailQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        messages_since = query_serializer.validated_data['messages_since']
+
         task = self.get_object()
-        task_info = api.get(prefix=settings.API_PATH_PREFIX, id=self.kwargs['task_id'])
+        task_info = imports.get_task_info(task)
         data = serializers.ImportTaskDetailSerializer(task_info, context={'task_obj': task}).data
+        if messages_since is not None:
+            data = imports.slice_messages(data, messages_since)
         return Response(data)
@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from django_filters import filters
 from django_filters.rest_framework import filterset, DjangoFilterBackend
 
@@ -6,8 +7,9 @@ from rest_framework import viewsets
 
 from rest_framework.settings import api_settings
 
-from galaxy_api.api import models, permissions
+from galaxy_api.api import models, ownership, permissions
 from galaxy_api.api.ui import serializers
+from galaxy_api.auth import models as auth_models
 
 
 class NamespaceFilter(filterset.FilterSet):
@@ -60,7 +62,16 @@ class NamespaceViewSet(
             return serializers.NamespaceSerializer
 
     def get_queryset(self):
-        return models.Namespace.objects.all()
+        return self._select_related_data(models.Namespace.objects.all())
+
+    def _select_related_data(self, queryset):
+        """Limits loaded fields and relations to those serialized by the action."""
+        if self.action == 'list':
+            return queryset.only(*serializers.NamespaceSummarySerializer.Meta.fields)
+        return queryset.prefetch_related(
+            'links',
+            Prefetch('groups', queryset=auth_models.Group.objects.only('name')),
+        )
 
 
 class MyNamespaceViewSet(NamespaceViewSet):
@@ -69,9 +80,9 @@ class MyNamespaceViewSet(NamespaceViewSet):
 
         if permissions.IsPartnerEngineer().has_permission(self.request, self):
             queryset = models.Namespace.objects.all()
-            return queryset
+            return self._select_related_data(queryset)
 
         # Just the namespaces with groups the user is in
-        queryset = models.Namespace.objects.filter(
-            groups__in=self.request.user.groups.all())
-        return queryset
+        namespace_ids = ownership.get_owned_namespaces(self.request)
+        queryset = models.Namespace.objects.filter(pk__in=namespace_ids)
+        return self._select_related_data(queryset)
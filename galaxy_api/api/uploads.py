@@ -0,0 +1,211 @@
+"""Resumable collection artifact upload sessions."""
+
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.move import file_move_safe
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from galaxy_api import constants
+from galaxy_api.api import artifacts, models
+from galaxy_api.api.exceptions import Conflict
+from galaxy_api.api.utils import parse_collection_filename
+
+log = logging.getLogger(__name__)
+
+OPEN = constants.UploadSessionState.OPEN.value
+COMMITTING = constants.UploadSessionState.COMMITTING.value
+QUEUED = constants.UploadSessionState.QUEUED.value
+PUBLISHING = constants.UploadSessionState.PUBLISHING.value
+COMMITTED = constants.UploadSessionState.COMMITTED.value
+
+
+def create_session(namespace, filename, size, sha256=''):
+    """Create an upload session and its empty spool file."""
+    session = models.UploadSession.objects.create(
+        namespace=namespace,
+        filename=filename,
+        size=size,
+        sha256=sha256.lower(),
+    )
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    open(session.path, 'xb').close()
+    return session
+
+
+def write_chunk(session, start, stream, length):
+    """
+    Write ``length`` bytes read from ``stream`` at offset ``start``.
+
+    The chunk is received into a temporary file and copied to the spool
+    file while the session is locked, so that a concurrent commit never
+    reads a partially written artifact and no write starts once the
+    session is committing. Returns the updated session.
+    """
+    _check_open(session)
+
+    with tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+            dir=settings.FILE_UPLOAD_TEMP_DIR) as chunk_fp:
+        written = 0
+        while written < length:
+            chunk = stream.read(min(File.DEFAULT_CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            chunk_fp.write(chunk)
+            written += len(chunk)
+
+        if written != length:
+            raise ValidationError(
+                f'Incomplete chunk received: {written} of {length} bytes.')
+
+        with transaction.atomic():
+            session = models.UploadSession.objects.select_for_update().get(pk=session.pk)
+            _check_open(session)
+            chunk_fp.seek(0)
+            with open(session.path, 'r+b') as fp:
+                fp.seek(start)
+                shutil.copyfileobj(chunk_fp, fp, File.DEFAULT_CHUNK_SIZE)
+            session.add_range(start, start + length)
+            session.save(update_fields=['ranges', 'updated_at'])
+    return session
+
+
+def commit(session, user):
+    """
+    Verify the received artifact and publish it to pulp.
+
+    Returns a tuple of the updated session, Pulp upload response data
+    and status code.
+    """
+    with transaction.atomic():
+        session = models.UploadSession.objects.select_for_update().get(pk=session.pk)
+        _check_open(session)
+        if not session.is_complete:
+            raise ValidationError(
+                f'Upload is incomplete: {session.received} of {session.size} bytes received.')
+        session.state = COMMITTING
+        session.save(update_fields=['state', 'updated_at'])
+
+    try:
+        with open(session.path, 'rb') as fp:
+            digest = _file_sha256(fp)
+            if session.sha256 and session.sha256 != digest:
+                # Received data is corrupt, it has to be sent again
+                session.ranges = []
+                raise ValidationError({'sha256': 'The sha256 checksum of the uploaded file '
+                                                 'does not match.'})
+            artifacts.check_not_imported(
+                session.namespace, parse_collection_filename(session.filename), digest)
+            try:
+                artifacts.inspect(fp, session.filename)
+            except ValueError as exc:
+                raise ValidationError({'file': str(exc)})
+
+            if settings.COLLECTION_PUBLISH_ASYNC:
+                _, upload_response_data, status = artifacts.enqueue(session, digest)
+                return session, upload_response_data, status
+
+            data = artifacts.file_data(fp, session.filename, digest)
+            task, upload_response_data, status = artifacts.publish(
+                session.namespace, data, user)
+    except Exception:
+        session.state = OPEN
+        session.save(update_fields=['state', 'ranges', 'updated_at'])
+        raise
+
+    session.state = COMMITTED
+    session.task = task
+    session.save(update_fields=['state', 'task', 'updated_at'])
+    session.remove_file()
+    return session, upload_response_data, status
+
+
+def spool_file(namespace, file):
+    """
+    Create a complete upload session holding an uploaded file.
+
+    Temporary upload files are moved to the spool directory, others are copied.
+    """
+    session = create_session(namespace, file.name, file.size)
+    if hasattr(file, 'temporary_file_path'):
+        file_move_safe(file.temporary_file_path(), session.path, allow_overwrite=True)
+    else:
+        with open(session.path, 'wb') as fp:
+            for chunk in file.chunks():
+                fp.write(chunk)
+    session.add_range(0, file.size)
+    session.save(update_fields=['ranges', 'updated_at'])
+    return session
+
+
+def enqueue_file(namespace, file, sha256):
+    """
+    Spool an uploaded artifact and queue it for publishing.
+
+    Returns a tuple of the queued import, response data and status code.
+    """
+    with transaction.atomic():
+        session = spool_file(namespace, file)
+        return artifacts.enqueue(session, sha256)
+
+
+def delete_session(session):
+    """Delete an upload session and its spool file."""
+    with transaction.atomic():
+        session = models.UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.state in (COMMITTING, QUEUED, PUBLISHING):
+            raise Conflict(f'Upload session is {session.state}.')
+        session.remove_file()
+        session.delete()
+
+
+def cleanup_sessions(max_age=None):
+    """
+    Delete sessions not updated for ``max_age`` seconds.
+
+    Sessions being committed, queued or published are kept. Sessions left
+    committing for ``UPLOAD_SESSION_COMMIT_TIMEOUT`` seconds by a crashed
+    worker are opened again, so that the commit can be retried, and deleted
+    once expired. Returns number of deleted sessions.
+    """
+    if max_age is None:
+        max_age = settings.UPLOAD_SESSION_MAX_AGE
+    now = timezone.now()
+    expired = now - datetime.timedelta(seconds=max_age)
+
+    # updated_at is kept, so that expired sessions are deleted below
+    stale_commits = now - datetime.timedelta(seconds=settings.UPLOAD_SESSION_COMMIT_TIMEOUT)
+    reopened = models.UploadSession.objects.filter(
+        state=COMMITTING, updated_at__lt=stale_commits).update(state=OPEN)
+    if reopened:
+        log.warning('Reopened %d upload sessions left committing', reopened)
+
+    sessions = models.UploadSession.objects.filter(
+        updated_at__lt=expired).exclude(state__in=(COMMITTING, QUEUED, PUBLISHING))
+    count = 0
+    for session in sessions.iterator():
+        session.remove_file()
+        session.delete()
+        count += 1
+    return count
+
+
+def _check_open(session):
+    if session.state != OPEN:
+        raise Conflict(f'Upload session is {session.state}.')
+
+
+def _file_sha256(fp):
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: fp.read(File.DEFAULT_CHUNK_SIZE), b''):
+        sha256.update(chunk)
+    return sha256.hexdigest()
@@ -1,5 +1,10 @@
 from collections import namedtuple
+import gzip
+import json
+import posixpath
 import re
+import tarfile
+import zlib
 
 
 CollectionFilename = namedtuple("CollectionFilename", ["namespace", "name", "version"])
@@ -45,3 +50,96 @@ def parse_collection_filename(filename):
         raise ValueError(msg.format(version=version, filename=filename))
 
     return CollectionFilename(namespace, name, version)
+
+
+MANIFEST_FILENAME = 'MANIFEST.json'
+MANIFEST_MAX_SIZE = 1024 * 1024
+
+
+def inspect_collection_artifact(fileobj, filename, max_files, max_unpacked_size):
+    """
+    Inspects collection artifact contents.
+
+    Reads the tar.gz archive sequentially without extracting it. Validates
+    member paths, number of files and total unpacked size, and checks that
+    MANIFEST.json collection info matches the artifact filename.
+    Returns the manifest collection info. Raises ValueError if the artifact
+    is not valid.
+    """
+    expected = parse_collection_filename(filename)
+
+    collection_info = None
+    files = 0
+    unpacked_size = 0
+
+    fileobj.seek(0)
+    try:
+        # GzipFile bounds decompressed chunk sizes, unlike tarfile 'r|gz' mode
+        with gzip.GzipFile(fileobj=fileobj, mode='rb') as gz, \
+                tarfile.open(fileobj=gz, mode='r|') as tar:
+            while True:
+                member = tar.next()
+                if member is None:
+                    break
+                # Do not keep headers of all members in memory
+                tar.members = []
+
+                files += 1
+                if files > max_files:
+                    raise ValueError(
+                        f"Artifact {filename} contains more than {max_files} files.")
+                unpacked_size += member.size
+                if unpacked_size > max_unpacked_size:
+                    raise ValueError(
+                        f"Artifact {filename} unpacked size exceeds {max_unpacked_size} bytes.")
+
+                name = _check_member(member)
+                if name == MANIFEST_FILENAME and member.isfile():
+                    collection_info = _read_manifest(tar, member)
+    # gzip raises OSError for data that is not gzip compressed
+    except (tarfile.TarError, EOFError, OSError, zlib.error) as exc:
+        raise ValueError(f"Artifact {filename} is not a valid tar.gz archive: {exc}")
+
+    if collection_info is None:
+        raise ValueError(f"Artifact {filename} does not contain {MANIFEST_FILENAME}.")
+
+    for field, value in expected._asdict().items():
+        if collection_info.get(field) != value:
+            msg = "{manifest} {field} '{actual}' does not match filename {filename}."
+            raise ValueError(msg.format(manifest=MANIFEST_FILENAME, field=field,
+                                        actual=collection_info.get(field), filename=filename))
+    return collection_info
+
+
+def _check_member(member):
+    """Validates archive member type and path. Returns normalized member path."""
+    name = posixpath.normpath(member.name)
+    if not (member.isfile() or member.isdir() or member.issym() or member.islnk()):
+        raise ValueError(f"Artifact member {member.name} has unsupported type.")
+    if _is_outside(name):
+        raise ValueError(f"Artifact member {member.name} has invalid path.")
+    if member.issym() and _is_outside(
+            posixpath.join(posixpath.dirname(name), member.linkname)):
+        raise ValueError(f"Artifact member {member.name} links outside of the archive.")
+    if member.islnk() and _is_outside(member.linkname):
+        raise ValueError(f"Artifact member {member.name} links outside of the archive.")
+    return name
+
+
+def _is_outside(path):
+    path = posixpath.normpath(path)
+    return path.startswith('/') or path == '..' or path.startswith('../')
+
+
+def _read_manifest(tar, member):
+    if member.size > MANIFEST_MAX_SIZE:
+        raise ValueError(f"{MANIFEST_FILENAME} exceeds {MANIFEST_MAX_SIZE} bytes.")
+    try:
+        manifest = json.loads(tar.extractfile(member).read())
+    except ValueError as exc:
+        raise ValueError(f"{MANIFEST_FILENAME} is not valid JSON: {exc}")
+
+    collection_info = manifest.get('collection_info') if isinstance(manifest, dict) else None
+    if not isinstance(collection_info, dict):
+        raise ValueError(f"{MANIFEST_FILENAME} does not contain collection_info.")
+    return collection_info
@@ -1,9 +1,11 @@
 import logging
 import mimetypes
 
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError, _get_error_details
 
+from galaxy_api.api.models import UploadSession
 from galaxy_api.api.utils import parse_collection_filename
 
 logger = logging.getLogger(__name__)
@@ -45,3 +47,77 @@ class CollectionUploadSerializer(serializers.Serializer):
             "mimetype": (mimetypes.guess_type(filename)[0] or 'application/octet-stream')
         })
         return data
+
+    def validate_file(self, value):
+        _validate_artifact_size(value.size)
+        return value
+
+    def validate(self, data):
+        """
+        Verify sha256 of the uploaded artifact, computed while it was received.
+
+        Artifact contents are inspected by the view, after permission checks.
+        """
+        digest = self.context.get('digests', {}).get('file')
+        if digest is not None:
+            if data['sha256'] and data['sha256'].lower() != digest:
+                logger.error('CollectionUploadSerializer sha256 mismatch: '
+                             'expected %s, computed %s', data['sha256'], digest)
+                raise ValidationError({'sha256': 'The sha256 checksum of the uploaded file '
+                                                 'does not match.'})
+            data['sha256'] = digest
+        return data
+
+
+def _validate_artifact_size(size):
+    if size > settings.COLLECTION_MAX_SIZE:
+        raise ValidationError(
+            f'Artifact size exceeds the limit of {settings.COLLECTION_MAX_SIZE} bytes.')
+
+
+class ImportTaskQuerySerializer(serializers.Serializer):
+    """
+    A serializer for import task detail query parameters.
+    """
+
+    wait = serializers.IntegerField(required=False, default=0, min_value=0)
+    since_state = serializers.CharField(required=False, default=None)
+    since_messages = serializers.IntegerField(required=False, default=None, min_value=0)
+    messages_since = serializers.IntegerField(required=False, default=None, min_value=0)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    A serializer for resumable collection artifact upload sessions.
+    """
+
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, default='')
+    received = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            'id',
+            'filename',
+            'size',
+            'sha256',
+            'state',
+            'ranges',
+            'received',
+            'task',
+            'created_at',
+            'updated_at',
+        )
+        read_only_fields = ('state', 'ranges', 'task')
+        extra_kwargs = {'size': {'min_value': 1}}
+
+    def validate_size(self, value):
+        _validate_artifact_size(value)
+        return value
+
+    def validate_filename(self, value):
+        try:
+            parse_collection_filename(value)
+        except ValueError as exc:
+            raise ValidationError(_get_error_details(exc))
+        return value
@@ -32,6 +32,20 @@ urlpatterns = [
         'artifacts/collections/',
         viewsets.CollectionArtifactUploadView.as_view(),
     ),
+    path(
+        'artifacts/collections/uploads/',
+        viewsets.UploadSessionViewSet.as_view({'post': 'create'}),
+    ),
+    path(
+        'artifacts/collections/uploads/<uuid:pk>/',
+        viewsets.UploadSessionViewSet.as_view(
+            {'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}),
+        name='collection-upload-sessions',
+    ),
+    path(
+        'artifacts/collections/uploads/<uuid:pk>/commit/',
+        viewsets.UploadSessionViewSet.as_view({'post': 'commit'}),
+    ),
     path(
         'artifacts/collections/<str:filename>',
         viewsets.CollectionArtifactDownloadView.as_view(),
@@ -11,16 +11,23 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import functools
 import json
 import logging
+import mimetypes
+import re
 from urllib import parse as urlparse
 
 import requests
 from django.conf import settings
 import galaxy_pulp
 from django.core.exceptions import ValidationError
-from django.http import StreamingHttpResponse, HttpResponseRedirect
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from rest_framework import views
+from rest_framework import exceptions
 from rest_framework.exceptions import APIException, NotFound
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
@@ -28,10 +35,18 @@ from rest_framework import viewsets
 from rest_framework.settings import api_settings
 
 from galaxy_api.api.models import Namespace
-from galaxy_api.api.v3.serializers import CollectionSerializer, CollectionUploadSerializer
+from galaxy_api.api.v3.serializers import (
+    CollectionSerializer,
+    CollectionUploadSerializer,
+    ImportTaskQuerySerializer,
+    UploadSessionSerializer,
+)
 from galaxy_api.common import pulp
+from galaxy_api.common.artifact_cache import artifact_cache
 from galaxy_api.common import metrics
-from galaxy_api.api import permissions, models
+from galaxy_api.common import uploadhandlers
+from galaxy_api.api import admission, artifacts, downloads, imports, permissions, models, uploads
+from galaxy_api.api.utils import parse_collection_filename
 from galaxy_api import constants
 
 log = logging.getLogger(__name__)
@@ -53,18 +68,29 @@ class CollectionViewSet(viewsets.GenericViewSet):
         })
 
         api = galaxy_pulp.GalaxyCollectionsApi(pulp.get_client())
-        response = api.list(prefix=settings.API_PATH_PREFIX, **params)
+        if settings.PULP_API_PASSTHROUGH:
+            content = pulp.response_cache.get_or_call(
+                'collections', api.list, raw=True, prefix=settings.API_PATH_PREFIX, **params)
+            return self.paginator.paginate_raw_proxy_response(json.loads(content))
+
+        response = pulp.response_cache.get_or_call(
+            'collections', api.list, prefix=settings.API_PATH_PREFIX, **params)
         return self.paginator.paginate_proxy_response(response.results, response.count)
 
     def retrieve(self, request, *args, **kwargs):
         api = galaxy_pulp.GalaxyCollectionsApi(pulp.get_client())
 
-        response = api.get(
+        response = pulp.response_cache.get_or_call(
+            'collections',
+            api.get,
+            raw=settings.PULP_API_PASSTHROUGH,
             prefix=settings.API_PATH_PREFIX,
             namespace=self.kwargs['namespace'],
             name=self.kwargs['name']
         )
 
+        if settings.PULP_API_PASSTHROUGH:
+            return HttpResponse(response, content_type='application/json')
         return Response(response)
 
     def update(self, request, *args, **kwargs):
@@ -88,6 +114,7 @@ class CollectionViewSet(viewsets.GenericViewSet):
             name=name,
             collection=collection,
         )
+        pulp.response_cache.invalidate(namespace, name)
 
         return Response(response.to_dict())
 
@@ -105,22 +132,35 @@ class CollectionVersionViewSet(viewsets.GenericViewSet):
         })
 
         api = galaxy_pulp.GalaxyCollectionVersionsApi(pulp.get_client())
-        response = api.list(
+        response = pulp.response_cache.get_or_call(
+            'collection_versions',
+            api.list,
+            raw=settings.PULP_API_PASSTHROUGH,
             prefix=settings.API_PATH_PREFIX,
             namespace=self.kwargs['namespace'],
             name=self.kwargs['name'],
             **params,
         )
 
+        if settings.PULP_API_PASSTHROUGH:
+            page = json.loads(response)
+            results = page['results']
+        else:
+            results = response.results
+
         # Consider an empty list of versions as a 404 on the Collection
-        if not response.results:
+        if not results:
             raise NotFound()
 
+        if settings.PULP_API_PASSTHROUGH:
+            return self.paginator.paginate_raw_proxy_response(page)
         return self.paginator.paginate_proxy_response(response.results, response.count)
 
     def retrieve(self, request, *args, **kwargs):
         api = galaxy_pulp.GalaxyCollectionVersionsApi(pulp.get_client())
-        response = api.get(
+        response = pulp.response_cache.get_or_call(
+            'collection_versions',
+            api.get,
             prefix=settings.API_PATH_PREFIX,
             namespace=self.kwargs['namespace'],
             name=self.kwargs['name'],
@@ -141,9 +181,48 @@ class CollectionVersionViewSet(viewsets.GenericViewSet):
 class CollectionImportViewSet(viewsets.ViewSet):
 
     def retrieve(self, request, pk):
-        api = galaxy_pulp.GalaxyImportsApi(pulp.get_client())
-        response = api.get(prefix=settings.API_PATH_PREFIX, id=pk)
-        return Response(response.to_dict())
+        """
+        Returns import task details.
+
+        With the ``wait`` query parameter, the response is delayed for up to
+        ``wait`` seconds until the task state differs from ``since_state``
+        or its message count from ``since_messages`` (defaults to
+        ``messages_since``).
+
+        With the ``messages_since`` query parameter, only messages after
+        that cursor are returned together with the ``next_messages_since``
+        cursor.
+        """
+        serializer = ImportTaskQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        messages_since = params['messages_since']
+
+        try:
+            task = models.CollectionImport.objects.select_related('namespace').get(pk=pk)
+        except (models.CollectionImport.DoesNotExist, ValidationError):
+            # Not an import tracked by galaxy-api, ask pulp
+            api = galaxy_pulp.GalaxyImportsApi(pulp.get_client())
+            response = api.get(prefix=settings.API_PATH_PREFIX, id=pk)
+        else:
+            wait = min(params['wait'], settings.IMPORT_TASK_MAX_WAIT)
+            if wait:
+                since_messages = params['since_messages']
+                if since_messages is None:
+                    since_messages = messages_since
+                response = imports.wait_for_task_info(
+                    task,
+                    timeout=wait,
+                    since_state=params['since_state'],
+                    since_messages=since_messages,
+                )
+            else:
+                response = imports.get_task_info(task)
+
+        data = response.to_dict()
+        if messages_since is not None:
+            data = imports.slice_messages(data, messages_since)
+        return Response(data)
 
 
 class CollectionArtifactUploadView(views.APIView):
@@ -153,87 +232,147 @@ class CollectionArtifactUploadView(views.APIView):
 
     def post(self, request, *args, **kwargs):
         metrics.collection_import_attempts.inc()
-        serializer = CollectionUploadSerializer(data=request.data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
 
+        # Admit the upload before its body is received, namespace is known only afterwards
+        with admission.upload_slot():
+            # Compute the digest as the file is received, before request data is parsed
+            upload_handler = uploadhandlers.Sha256UploadHandler(request)
+            request.upload_handlers.insert(0, upload_handler)
+
+            serializer = CollectionUploadSerializer(
+                data=request.data,
+                context={'request': request, 'digests': upload_handler.digests},
+            )
+            serializer.is_valid(raise_exception=True)
+
+            data = serializer.validated_data
+            filename = data['filename']
+
+            try:
+                namespace = Namespace.objects.get(name=filename.namespace)
+            except Namespace.DoesNotExist:
+                raise ValidationError(
+                    'Namespace "{0}" does not exist.'.format(filename.namespace)
+                )
+
+            self.check_object_permissions(request, namespace)
+            artifacts.check_not_imported(namespace, filename, data['sha256'])
+            # Unpacking is expensive, rejected uploads are not inspected
+            try:
+                artifacts.inspect(data['file'], data['file'].name)
+            except ValueError as exc:
+                log.error('Collection artifact validation failed: %s', exc)
+                raise exceptions.ValidationError({'file': str(exc)})
+
+            with admission.upload_slot(namespace):
+                if settings.COLLECTION_PUBLISH_ASYNC:
+                    _, upload_response_data, status = uploads.enqueue_file(
+                        namespace, data['file'], data['sha256'])
+                else:
+                    _, upload_response_data, status = artifacts.publish(
+                        namespace, data, request.user)
+
+        metrics.collection_import_successes.inc()
+        return Response(data=upload_response_data, status=status)
+
+
+class UploadSessionViewSet(viewsets.GenericViewSet):
+    """
+    Resumable collection artifact uploads.
+
+    A session is created for an artifact file name and size, artifact data
+    is sent in one or more ``PUT`` requests with ``Content-Range`` header
+    and the session is committed to publish the artifact.
+    """
+
+    CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES + [
+        permissions.IsNamespaceOwner,
+    ]
+    serializer_class = UploadSessionSerializer
+    queryset = models.UploadSession.objects.select_related('namespace')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
-        filename = data['filename']
 
+        filename = parse_collection_filename(data['filename'])
         try:
             namespace = Namespace.objects.get(name=filename.namespace)
         except Namespace.DoesNotExist:
-            raise ValidationError(
-                'Namespace "{0}" does not exist.'.format(filename.namespace)
-            )
-
+            raise exceptions.ValidationError({
+                'filename': 'Namespace "{0}" does not exist.'.format(filename.namespace)
+            })
         self.check_object_permissions(request, namespace)
-        api = pulp.get_client()
-        url = '{host}/{prefix}/{path}'.format(
-            host=api.configuration.host,
-            path='v3/artifacts/collections/',
-            prefix=settings.API_PATH_PREFIX
-        )
-        headers = {}
-        headers.update(api.default_headers)
-        headers.update({'Content-Type': 'multipart/form-data'})
+        artifacts.check_not_imported(namespace, filename, data['sha256'])
 
-        api.update_params_for_auth(headers, tuple(), api.configuration.auth_settings())
+        session = uploads.create_session(
+            namespace, data['filename'], data['size'], data['sha256'])
+        return Response(self.get_serializer(session).data, status=201)
 
-        post_params = self._prepare_post_params(data)
-        try:
-            upload_response = api.request(
-                'POST',
-                url,
-                headers=headers,
-                post_params=post_params,
-            )
-        except galaxy_pulp.ApiException:
-            log.exception('Failed to publish artifact %s (namespace=%s, sha256=%s) to pulp at url=%s',  # noqa
-                          data['file'].name, namespace, data.get('sha256'), url)
-            raise
-
-        upload_response_data = json.loads(upload_response.data)
-
-        task_detail = api.call_api(
-            upload_response_data['task'],
-            'GET',
-            auth_settings=['BasicAuth'],
-            response_type='CollectionImport',
-            _return_http_data_only=True,
-        )
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_object()).data)
 
-        log.info('Publishing of artifact %s to namespace=%s by user=%s created pulp import task_id=%s', # noqa
-                 data['file'].name, namespace, request.user, task_detail.id)
+    def update(self, request, *args, **kwargs):
+        session = self.get_object()
+        start, length = self._parse_content_range(request, session)
+        with admission.upload_slot(), admission.upload_slot(session.namespace):
+            session = uploads.write_chunk(session, start, request.stream, length)
+        return Response(self.get_serializer(session).data)
 
-        models.CollectionImport.objects.create(
-            task_id=task_detail.id,
-            created_at=task_detail.created_at,
-            namespace=namespace,
-            name=data['filename'].name,
-            version=data['filename'].version,
-        )
+    def destroy(self, request, *args, **kwargs):
+        uploads.delete_session(self.get_object())
+        return Response(status=204)
 
+    def commit(self, request, *args, **kwargs):
+        metrics.collection_import_attempts.inc()
+        session = self.get_object()
+        with admission.upload_slot(), admission.upload_slot(session.namespace):
+            _, upload_response_data, status = uploads.commit(session, request.user)
         metrics.collection_import_successes.inc()
-        return Response(data=upload_response_data, status=upload_response.status)
+        return Response(data=upload_response_data, status=status)
 
-    @staticmethod
-    def _prepare_post_params(data):
-        filename = data['filename']
-        post_params = [
-            ('file', (data['file'].name, data['file'].read(), data['mimetype'])),
-            ('expected_namespace', filename.namespace),
-            ('expected_name', filename.name),
-            ('expected_version', filename.version),
-        ]
-        if data['sha256']:
-            post_params.append(('sha256', data['sha256']))
-        return post_params
+    def _parse_content_range(self, request, session):
+        """Returns start offset and length of the chunk sent in request body."""
+        match = self.CONTENT_RANGE_RE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        if not match:
+            raise exceptions.ParseError('Missing or invalid Content-Range header.')
+
+        start, end, size = match.groups()
+        start, end = int(start), int(end) + 1
+        if start >= end or end > session.size or size not in ('*', str(session.size)):
+            raise exceptions.ParseError('Content-Range does not match the upload size.')
+
+        length = end - start
+        if length > settings.UPLOAD_SESSION_MAX_CHUNK_SIZE:
+            raise exceptions.ParseError('Chunk size exceeds the limit of {0} bytes.'.format(
+                settings.UPLOAD_SESSION_MAX_CHUNK_SIZE))
+        if int(request.META.get('CONTENT_LENGTH') or 0) != length:
+            raise exceptions.ParseError('Content-Length does not match Content-Range.')
+        return start, length
 
 
 class CollectionArtifactDownloadView(views.APIView):
+    # Range and conditional request headers passed to content app
+    PROXY_REQUEST_HEADERS = ('Range', 'If-Range', 'If-None-Match', 'If-Modified-Since')
+    # Content app response headers passed to clients
+    PROXY_RESPONSE_HEADERS = (
+        'Content-Length', 'Content-Range', 'Content-Encoding', 'Accept-Ranges', 'ETag',
+        'Last-Modified',
+    )
+    # Content app response headers stored with cached artifacts and sent on cache hits
+    CACHED_RESPONSE_HEADERS = ('Accept-Ranges', 'ETag', 'Last-Modified')
+
     def get(self, request, *args, **kwargs):
         metrics.collection_artifact_download_attempts.inc()
 
+        offload_response = self._offload_response(self.kwargs['filename'])
+        if offload_response is not None:
+            self._count_download(request)
+            return offload_response
+
         # NOTE(cutwater): Using urllib3 because it's already a dependency of pulp_galaxy
         url = 'http://{host}:{port}/{prefix}/automation-hub/{filename}'.format(
             host=settings.PULP_CONTENT_HOST,
@@ -241,7 +380,39 @@ class CollectionArtifactDownloadView(views.APIView):
             prefix=settings.PULP_CONTENT_PATH_PREFIX.strip('/'),
             filename=self.kwargs['filename'],
         )
-        response = requests.get(url, stream=True, allow_redirects=False)
+        headers = {
+            name: request.headers[name]
+            for name in self.PROXY_REQUEST_HEADERS if name in request.headers
+        }
+
+        # Range and conditional requests are always answered by content app
+        cacheable = artifact_cache.enabled and request.method == 'GET' and not headers
+        # Cache was already looked up in sendfile mode
+        sendfile = settings.ARTIFACT_DOWNLOAD_MODE == constants.ArtifactDownloadMode.SENDFILE.value
+        if cacheable and not sendfile:
+            fp = artifact_cache.open(self.kwargs['filename'])
+            if fp is not None:
+                metrics.collection_artifact_download_successes.inc()
+                self._count_download(request)
+                cached_response = FileResponse(
+                    fp, content_type=_guess_content_type(self.kwargs['filename']))
+                for name, value in artifact_cache.get_headers(self.kwargs['filename']).items():
+                    cached_response[name] = value
+                return cached_response
+
+        try:
+            response = pulp.get_content_session().request(
+                'HEAD' if request.method == 'HEAD' else 'GET', url, headers=headers,
+                stream=True, allow_redirects=False, timeout=pulp.get_content_timeout())
+        except requests.RequestException as exc:
+            metrics.collection_artifact_download_failures.labels(status='error').inc()
+            raise APIException(f'Failed to connect to content app: {exc}.')
+
+        streamed = request.method != 'HEAD' and response.status_code in (
+            requests.codes.ok, requests.codes.partial_content)
+        if not streamed:
+            # Read the short body so that the connection is returned to the pool
+            response.content
 
         if response.status_code == requests.codes.not_found:
             metrics.collection_artifact_download_failures.labels(status=requests.codes.not_found).inc() # noqa
@@ -250,14 +421,123 @@ class CollectionArtifactDownloadView(views.APIView):
         if response.status_code == requests.codes.found:
             return HttpResponseRedirect(response.headers['Location'])
 
-        if response.status_code == requests.codes.ok:
+        if response.status_code == requests.codes.not_modified:
             metrics.collection_artifact_download_successes.inc()
+            return self._proxy_response(HttpResponseNotModified(), response)
 
-            return StreamingHttpResponse(
-                response.iter_content(chunk_size=4096),
-                content_type=response.headers['Content-Type']
-            )
+        if response.status_code == requests.codes.range_not_satisfiable:
+            metrics.collection_artifact_download_failures.labels(status=response.status_code).inc() # noqa
+            return self._proxy_response(HttpResponse(status=response.status_code), response)
+
+        if response.status_code in (requests.codes.ok, requests.codes.partial_content):
+            metrics.collection_artifact_download_successes.inc()
+
+            if streamed:
+                cache_writer = None
+                # Encoded content is passed as is, but cached artifacts are served without encoding
+                if (cacheable and response.status_code == requests.codes.ok
+                        and 'Content-Encoding' not in response.headers):
+                    size = response.headers.get('Content-Length')
+                    cached_headers = {
+                        name: response.headers[name]
+                        for name in self.CACHED_RESPONSE_HEADERS if name in response.headers
+                    }
+                    cache_writer = artifact_cache.writer(
+                        self.kwargs['filename'], size=int(size) if size else None,
+                        headers=cached_headers)
+                on_complete = None
+                if response.status_code == requests.codes.ok:
+                    on_complete = functools.partial(self._count_download, request)
+                proxy_response = StreamingHttpResponse(
+                    _stream_content(response, settings.PULP_CONTENT_CHUNK_SIZE,
+                                    cache_writer, on_complete),
+                    status=response.status_code,
+                )
+            else:
+                proxy_response = HttpResponse(status=response.status_code)
+            content_type = response.headers.get('Content-Type')
+            if content_type:
+                proxy_response['Content-Type'] = content_type
+            return self._proxy_response(proxy_response, response)
 
         metrics.collection_artifact_download_failures.labels(status=response.status_code).inc()
         raise APIException('Unexpected response from content app. '
                            f'Code: {response.status_code}.')
+
+    def _count_download(self, request):
+        # Proxied downloads are counted when the whole content was streamed.
+        # Bodies of cached and offloaded downloads are sent by the web server,
+        # those are counted when the response is handed over.
+        # Resumed downloads and HEAD requests are not counted
+        if request.method != 'GET' or 'Range' in request.headers:
+            return
+        try:
+            filename = parse_collection_filename(self.kwargs['filename'])
+        except ValueError:
+            return
+        downloads.download_counter.add(filename.namespace, filename.name, filename.version)
+
+    def _offload_response(self, filename):
+        """Returns response leaving the download to the web server, if configured."""
+        mode = settings.ARTIFACT_DOWNLOAD_MODE
+        if mode == constants.ArtifactDownloadMode.ACCEL_REDIRECT.value:
+            location = settings.ARTIFACT_DOWNLOAD_ACCEL_REDIRECT_LOCATION.rstrip('/')
+            header, value = 'X-Accel-Redirect', f'{location}/{urlparse.quote(filename)}'
+        elif mode == constants.ArtifactDownloadMode.SENDFILE.value and artifact_cache.enabled:
+            path = artifact_cache.get_path(filename)
+            if path is None:
+                return None
+            header, value = 'X-Sendfile', path
+        else:
+            return None
+
+        metrics.collection_artifact_download_successes.inc()
+        metrics.collection_artifact_download_offloads.labels(mode=mode).inc()
+        response = HttpResponse(content_type=_guess_content_type(filename))
+        response[header] = value
+        return response
+
+    def _proxy_response(self, proxy_response, response):
+        for name in self.PROXY_RESPONSE_HEADERS:
+            if name in response.headers:
+                proxy_response[name] = response.headers[name]
+        return proxy_response
+
+
+def _stream_content(response, chunk_size, cache_writer=None, on_complete=None):
+    """
+    Yields response content, returning the connection to the pool when done.
+
+    Content is not decoded, so that it matches the forwarded Content-Length,
+    Content-Range and Content-Encoding headers. It's also written by
+    ``cache_writer`` if given, it's committed to the cache only if the whole
+    content was streamed. ``on_complete`` is called after the whole content
+    was streamed.
+    """
+    completed = False
+    try:
+        for chunk in response.raw.stream(chunk_size, decode_content=False):
+            if cache_writer is not None:
+                cache_writer.write(chunk)
+            yield chunk
+        completed = True
+        if on_complete is not None:
+            try:
+                on_complete()
+            except Exception:
+                # The content was already sent, don't break the response
+                log.exception('Failed to complete download of %s', response.url)
+    finally:
+        response.close()
+        if cache_writer is not None:
+            if completed:
+                cache_writer.commit()
+            else:
+                cache_writer.discard()
+
+
+def _guess_content_type(filename):
+    content_type, encoding = mimetypes.guess_type(filename)
+    if encoding == 'gzip':
+        return 'application/gzip'
+    return content_type or 'application/octet-stream'
@@ -4,3 +4,6 @@ from django import apps
 class AppConfig(apps.AppConfig):
     name = 'galaxy_api.auth'
     label = 'galaxy_auth'
+
+    def ready(self):
+        from galaxy_api.auth import signals  # noqa: F401
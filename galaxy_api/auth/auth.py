@@ -1,24 +1,127 @@
 import base64
+import collections
+import hashlib
 import json
+import threading
+import time
 
 from django.conf import settings
+from django.core.cache import caches
 from django.db import transaction
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import BasePermission
 
 from galaxy_api.auth.models import Group, User
+from galaxy_api.common import metrics
 
 
 RH_ACCOUNT_SCOPE = 'rh-identity-account'
 
 
+class IdentityCache:
+    """
+    Maps hashes of identity headers to decoded headers and user IDs.
+
+    Holds at most ``RH_IDENTITY_CACHE_SIZE`` least recently used entries
+    per worker process for ``RH_IDENTITY_CACHE_TIMEOUT`` seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        """Returns a tuple of decoded header and user ID, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, header, user_id):
+        max_size = settings.RH_IDENTITY_CACHE_SIZE
+        if not max_size:
+            return
+        expires = time.monotonic() + settings.RH_IDENTITY_CACHE_TIMEOUT
+        with self._lock:
+            self._entries[key] = (expires, (header, user_id))
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def make_key(raw):
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        return hashlib.sha256(raw).digest()
+
+
+identity_cache = IdentityCache()
+
+
+def get_user_groups(request):
+    """
+    Returns groups of the request user as a dict mapping names to IDs.
+
+    Groups are loaded once per request, and shared by requests of the user
+    for ``USER_GROUPS_CACHE_TIMEOUT`` seconds if it's set.
+    """
+    groups = getattr(request, '_user_groups', None)
+    if groups is None:
+        groups = _load_user_groups(request.user)
+        request._user_groups = groups
+    return groups
+
+
+def invalidate_user_groups(user_ids):
+    """Drops groups of users shared by requests."""
+    caches[settings.USER_GROUPS_CACHE_ALIAS].delete_many(
+        [_user_groups_key(user_id) for user_id in user_ids])
+
+
+def _load_user_groups(user):
+    if not user or not user.is_authenticated:
+        return {}
+
+    timeout = settings.USER_GROUPS_CACHE_TIMEOUT
+    if not timeout:
+        return dict(user.groups.values_list('name', 'pk'))
+
+    cache = caches[settings.USER_GROUPS_CACHE_ALIAS]
+    key = _user_groups_key(user.pk)
+    groups = cache.get(key)
+    if groups is None:
+        groups = dict(user.groups.values_list('name', 'pk'))
+        cache.set(key, groups, timeout)
+    return groups
+
+
+def _user_groups_key(user_id):
+    return f'galaxy_api:user_groups:{user_id}'
+
+
 class RHIdentityAuthentication(BaseAuthentication):
     """
     Authenticates users based on RedHat identity header.
 
     For users logging in first time creates User record and
     Tenant record for user's account if it doesn't exist.
+    Users of recently seen headers are looked up by ID from
+    ``identity_cache``, without decoding the header again.
     """
 
     header = 'HTTP_X_RH_IDENTITY'
@@ -33,7 +136,21 @@ class RHIdentityAuthentication(BaseAuthentication):
         if self.header not in request.META:
             return None
 
-        header = self._decode_header(request.META[self.header])
+        raw = request.META[self.header]
+        key = identity_cache.make_key(raw)
+        cached = identity_cache.get(key)
+        if cached is not None:
+            header, user_id = cached
+            try:
+                user = User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                identity_cache.delete(key)
+            else:
+                metrics.rh_identity_cache_hits.inc()
+                return user, {'rh_identity': header}
+        metrics.rh_identity_cache_misses.inc()
+
+        header = self._decode_header(raw)
 
         try:
             identity = header['identity']
@@ -48,27 +165,37 @@ class RHIdentityAuthentication(BaseAuthentication):
         first_name = user.get('first_name', '')
         last_name = user.get('last_name', '')
 
-        group, _ = Group.objects.get_or_create_identity(RH_ACCOUNT_SCOPE, account)
-
         user = self._ensure_user(
             username,
-            group,
+            account,
             email=email,
             first_name=first_name,
             last_name=last_name
         )
+        identity_cache.set(key, header, user.pk)
 
         return user, {'rh_identity': header}
 
     @staticmethod
-    def _ensure_user(username, group, **attrs):
-        with transaction.atomic():
-            user, created = User.objects.update_or_create(
-                username=username,
-                defaults=attrs,
-            )
-            if created:
-                user.groups.add(group)
+    def _ensure_user(username, account, **attrs):
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            group, _ = Group.objects.get_or_create_identity(RH_ACCOUNT_SCOPE, account)
+            with transaction.atomic():
+                user, created = User.objects.update_or_create(
+                    username=username,
+                    defaults=attrs,
+                )
+                if created:
+                    user.groups.add(group)
+            return user
+
+        # Write only attributes that changed since the user was last seen
+        changed = [name for name, value in attrs.items() if getattr(user, name) != value]
+        if changed:
+            for name in changed:
+                setattr(user, name, attrs[name])
+            user.save(update_fields=changed)
         return user
 
     @staticmethod
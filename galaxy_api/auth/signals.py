@@ -0,0 +1,24 @@
+from django.contrib.auth import models as django_auth_models
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from galaxy_api.auth.auth import invalidate_user_groups
+from galaxy_api.auth.models import Group, User
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drops cached groups of users added to or removed from groups."""
+    if reverse and action == 'pre_clear':
+        invalidate_user_groups(instance.user_set.values_list('pk', flat=True))
+    elif not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_user_groups([instance.pk])
+    elif reverse and action in ('post_add', 'post_remove'):
+        invalidate_user_groups(pk_set)
+
+
+@receiver(pre_delete, sender=Group)
+@receiver(pre_delete, sender=django_auth_models.Group)
+def group_deleted(sender, instance, **kwargs):
+    """Drops cached groups of members of deleted groups."""
+    invalidate_user_groups(instance.user_set.values_list('pk', flat=True))
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+from galaxy_api.common import metrics
+
+log = logging.getLogger(__name__)
+
+TEMP_PREFIX = '.tmp-'
+# Response headers of a cached artifact are stored next to it in a file with this suffix
+HEADERS_SUFFIX = '.headers'
+# Temporary files of writes interrupted by a crash are removed after this many seconds
+TEMP_MAX_AGE = 60 * 60
+
+
+class ArtifactCache:
+    """
+    Caches collection artifacts downloaded from Pulp content app on local disk.
+
+    Artifacts are immutable per file name, so cached files never need to be
+    revalidated. Files are written to a temporary file and renamed into
+    place when complete, so readers in other processes never see partial
+    artifacts. The total size is bounded by ``ARTIFACT_CACHE_MAX_SIZE``,
+    least recently used artifacts (by file modification time, updated on
+    every hit) are evicted first. Response headers given to the writer, like
+    validators of the artifact, are stored along with it.
+    """
+
+    @property
+    def enabled(self):
+        return bool(settings.ARTIFACT_CACHE_DIR)
+
+    def open(self, filename):
+        """Returns cached artifact opened for reading or None."""
+        path = self._path(filename)
+        try:
+            fp = open(path, 'rb')
+        except FileNotFoundError:
+            metrics.artifact_cache_misses.inc()
+            return None
+        self._hit(path, os.fstat(fp.fileno()).st_size)
+        return fp
+
+    def get_headers(self, filename):
+        """Returns response headers stored with cached artifact."""
+        try:
+            with open(self._path(filename) + HEADERS_SUFFIX, 'r') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+    def get_path(self, filename):
+        """
+        Returns path of cached artifact or None.
+
+        The artifact may be evicted before the caller reads it, unlike
+        an artifact returned by ``open``.
+        """
+        path = self._path(filename)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            metrics.artifact_cache_misses.inc()
+            return None
+        self._hit(path, size)
+        return path
+
+    def writer(self, filename, size=None, headers=None):
+        """
+        Returns a writer caching artifact content and response ``headers``,
+        or None if the artifact of given ``size`` can't be cached.
+        """
+        if size is not None and size > settings.ARTIFACT_CACHE_MAX_SIZE:
+            return None
+        try:
+            os.makedirs(settings.ARTIFACT_CACHE_DIR, exist_ok=True)
+            fp = tempfile.NamedTemporaryFile(
+                dir=settings.ARTIFACT_CACHE_DIR, prefix=TEMP_PREFIX, delete=False)
+        except OSError:
+            log.exception('Failed to create artifact cache file for %s', filename)
+            return None
+        return CacheWriter(self, fp, self._path(filename), size, headers)
+
+    def evict(self):
+        """Removes least recently used artifacts exceeding the cache size limit."""
+        entries = []
+        now = time.time()
+        with os.scandir(settings.ARTIFACT_CACHE_DIR) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(TEMP_PREFIX):
+                    if now - stat.st_mtime > TEMP_MAX_AGE:
+                        _remove(entry.path)
+                    continue
+                if entry.name.endswith(HEADERS_SUFFIX):
+                    # Removed with the artifact
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        metrics.artifact_cache_size_bytes.set(total_size)
+        if total_size <= settings.ARTIFACT_CACHE_MAX_SIZE:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= settings.ARTIFACT_CACHE_MAX_SIZE:
+                break
+            _remove(path)
+            _remove(path + HEADERS_SUFFIX)
+            total_size -= size
+            metrics.artifact_cache_evictions.inc()
+        metrics.artifact_cache_size_bytes.set(total_size)
+
+    def clear(self):
+        if os.path.isdir(settings.ARTIFACT_CACHE_DIR):
+            with os.scandir(settings.ARTIFACT_CACHE_DIR) as it:
+                for entry in it:
+                    _remove(entry.path)
+
+    @staticmethod
+    def _hit(path, size):
+        try:
+            os.utime(path)
+        except OSError:
+            # Evicted meanwhile, an open file is still readable
+            pass
+        metrics.artifact_cache_hits.inc()
+        metrics.artifact_cache_bytes_served.inc(size)
+
+    @staticmethod
+    def _path(filename):
+        # Hashed to keep arbitrary requested file names out of the file system
+        name = hashlib.sha256(filename.encode('utf-8')).hexdigest()
+        return os.path.join(settings.ARTIFACT_CACHE_DIR, name)
+
+
+class CacheWriter:
+    """Writes an artifact to a temporary file and moves it into the cache."""
+
+    def __init__(self, cache, fp, path, size, headers=None):
+        self._cache = cache
+        self._fp = fp
+        self._path = path
+        self._size = size
+        self._headers = headers
+        self._written = 0
+
+    def write(self, data):
+        """Writes data, abandons the cached artifact on failure or size limit."""
+        if self._fp is None:
+            return
+        self._written += len(data)
+        if self._written > settings.ARTIFACT_CACHE_MAX_SIZE:
+            self.discard()
+            return
+        try:
+            self._fp.write(data)
+        except OSError:
+            log.exception('Failed to write artifact cache file %s', self._fp.name)
+            self.discard()
+
+    def commit(self):
+        """Moves complete artifact into the cache."""
+        if self._fp is None:
+            return
+        if self._size is not None and self._written != self._size:
+            self.discard()
+            return
+        try:
+            self._fp.close()
+            # Headers are stored first, so that a cached artifact always has them
+            if self._headers:
+                self._write_headers()
+            os.replace(self._fp.name, self._path)
+        except OSError:
+            log.exception('Failed to store artifact cache file %s', self._path)
+            self.discard()
+            return
+        self._fp = None
+        self._cache.evict()
+
+    def _write_headers(self):
+        with tempfile.NamedTemporaryFile(
+                'w', dir=settings.ARTIFACT_CACHE_DIR, prefix=TEMP_PREFIX, delete=False) as fp:
+            json.dump(self._headers, fp)
+        os.replace(fp.name, self._path + HEADERS_SUFFIX)
+
+    def discard(self):
+        if self._fp is None:
+            return
+        self._fp.close()
+        _remove(self._fp.name)
+        self._fp = None
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+artifact_cache = ArtifactCache()
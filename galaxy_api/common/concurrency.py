@@ -0,0 +1,91 @@
+"""Concurrency utilities."""
+
+import os
+import threading
+from concurrent import futures
+
+
+__all__ = (
+    'SharedExecutor',
+    'SingleFlight',
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls within a process.
+
+    The first thread calling with a given key executes the function,
+    threads calling with the same key while it is in flight wait for it
+    and receive the same result or exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def call(self, key, func):
+        """
+        Calls ``func`` unless a call with the same key is in flight.
+
+        Returns a tuple of the result and a flag set to True if the result
+        was shared from a call made by another thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as exc:
+            call.exception = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class SharedExecutor:
+    """
+    Thread pool shared by all threads of a worker process.
+
+    The pool is created lazily and re-created when the process id changes,
+    since threads of a parent process do not exist in a forked child.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix=''):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def submit(self, fn, *args, **kwargs):
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.thread_name_prefix,
+                )
+                self._pid = os.getpid()
+            return self._executor
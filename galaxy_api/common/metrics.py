@@ -1,4 +1,4 @@
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge, Histogram
 
 collection_import_attempts = Counter(
     "galaxy_api_collection_import_attempts", "count of collection import attempts"
@@ -8,10 +8,38 @@ collection_import_failures = Counter(
     "galaxy_api_collection_import_failures", "count of collection import failures"
 )
 
+collection_import_duplicates = Counter(
+    "galaxy_api_collection_import_duplicates",
+    "count of collection uploads rejected as already imported"
+)
+
 collection_import_successes = Counter(
     "galaxy_api_collection_import_successes", "count of collections imported succesfully"
 )
 
+collection_publish_queue = Counter(
+    "galaxy_api_collection_publish_queue",
+    "count of queued collection artifacts processed by result: published, retried or failed",
+    ["result"]
+)
+
+collection_uploads_in_flight = Gauge(
+    "galaxy_api_collection_uploads_in_flight",
+    "number of collection artifact uploads holding a global or namespace upload slot",
+    ["scope"]
+)
+
+collection_upload_rejections = Counter(
+    "galaxy_api_collection_upload_rejections",
+    "count of collection artifact uploads rejected by exceeding global or namespace limit",
+    ["scope"]
+)
+
+import_task_wait_rejections = Counter(
+    "galaxy_api_import_task_wait_rejections",
+    "count of import task requests answered without waiting by exceeding waiter limit"
+)
+
 collection_artifact_download_attempts = Counter(
     "galaxy_api_collection_artifact_download_attempts",
     "count of collection artifact download attempts"
@@ -27,3 +55,88 @@ collection_artifact_download_successes = Counter(
     "galaxy_api_collection_artifact_download_successes",
     "count of succesful collection artifact downloads"
 )
+
+collection_download_counts_saved = Counter(
+    "galaxy_api_collection_download_counts_saved",
+    "count of collection downloads saved to per-version download counts"
+)
+
+collection_artifact_download_offloads = Counter(
+    "galaxy_api_collection_artifact_download_offloads",
+    "count of collection artifact downloads offloaded to the web server by mode",
+    ["mode"]
+)
+
+artifact_cache_hits = Counter(
+    "galaxy_api_artifact_cache_hits",
+    "count of collection artifact downloads served from local cache"
+)
+
+artifact_cache_misses = Counter(
+    "galaxy_api_artifact_cache_misses",
+    "count of collection artifact downloads not found in local cache"
+)
+
+artifact_cache_evictions = Counter(
+    "galaxy_api_artifact_cache_evictions",
+    "count of collection artifacts evicted from local cache"
+)
+
+artifact_cache_bytes_served = Counter(
+    "galaxy_api_artifact_cache_bytes_served",
+    "bytes of collection artifacts served from local cache"
+)
+
+artifact_cache_size_bytes = Gauge(
+    "galaxy_api_artifact_cache_size_bytes",
+    "total size of collection artifacts in local cache"
+)
+
+pulp_api_pool_connections_in_use = Gauge(
+    "galaxy_api_pulp_api_pool_connections_in_use",
+    "number of pulp api connections checked out of the pool"
+)
+
+pulp_api_pool_checkout_seconds = Histogram(
+    "galaxy_api_pulp_api_pool_checkout_seconds",
+    "time spent waiting for a pulp api connection from the pool"
+)
+
+pulp_cache_hits = Counter(
+    "galaxy_api_pulp_cache_hits",
+    "count of pulp api responses served from cache",
+    ["endpoint"]
+)
+
+pulp_cache_misses = Counter(
+    "galaxy_api_pulp_cache_misses",
+    "count of pulp api responses not found in cache",
+    ["endpoint"]
+)
+
+pulp_single_flight_calls = Counter(
+    "galaxy_api_pulp_single_flight_calls",
+    "count of pulp api reads by role: issued by a leader or coalesced with an in-flight call",
+    ["endpoint", "role"]
+)
+
+ui_collection_detail_call_seconds = Histogram(
+    "galaxy_api_ui_collection_detail_call_seconds",
+    "duration of lookups made by the ui collection detail view",
+    ["call"]
+)
+
+collection_upload_sha256_seconds = Histogram(
+    "galaxy_api_collection_upload_sha256_seconds",
+    "time spent computing sha256 digest of uploaded collection artifacts",
+)
+
+rh_identity_cache_hits = Counter(
+    "galaxy_api_rh_identity_cache_hits",
+    "count of requests authenticated with a cached identity header"
+)
+
+rh_identity_cache_misses = Counter(
+    "galaxy_api_rh_identity_cache_misses",
+    "count of requests with identity header not found in cache"
+)
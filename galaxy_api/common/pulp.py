@@ -1,5 +1,20 @@
+import copy
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+
+import requests
 from django.conf import settings
-from galaxy_pulp import Configuration, ApiClient
+from django.core.cache import caches
+from galaxy_pulp import ApiClient, ApiException, Configuration
+from requests.adapters import HTTPAdapter
+from urllib3 import Timeout, connection, connectionpool
+
+from galaxy_api.common import metrics
+from galaxy_api.common.concurrency import SharedExecutor, SingleFlight
 
 
 def get_configuration():
@@ -13,9 +28,383 @@ def get_configuration():
 
     )
     config.safe_chars_for_path_param = '/'
+    config.connection_pool_maxsize = settings.PULP_API_POOL_MAXSIZE
     return config
 
 
+class _InstrumentedPoolMixin:
+    """Exports connection pool usage and checkout wait time."""
+
+    def _get_conn(self, timeout=None):
+        start = time.monotonic()
+        conn = super()._get_conn(timeout=timeout)
+        metrics.pulp_api_pool_checkout_seconds.observe(time.monotonic() - start)
+        self._update_usage()
+        return conn
+
+    def _put_conn(self, conn):
+        super()._put_conn(conn)
+        self._update_usage()
+
+    def _update_usage(self):
+        pool = self.pool
+        if pool is not None:
+            metrics.pulp_api_pool_connections_in_use.set(pool.maxsize - pool.qsize())
+
+
+class _HTTPConnectionPool(_InstrumentedPoolMixin, connectionpool.HTTPConnectionPool):
+    pass
+
+
+class _HTTPSConnectionPool(_InstrumentedPoolMixin, connectionpool.HTTPSConnectionPool):
+    pass
+
+
+class ProcessLocal:
+    """
+    Holds an object with pooled connections shared by all threads of a
+    worker process.
+
+    The object is created lazily by ``factory`` and re-created when the
+    process id changes, so that forked workers never share sockets with
+    their parent. ``close`` is called with the object to drop its pooled
+    connections when it was not used for ``PULP_API_POOL_IDLE_TIMEOUT``
+    seconds, before it is handed out again, and on reset.
+    """
+
+    def __init__(self, factory, close):
+        self._factory = factory
+        self._close = close
+        self._lock = threading.Lock()
+        self._obj = None
+        self._pid = None
+        self._last_used = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._obj is None or self._pid != os.getpid():
+                self._obj = self._factory()
+                self._pid = os.getpid()
+            elif now - self._last_used > settings.PULP_API_POOL_IDLE_TIMEOUT:
+                self._close(self._obj)
+            self._last_used = now
+            return self._obj
+
+    def reset(self):
+        """Drop the current object and close its connections."""
+        with self._lock:
+            obj, self._obj = self._obj, None
+        if obj is not None and self._pid == os.getpid():
+            self._close(obj)
+
+
+class ClientManager(ProcessLocal):
+    """Holds a Pulp API client shared by all threads of a worker process."""
+
+    def __init__(self):
+        super().__init__(self._create_client, self._close_client)
+
+    def get_client(self):
+        return self.get()
+
+    @staticmethod
+    def _create_client():
+        client = ApiClient(configuration=get_configuration())
+
+        pool_manager = client.rest_client.pool_manager
+        pool_manager.pool_classes_by_scheme = {
+            'http': _HTTPConnectionPool,
+            'https': _HTTPSConnectionPool,
+        }
+        pool_manager.connection_pool_kw['block'] = settings.PULP_API_POOL_BLOCK
+        if settings.PULP_API_TCP_KEEPALIVE:
+            pool_manager.connection_pool_kw['socket_options'] = (
+                connection.HTTPConnection.default_socket_options
+                + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            )
+        return client
+
+    @staticmethod
+    def _close_client(client):
+        client.rest_client.pool_manager.clear()
+
+
+_client_manager = ClientManager()
+
+
 def get_client():
-    config = get_configuration()
-    return ApiClient(configuration=config)
+    return _client_manager.get_client()
+
+
+class ContentSessionManager(ProcessLocal):
+    """
+    Holds a ``requests`` session to Pulp content app shared by all threads
+    of a worker process.
+    """
+
+    def __init__(self):
+        super().__init__(self._create_session, requests.Session.close)
+
+    def get_session(self):
+        return self.get()
+
+    @staticmethod
+    def _create_session():
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.PULP_CONTENT_POOL_MAXSIZE,
+            # Downloads hold connections for long, open extra ones instead of waiting
+            pool_block=False,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+
+_content_session_manager = ContentSessionManager()
+
+
+def get_content_session():
+    return _content_session_manager.get_session()
+
+
+def get_content_timeout():
+    """Returns ``requests`` timeout of Pulp content app requests."""
+    return (settings.PULP_CONTENT_CONNECT_TIMEOUT, settings.PULP_CONTENT_READ_TIMEOUT)
+
+
+class MultipartBody:
+    """
+    A multipart/form-data request body streamed from uploaded files.
+
+    Fields are given as a list of ``(name, value)`` tuples, where value is
+    either a string or a ``(filename, file, content_type)`` tuple. Files are
+    read in chunks while the body is being sent, so memory used does not
+    depend on file size.
+    """
+
+    def __init__(self, fields, chunk_size=None):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size or settings.PULP_API_UPLOAD_CHUNK_SIZE
+
+        self._parts = []
+        for name, value in fields:
+            if isinstance(value, tuple):
+                filename, file, content_type = value
+                header = (
+                    f'--{self.boundary}\r\n'
+                    f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    f'Content-Type: {content_type}\r\n\r\n'
+                )
+                self._parts.append((header.encode('utf-8'), file))
+            else:
+                header = (
+                    f'--{self.boundary}\r\n'
+                    f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                    f'{value}'
+                )
+                self._parts.append((header.encode('utf-8'), None))
+        self._trailer = f'--{self.boundary}--\r\n'.encode('utf-8')
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    @property
+    def content_length(self):
+        length = len(self._trailer)
+        for header, file in self._parts:
+            length += len(header) + 2
+            if file is not None:
+                length += file.size
+        return length
+
+    def __iter__(self):
+        for header, file in self._parts:
+            yield header
+            if file is not None:
+                file.seek(0)
+                yield from iter(lambda: file.read(self.chunk_size), b'')
+            yield b'\r\n'
+        yield self._trailer
+
+
+def get_upload_timeout():
+    """Returns ``urllib3`` timeout of artifact uploads to Pulp API."""
+    return Timeout(connect=settings.PULP_API_UPLOAD_CONNECT_TIMEOUT,
+                   read=settings.PULP_API_UPLOAD_READ_TIMEOUT)
+
+
+def post_multipart(client, url, headers, body):
+    """
+    Send a streamed multipart body to Pulp API.
+
+    Raises ApiException for non-success responses, like the generated client.
+    """
+    headers = dict(headers)
+    headers.update({
+        'Content-Type': body.content_type,
+        'Content-Length': str(body.content_length),
+    })
+    # Streamed body cannot be sent again, do not retry
+    response = client.rest_client.pool_manager.urlopen(
+        'POST', url, body=body, headers=headers, retries=False, timeout=get_upload_timeout(),
+    )
+    if not 200 <= response.status <= 299:
+        raise ApiException(http_resp=response)
+    return response
+
+
+class ResponseCache:
+    """
+    Caches Pulp API read responses in a Django cache.
+
+    Cache keys are derived from the endpoint name, the normalized call
+    parameters and a generation token of the call scope. Calls with both
+    ``namespace`` and ``name`` parameters are scoped to that collection,
+    calls with ``namespace`` only to that namespace, all other calls share
+    the global scope. Invalidation replaces generation tokens of the affected
+    scopes, so stale entries are never read again and expire on their own.
+    """
+
+    KEY_PREFIX = 'pulp'
+
+    def __init__(self):
+        self._single_flight = SingleFlight()
+
+    @property
+    def cache(self):
+        return caches[settings.PULP_CACHE_ALIAS]
+
+    def get_or_call(self, endpoint, func, raw=False, **params):
+        """
+        Return cached response of ``func(**params)`` or call and cache it.
+
+        If ``raw`` is set, the response is not deserialized and its body
+        is returned as bytes.
+
+        Concurrent identical calls within a process are coalesced into one
+        Pulp API request, across processes too if ``PULP_SINGLE_FLIGHT_SHARED``
+        is enabled.
+        """
+        timeout = settings.PULP_CACHE_TIMEOUTS.get(endpoint)
+        key = self._make_key(endpoint, params, raw)
+
+        if timeout:
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.pulp_cache_hits.labels(endpoint=endpoint).inc()
+                return self._load(cached)
+            metrics.pulp_cache_misses.labels(endpoint=endpoint).inc()
+
+        def _fetch():
+            if raw:
+                return func(_preload_content=False, **params).data
+            return func(**params)
+
+        def _call():
+            if timeout and settings.PULP_SINGLE_FLIGHT_SHARED:
+                return self._call_shared(key, endpoint, _fetch, timeout)
+            metrics.pulp_single_flight_calls.labels(endpoint=endpoint, role='leader').inc()
+            response = _fetch()
+            if timeout:
+                self.cache.set(key, self._dump(response), timeout)
+            return response
+
+        response, shared = self._single_flight.call(key, _call)
+        if shared:
+            metrics.pulp_single_flight_calls.labels(endpoint=endpoint, role='coalesced').inc()
+            # Views may modify responses, do not share objects between threads
+            return self._load(copy.deepcopy(self._dump(response)))
+        return response
+
+    def _call_shared(self, key, endpoint, fetch, timeout):
+        lock_key = f'{key}:lock'
+        lock_timeout = settings.PULP_SINGLE_FLIGHT_LOCK_TIMEOUT
+
+        if not self.cache.add(lock_key, os.getpid(), lock_timeout):
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(settings.PULP_SINGLE_FLIGHT_POLL_INTERVAL)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    metrics.pulp_single_flight_calls.labels(
+                        endpoint=endpoint, role='coalesced').inc()
+                    return self._load(cached)
+                if self.cache.get(lock_key) is None:
+                    break
+            # The other process failed or is too slow, fall back to own request
+            metrics.pulp_single_flight_calls.labels(endpoint=endpoint, role='leader').inc()
+            return fetch()
+
+        try:
+            metrics.pulp_single_flight_calls.labels(endpoint=endpoint, role='leader').inc()
+            response = fetch()
+            self.cache.set(key, self._dump(response), timeout)
+            return response
+        finally:
+            self.cache.delete(lock_key)
+
+    def invalidate(self, namespace, name):
+        """Invalidate cached responses that may include given collection."""
+        keys = [
+            self._generation_key(),
+            self._generation_key(namespace),
+            self._generation_key(namespace, name),
+        ]
+        self.cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    def clear(self):
+        self.cache.clear()
+
+    def _make_key(self, endpoint, params, raw=False):
+        scope = ()
+        if params.get('namespace') is not None:
+            scope = (params['namespace'],)
+            if params.get('name') is not None:
+                scope += (params['name'],)
+        generation = self._get_generation(self._generation_key(*scope))
+
+        parts = [endpoint, str(generation), 'raw' if raw else 'model']
+        parts.extend(f'{k}={v}' for k, v in sorted(params.items()))
+        digest = hashlib.sha256('&'.join(parts).encode('utf-8')).hexdigest()
+        return f'{self.KEY_PREFIX}:{endpoint}:{digest}'
+
+    def _get_generation(self, key):
+        generation = self.cache.get(key)
+        if generation is None:
+            # A token that was never set or was culled from the cache is replaced
+            # by a random one, entries cached under the previous token stay unread
+            generation = uuid.uuid4().hex
+            if not self.cache.add(key, generation, None):
+                generation = self.cache.get(key, generation)
+        return generation
+
+    def _generation_key(self, *scope):
+        return ':'.join((self.KEY_PREFIX, 'generation') + scope)
+
+    @staticmethod
+    def _dump(response):
+        # Generated models reference client configuration, store plain data only
+        if hasattr(response, 'to_dict'):
+            return type(response), response.to_dict()
+        return None, response
+
+    @staticmethod
+    def _load(cached):
+        model_class, data = cached
+        if model_class is None:
+            return data
+        return model_class(**data)
+
+
+response_cache = ResponseCache()
+
+
+# Runs independent Pulp API calls of a single request concurrently
+executor = SharedExecutor(
+    max_workers=settings.PULP_API_MAX_WORKERS,
+    thread_name_prefix='pulp-api',
+)
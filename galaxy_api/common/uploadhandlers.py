@@ -0,0 +1,40 @@
+"""File upload handlers."""
+
+import hashlib
+import time
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+from galaxy_api.common import metrics
+
+
+class Sha256UploadHandler(FileUploadHandler):
+    """
+    Computes sha256 digest of uploaded files as chunks are received.
+
+    The handler must precede the handlers storing the files. Chunks are
+    passed on unchanged and digests are collected in ``digests`` by field name.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests = {}
+        self._hasher = None
+        self._elapsed = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._hasher = hashlib.sha256()
+        self._elapsed = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        started = time.monotonic()
+        self._hasher.update(raw_data)
+        self._elapsed += time.monotonic() - started
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.digests[self.field_name] = self._hasher.hexdigest()
+        metrics.collection_upload_sha256_seconds.observe(self._elapsed)
+        # Let the next handler return the file object
+        return None
@@ -5,3 +5,42 @@ class CertificationStatus(enum.Enum):
     CERTIFIED = 'certified'
     NEEDS_REVIEW = 'needs_review'
     NOT_CERTIFIED = 'not_certified'
+
+
+class ImportTaskState(enum.Enum):
+    # Artifact not yet published to pulp
+    QUEUED = 'queued'
+    WAITING = 'waiting'
+    SKIPPED = 'skipped'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELED = 'canceled'
+
+
+# Import task states that never change
+IMPORT_TASK_FINAL_STATES = frozenset(state.value for state in (
+    ImportTaskState.SKIPPED,
+    ImportTaskState.COMPLETED,
+    ImportTaskState.FAILED,
+    ImportTaskState.CANCELED,
+))
+
+
+class UploadSessionState(enum.Enum):
+    OPEN = 'open'
+    COMMITTING = 'committing'
+    # Waiting to be published to pulp by a worker
+    QUEUED = 'queued'
+    # Claimed by a worker publishing it to pulp
+    PUBLISHING = 'publishing'
+    COMMITTED = 'committed'
+
+
+class ArtifactDownloadMode(enum.Enum):
+    # Stream artifacts from content app, pass its redirects to clients
+    PROXY = 'proxy'
+    # Let nginx serve artifacts from an internal location (X-Accel-Redirect)
+    ACCEL_REDIRECT = 'accel-redirect'
+    # Let the web server send cached artifact files (X-Sendfile)
+    SENDFILE = 'sendfile'
@@ -86,6 +86,19 @@ DATABASES = {
 }
 
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pulp': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pulp',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
 # Internationalization
 
 LANGUAGE_CODE = 'en-us'
@@ -124,6 +137,20 @@ REST_FRAMEWORK = {
 }
 
 RH_ENTITLEMENT_REQUIRED = 'insights'
+# Decoded X-RH-Identity headers and their users are cached per worker process:
+# maximum number of cached headers (zero disables the cache) and timeout in seconds
+RH_IDENTITY_CACHE_SIZE = 1000
+RH_IDENTITY_CACHE_TIMEOUT = 60
+# Groups of a user are loaded once per request, optionally they are cached
+# for this many seconds in USER_GROUPS_CACHE_ALIAS cache (zero disables it)
+USER_GROUPS_CACHE_ALIAS = 'default'
+USER_GROUPS_CACHE_TIMEOUT = 0
+# IDs of namespaces owned by a user are loaded once per request, optionally
+# they are cached for this many seconds in NAMESPACE_OWNERSHIP_CACHE_ALIAS
+# cache (zero disables it). Cached IDs are dropped on group membership changes
+# by the process making them, so the cache must be shared by all processes.
+NAMESPACE_OWNERSHIP_CACHE_ALIAS = 'default'
+NAMESPACE_OWNERSHIP_CACHE_TIMEOUT = 0
 
 # ---------------------------------------------------------
 # Application settings
@@ -135,10 +162,129 @@ PULP_API_HOST = 'pulp-api'
 PULP_API_PORT = 8000
 PULP_API_USER = 'admin'
 PULP_API_PASSWORD = 'admin'
+# Maximum number of keep-alive connections to Pulp API per worker process
+PULP_API_POOL_MAXSIZE = 10
+# Wait for a free connection instead of opening an extra one when the pool is exhausted
+PULP_API_POOL_BLOCK = True
+# Enable TCP keep-alive probes on Pulp API connections
+PULP_API_TCP_KEEPALIVE = True
+# Drop pooled connections not used for this many seconds
+PULP_API_POOL_IDLE_TIMEOUT = 60
+# Maximum number of threads per worker process issuing concurrent Pulp API calls
+PULP_API_MAX_WORKERS = 8
+# Size of chunks (bytes) read from uploaded artifacts when streaming them to Pulp API
+PULP_API_UPLOAD_CHUNK_SIZE = 256 * 1024
+# Timeouts (seconds) for connecting to Pulp API and between received bytes of
+# artifact uploads, read timeout includes Pulp processing the uploaded artifact
+PULP_API_UPLOAD_CONNECT_TIMEOUT = 5
+PULP_API_UPLOAD_READ_TIMEOUT = 300
+
+# Limits checked before uploaded collection artifacts are published to Pulp API:
+# artifact size, total size of unpacked files (bytes) and number of files
+COLLECTION_MAX_SIZE = 100 * 1024 * 1024
+COLLECTION_MAX_UNPACKED_SIZE = 1024 * 1024 * 1024
+COLLECTION_MAX_FILES = 10000
+
+# Directory for resumable upload session spool files. When the API is
+# served by more than one host it must be on storage shared by all of them.
+UPLOAD_SESSION_DIR = '/tmp/galaxy-api/uploads'
+# Maximum size (bytes) of a single upload session chunk request
+UPLOAD_SESSION_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+# Uncommitted upload sessions not updated for this many seconds are removed
+# by the cleanup_upload_sessions management command
+UPLOAD_SESSION_MAX_AGE = 24 * 60 * 60
+# Upload sessions left committing for this many seconds (e.g. by a crashed
+# worker) are opened again by the cleanup_upload_sessions management command
+UPLOAD_SESSION_COMMIT_TIMEOUT = 60 * 60
+
+# Maximum number of collection artifact uploads in progress, in total and per
+# namespace (zero disables the limit). Further uploads are rejected with 429.
+# Upload slots are kept in the database and shared by all worker processes.
+UPLOAD_MAX_IN_FLIGHT = 16
+UPLOAD_MAX_IN_FLIGHT_PER_NAMESPACE = 4
+# Upload slots of crashed workers are released after this many seconds
+UPLOAD_ADMISSION_SLOT_TIMEOUT = 15 * 60
+# Retry-After (seconds) sent with rejected uploads
+UPLOAD_ADMISSION_RETRY_AFTER = 5
+
+# Reply to artifact uploads as soon as the artifact is spooled to
+# UPLOAD_SESSION_DIR, leaving publishing to Pulp API to the
+# publish_collection_imports management command
+COLLECTION_PUBLISH_ASYNC = False
+# Maximum number of queued artifacts published to Pulp API concurrently by a worker
+COLLECTION_PUBLISH_WORKERS = 4
+# Publish attempts before a queued import is marked failed, and delay (seconds)
+# before the first retry, doubled for each following one
+COLLECTION_PUBLISH_MAX_ATTEMPTS = 5
+COLLECTION_PUBLISH_RETRY_DELAY = 10
+# Queued artifacts claimed by a worker that crashed while publishing them are
+# published again after this many seconds
+COLLECTION_PUBLISH_CLAIM_TIMEOUT = 30 * 60
+
+# Cache alias and per-endpoint timeouts (in seconds) for Pulp API read responses.
+# Endpoints missing here or with zero timeout are not cached.
+# Responses are invalidated when a collection version is imported or changed, but
+# only in the cache of the process doing it: with the default local-memory cache,
+# other worker processes may serve stale responses for up to the endpoint timeout.
+# Configure a cache shared by all processes (e.g. memcached or redis) to avoid it.
+PULP_CACHE_ALIAS = 'pulp'
+PULP_CACHE_TIMEOUTS = {
+    'collections': 30,
+    'collection_versions': 30,
+    'pulp_collections': 30,
+}
+# Coalesce identical cached Pulp API reads across worker processes using
+# a lock in the shared cache (identical reads within a process are always coalesced)
+PULP_SINGLE_FLIGHT_SHARED = False
+PULP_SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+PULP_SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+# Long-polling of collection import tasks: Pulp is polled for a task at most once
+# per interval (seconds) for all waiting clients sharing the PULP_CACHE_ALIAS cache.
+# Polls are shared across worker processes only if that cache is shared by them
+# (e.g. memcached or redis), the default local-memory cache is per process.
+IMPORT_TASK_POLL_INTERVAL = 1
+# Maximum time (seconds) a client may wait for an import task change
+IMPORT_TASK_MAX_WAIT = 5
+# Maximum number of request threads of a process waiting for import task
+# changes, others are answered at once. Keep it below the number of threads
+# per process (scripts/entrypoint), so that other requests are served.
+IMPORT_TASK_MAX_WAITERS = 1
+
+# Pass Pulp JSON responses of v3 collection list/retrieve and version list endpoints
+# through without deserializing them into client models and serializing them back
+PULP_API_PASSTHROUGH = False
 
 PULP_CONTENT_HOST = 'pulp-content-app'
 PULP_CONTENT_PORT = 24816
 PULP_CONTENT_PATH_PREFIX = '/api/automation-hub/v3/artifacts/collections/'
+# Maximum number of keep-alive connections to Pulp content app per worker process
+PULP_CONTENT_POOL_MAXSIZE = 10
+# Timeouts (seconds) for connecting to Pulp content app and between received bytes
+PULP_CONTENT_CONNECT_TIMEOUT = 5
+PULP_CONTENT_READ_TIMEOUT = 60
+# Size of chunks (bytes) of collection artifacts streamed from Pulp content app to clients
+PULP_CONTENT_CHUNK_SIZE = 1024 * 1024
+# How collection artifact downloads are served:
+# 'proxy' - streamed from Pulp content app by the worker (redirects of the
+#   content app are passed to clients)
+# 'accel-redirect' - X-Accel-Redirect to ARTIFACT_DOWNLOAD_ACCEL_REDIRECT_LOCATION,
+#   an nginx internal location proxying to Pulp content app
+# 'sendfile' - X-Sendfile with the path of the artifact in ARTIFACT_CACHE_DIR,
+#   artifacts missing in the cache are proxied (and cached)
+ARTIFACT_DOWNLOAD_MODE = 'proxy'
+ARTIFACT_DOWNLOAD_ACCEL_REDIRECT_LOCATION = '/_pulp_content/'
+
+# Collection downloads are counted in memory and saved to the database every
+# this many seconds (zero saves every download immediately)
+DOWNLOAD_COUNT_FLUSH_INTERVAL = 30
+# Maximum number of collections sorted by download count in the UI collection list
+UI_COLLECTION_SORT_MAX_COLLECTIONS = 1000
+
+# Directory of local collection artifact cache (empty disables the cache)
+# and maximum total size (bytes) of cached artifacts
+ARTIFACT_CACHE_DIR = ''
+ARTIFACT_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
 
 # ---------------------------------------------------------
 # Application settings
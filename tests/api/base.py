@@ -6,6 +6,7 @@ from rest_framework.test import APIClient, APITestCase
 from galaxy_api.api import models as models
 from galaxy_api.auth import auth
 from galaxy_api.auth import models as auth_models
+from galaxy_api.common import pulp
 
 
 API_PREFIX = settings.API_PATH_PREFIX.strip("/")
@@ -25,6 +26,9 @@ class BaseTestCase(APITestCase):
         patcher.start()
         self.addCleanup(patcher.stop)
 
+        pulp.response_cache.clear()
+        auth.identity_cache.clear()
+
     @staticmethod
     def _create_user(username):
         return auth_models.User.objects.create(username=username)
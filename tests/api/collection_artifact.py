@@ -0,0 +1,21 @@
+import io
+import json
+import tarfile
+
+
+def build_collection_artifact(namespace='ansible', name='nginx', version='1.2.3',
+                              files=None, manifest=None):
+    """Returns contents of a collection artifact tar.gz archive."""
+    if manifest is None:
+        manifest = {
+            'collection_info': {'namespace': namespace, 'name': name, 'version': version},
+        }
+    files = dict({'MANIFEST.json': json.dumps(manifest).encode()}, **(files or {}))
+
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        for filename, content in files.items():
+            info = tarfile.TarInfo(filename)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return buf.getvalue()
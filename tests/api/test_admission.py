@@ -0,0 +1,40 @@
+import datetime
+
+import pytest
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from galaxy_api.api import admission, models
+
+
+@override_settings(UPLOAD_MAX_IN_FLIGHT=2)
+class TestUploadSlot(TestCase):
+    def test_slots_limited(self):
+        with admission.upload_slot(), admission.upload_slot():
+            assert models.UploadSlot.objects.count() == 2
+            with pytest.raises(Throttled):
+                with admission.upload_slot():
+                    pass
+
+        assert not models.UploadSlot.objects.exists()
+
+    def test_expired_slot_taken_over(self):
+        expired = timezone.now() - datetime.timedelta(seconds=1)
+
+        with admission.upload_slot():
+            models.UploadSlot.objects.update(expires_at=expired)
+            with admission.upload_slot(), admission.upload_slot():
+                assert models.UploadSlot.objects.filter(expires_at__gt=expired).count() == 2
+
+            # Released by the upload that took it over
+            assert not models.UploadSlot.objects.exists()
+
+    def test_slot_of_other_holder_not_released(self):
+        with admission.upload_slot():
+            # Expired and taken over by another upload
+            models.UploadSlot.objects.update(
+                token='3e26b82c-702f-4bdd-a568-7d9db17759c1',
+                expires_at=timezone.now() + datetime.timedelta(minutes=1))
+
+        assert models.UploadSlot.objects.count() == 1
@@ -1,7 +1,13 @@
+import uuid
 from unittest import mock
 
+import galaxy_pulp
+from django.test import override_settings
+from django.utils import timezone
 from galaxy_pulp.models import CertificationInfo
 
+from galaxy_api.api import models
+
 from .base import BaseTestCase, API_PREFIX
 
 
@@ -20,11 +26,13 @@ class TestCollectionVersionViewSet(BaseTestCase):
     def test_set_certified(self):
         self.versions_api.set_certified.return_value = {}
 
-        response = self.client.put(
-            f"/{API_PREFIX}/v3/_ui/collection-versions/ansible/nginx/1.2.3/certified/",
-            data={'certification': 'certified'},
-            format='json',
-        )
+        # namespace and user groups, shared by all permission checks
+        with self.assertNumQueries(2):
+            response = self.client.put(
+                f"/{API_PREFIX}/v3/_ui/collection-versions/ansible/nginx/1.2.3/certified/",
+                data={'certification': 'certified'},
+                format='json',
+            )
 
         assert response.status_code == 200
         assert response.data == {}
@@ -32,3 +40,230 @@ class TestCollectionVersionViewSet(BaseTestCase):
             prefix=API_PREFIX, namespace="ansible", name="nginx",
             version="1.2.3", certification_info=CertificationInfo('certified')
         )
+
+
+class TestCollectionViewSet(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.namespace = self._create_namespace('ansible', groups=[])
+
+        patcher = mock.patch("galaxy_pulp.PulpCollectionsApi", spec=True)
+        self.collections_api = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _collection_version(version):
+        return {
+            'id': '3e26b82c-702f-4bdd-a568-7d9db17759c1',
+            'namespace': 'ansible',
+            'name': 'nginx',
+            'version': version,
+            'certification': 'certified',
+            'pulp_created': '2019-11-05T10:14:45.117536Z',
+            'deprecated': False,
+            'dependencies': {},
+            'contents': [],
+            'documentation': '',
+            'homepage': '',
+            'issues': '',
+            'repository': '',
+            'description': '',
+            'authors': [],
+            'license': [],
+            'tags': [],
+            'docs_blob': {},
+        }
+
+    def test_retrieve(self):
+        latest = self._collection_version('1.2.3')
+        versions = [self._collection_version('1.2.3'), self._collection_version('1.0.0')]
+
+        def list_collections(**params):
+            results = versions if 'fields' in params else [latest]
+            return galaxy_pulp.ResultsPage(count=len(results), results=results)
+
+        self.collections_api.list.side_effect = list_collections
+
+        response = self.client.get(f"/{API_PREFIX}/v3/_ui/collections/ansible/nginx/")
+
+        assert response.status_code == 200
+        assert response.data['namespace']['name'] == 'ansible'
+        assert response.data['latest_version']['version'] == '1.2.3'
+        assert [v['version'] for v in response.data['all_versions']] == ['1.2.3', '1.0.0']
+        assert response.data['download_count'] == 0
+        assert self.collections_api.list.call_count == 2
+
+    def _list_collections(self, names, count=None):
+        collections = []
+        for name in names:
+            collection = self._collection_version('1.0.0')
+            collection['name'] = name
+            collections.append(collection)
+
+        def list_collections(**params):
+            if 'name' in params:
+                results = [c for c in collections if c['name'] == params['name']]
+                return galaxy_pulp.ResultsPage(count=len(results), results=results)
+            results = collections[:params['limit']]
+            return galaxy_pulp.ResultsPage(count=count or len(collections), results=results)
+
+        self.collections_api.list.side_effect = list_collections
+
+    def test_list_sort_download_count(self):
+        self._list_collections(['nginx', 'apache', 'haproxy'])
+        for name, count in (('apache', 3), ('haproxy', 7)):
+            models.CollectionDownloadCount.objects.create(
+                namespace=self.namespace, name=name, version='1.0.0', count=count)
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/_ui/collections/", data={'sort': '-download_count', 'limit': 2})
+
+        assert response.status_code == 200
+        assert [(c['name'], c['download_count']) for c in response.data['data']] == [
+            ('haproxy', 7), ('apache', 3)]
+        calls = self.collections_api.list.call_args_list
+        # Names of collections to sort, then details of the page only
+        assert len(calls) == 3
+        _, kwargs = calls[0]
+        assert 'sort' not in kwargs
+        assert (kwargs['offset'], kwargs['fields']) == (0, 'namespace,name')
+        assert {kwargs['name'] for _, kwargs in calls[1:]} == {'haproxy', 'apache'}
+
+        # Names are sorted once for all pages
+        self.collections_api.list.reset_mock()
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/_ui/collections/",
+            data={'sort': '-download_count', 'limit': 2, 'offset': 2})
+
+        assert [c['name'] for c in response.data['data']] == ['nginx']
+        _, kwargs = self.collections_api.list.call_args
+        assert kwargs['name'] == 'nginx'
+        assert self.collections_api.list.call_count == 1
+
+    @override_settings(UI_COLLECTION_SORT_MAX_COLLECTIONS=3)
+    def test_list_sort_download_count_limited(self):
+        self._list_collections(['nginx', 'apache', 'haproxy'], count=10)
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/_ui/collections/", data={'sort': 'download_count', 'limit': 2})
+
+        assert response.status_code == 200
+        assert response.data['meta']['count'] == 3
+        assert 'offset=1' in response.data['links']['last']
+        _, kwargs = self.collections_api.list.call_args_list[0]
+        assert kwargs['limit'] == 3
+
+    def test_retrieve_not_found(self):
+        self.collections_api.list.return_value = galaxy_pulp.ResultsPage(count=0, results=[])
+
+        response = self.client.get(f"/{API_PREFIX}/v3/_ui/collections/ansible/nginx/")
+
+        assert response.status_code == 404
+
+    def test_retrieve_unknown_namespace(self):
+        response = self.client.get(f"/{API_PREFIX}/v3/_ui/collections/unknown/nginx/")
+
+        assert response.status_code == 404
+        self.collections_api.list.assert_not_called()
+
+
+class TestCollectionImportViewSet(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        namespace = self._create_namespace('ansible', groups=[])
+        self.imports = [
+            models.CollectionImport.objects.create(
+                task_id=task_id,
+                pulp_task_id=task_id,
+                created_at=timezone.now(),
+                namespace=namespace,
+                name='nginx',
+                version=f'1.0.{i}',
+            ) for i, task_id in enumerate(uuid.uuid4() for _ in range(5))
+        ]
+
+        patcher = mock.patch("galaxy_pulp.GalaxyImportsApi", spec=True)
+        self.imports_api = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_list_round_trips(self):
+        # Imports are ordered by descending task id
+        missing_id = str(max(task.task_id for task in self.imports))
+
+        def get_import(prefix, id):
+            if id == missing_id:
+                raise galaxy_pulp.ApiException(status=503, reason='Service Unavailable')
+            return galaxy_pulp.CollectionImport(id=id, state='completed')
+
+        self.imports_api.get.side_effect = get_import
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/_ui/imports/collections/", data={'limit': 3})
+
+        assert response.status_code == 200
+        assert self.imports_api.get.call_count == 3
+
+        # The missing task is rendered with its last known state
+        states = {item['id']: item['state'] for item in response.data['data']}
+        assert len(states) == 3
+        assert states.pop(missing_id) == 'waiting'
+        assert set(states.values()) == {'completed'}
+
+    def test_list_finished_from_mirror(self):
+        models.CollectionImport.objects.update(state='completed')
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/_ui/imports/collections/", data={'limit': 3})
+
+        assert response.status_code == 200
+        assert [item['state'] for item in response.data['data']] == ['completed'] * 3
+        self.imports_api.get.assert_not_called()
+
+    def test_list_filter_state(self):
+        task = self.imports[0]
+        task.state = 'failed'
+        task.save()
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/_ui/imports/collections/", data={'state': 'failed'})
+
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data['data']] == [str(task.task_id)]
+        self.imports_api.get.assert_not_called()
+
+    def test_retrieve_updates_mirror(self):
+        task = self.imports[0]
+        self.imports_api.get.return_value = galaxy_pulp.CollectionImport(
+            id=str(task.task_id), state='failed', error={'description': 'Bad tarball'},
+            messages=[{'message': 'Importing'}],
+        )
+
+        url = f"/{API_PREFIX}/v3/_ui/imports/collections/{task.task_id}/"
+        for _ in range(2):
+            response = self.client.get(url)
+            assert response.status_code == 200
+            assert response.data['state'] == 'failed'
+            assert response.data['error'] == {'description': 'Bad tarball'}
+            assert response.data['messages'] == [{'message': 'Importing'}]
+
+        self.imports_api.get.assert_called_once_with(prefix=API_PREFIX, id=str(task.task_id))
+        task.refresh_from_db()
+        assert task.state == 'failed'
+
+    def test_retrieve_messages_since(self):
+        task = self.imports[0]
+        task.state = 'completed'
+        task.messages = [{'message': str(i)} for i in range(5)]
+        task.save()
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/_ui/imports/collections/{task.task_id}/",
+            data={'messages_since': 3},
+        )
+
+        assert response.status_code == 200
+        assert response.data['messages'] == [{'message': '3'}, {'message': '4'}]
+        assert response.data['next_messages_since'] == 5
+        self.imports_api.get.assert_not_called()
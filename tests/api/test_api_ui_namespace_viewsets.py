@@ -1,6 +1,8 @@
 import json
 import logging
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -165,6 +167,61 @@ class TestUiNamespaceViewSet(BaseTestCase):
         self.assertEqual(response_data['company'], 'coolring')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_retrieve_loads_user_groups_once(self):
+        partner_group = self._create_group('system', 'partner-engineers', users=self.user)
+        self._create_namespace('mordor', partner_group)
+        url = reverse('api:ui:namespaces-detail', kwargs={'name': 'mordor'})
+
+        # namespace, user groups, namespace links and groups
+        with self.assertNumQueries(4):
+            response = self.client.get(url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def _create_namespaces(self, count, groups):
+        for i in range(count):
+            namespace = self._create_namespace(f'namespace_{i}', groups)
+            namespace.set_links([{'name': 'Homepage', 'url': f'https://example.com/{i}'},
+                                 {'name': 'Issues', 'url': f'https://example.com/{i}/issues'}])
+
+    def _count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries.captured_queries)
+
+    def test_list_queries_independent_of_page_size(self):
+        groups = [self._create_group('rh-identity', name, users=self.user)
+                  for name in ('first', 'second')]
+        self._create_namespaces(5, groups)
+        url = reverse('api:ui:namespaces-list')
+
+        # count and page
+        self.assertEqual(self._count_queries(url, limit=1), 2)
+        self.assertEqual(self._count_queries(url, limit=5), 2)
+
+    def test_my_namespaces_list_queries_independent_of_page_size(self):
+        groups = [self._create_group('rh-identity', name, users=self.user)
+                  for name in ('first', 'second')]
+        self._create_namespaces(5, groups)
+        url = reverse('api:ui:my-namespaces-list')
+
+        # user groups, owned namespaces, count and page
+        self.assertEqual(self._count_queries(url, limit=1), 4)
+        self.assertEqual(self._count_queries(url, limit=5), 4)
+
+    def test_retrieve_queries_independent_of_related_objects(self):
+        groups = [self._create_group('rh-identity', name, users=self.user)
+                  for name in ('first', 'second', 'third')]
+        self._create_namespaces(1, groups[:1])
+        self._create_namespace('namespace_many', groups).set_links(
+            [{'name': f'Link {i}', 'url': f'https://example.com/{i}'} for i in range(5)])
+
+        for name in ('namespace_0', 'namespace_many'):
+            url = reverse('api:ui:namespaces-detail', kwargs={'name': name})
+            # namespace, user groups, links and groups
+            self.assertEqual(self._count_queries(url), 4)
+
     # TODO: test get detail, put/update detail, put/update detail for partner-engineers, etc
 
 
@@ -216,6 +273,20 @@ class TestUiMyNamespaceViewSet(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['data'][0]['name'], 'some_namespace')
 
+    def test_list_namespace_owned_by_several_user_groups(self):
+        url = reverse('api:ui:my-namespaces-list')
+        groups = [self._create_group('rh-identity', name, users=self.user)
+                  for name in ('first', 'second')]
+        self._create_namespace('some_namespace', groups)
+
+        response = self.client.get(url, format='json')
+
+        # Listed once, although the user is in both owner groups
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['meta']['count'], 1)
+        self.assertEqual([ns_data['name'] for ns_data in response.data['data']],
+                         ['some_namespace'])
+
     def test_list_user_in_namespace_system_admin(self):
         url = reverse('api:ui:namespaces-list')
 
@@ -1,12 +1,33 @@
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
 from unittest import mock
 
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
 from rest_framework.test import APIClient
 import galaxy_pulp
+import requests
+import urllib3
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import ProtocolError
 
+from galaxy_api.api import admission, artifacts, imports, models
 from galaxy_api.auth import models as auth_models
 from galaxy_api import constants
 
 from .base import BaseTestCase, API_PREFIX
+from .collection_artifact import build_collection_artifact
 from .x_rh_identity import user_x_rh_identity
 
 import logging
@@ -45,6 +66,36 @@ class TestCollectionViewSet(BaseTestCase):
             prefix=API_PREFIX, limit=10, offset=20
         )
 
+    @override_settings(PULP_API_PASSTHROUGH=True)
+    def test_list_passthrough(self):
+        results = [{'namespace': 'ansible', 'name': 'nginx'}]
+        self.collection_api.list.return_value = mock.Mock(
+            data=json.dumps({'count': 11, 'results': results}).encode())
+
+        response = self.client.get(f"/{API_PREFIX}/v3/collections/")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['meta'] == {'count': 11}
+        assert data['data'] == results
+        assert data['links']['next'] == f"/{API_PREFIX}/v3/collections/?limit=10&offset=10"
+        self.collection_api.list.assert_called_once_with(
+            prefix=API_PREFIX, offset=0, limit=10, _preload_content=False
+        )
+
+    @override_settings(PULP_API_PASSTHROUGH=True)
+    def test_retrieve_passthrough(self):
+        content = b'{"namespace":"ansible","name":"nginx"}'
+        self.collection_api.get.return_value = mock.Mock(data=content)
+
+        response = self.client.get(f"/{API_PREFIX}/v3/collections/ansible/nginx/")
+
+        assert response.status_code == 200
+        assert response.content == content
+        self.collection_api.get.assert_called_once_with(
+            prefix=API_PREFIX, namespace="ansible", name="nginx", _preload_content=False
+        )
+
     def test_retrieve(self):
         self.collection_api.get.return_value = {}
         response = self.client.get(f"/{API_PREFIX}/v3/collections/ansible/nginx/")
@@ -54,6 +105,33 @@ class TestCollectionViewSet(BaseTestCase):
             prefix=API_PREFIX, namespace="ansible", name="nginx"
         )
 
+    def test_retrieve_cached(self):
+        self.collection_api.get.return_value = {'name': 'nginx'}
+        for _ in range(2):
+            response = self.client.get(f"/{API_PREFIX}/v3/collections/ansible/nginx/")
+            assert response.status_code == 200
+            assert response.data == {'name': 'nginx'}
+
+        self.collection_api.get.assert_called_once_with(
+            prefix=API_PREFIX, namespace="ansible", name="nginx"
+        )
+
+    def test_update_invalidates_cache(self):
+        partner_group = self._create_group('system', 'partner-engineers', users=self.user)
+        self._create_namespace('ansible', partner_group)
+        self.collection_api.get.return_value = {}
+        self.collection_api.put.return_value = \
+            galaxy_pulp.models.Collection(namespace='ansible', name='nginx', deprecated=True)
+
+        url = f"/{API_PREFIX}/v3/collections/ansible/nginx/"
+        self.client.get(url)
+        response = self.client.put(url, data={'namespace': 'ansible', 'name': 'nginx'},
+                                   format='json')
+        assert response.status_code == 200
+        self.client.get(url)
+
+        assert self.collection_api.get.call_count == 2
+
     def test_update_for_namespace(self):
         username = 'some_namespace_member'
         some_namespace_member = auth_models.User.objects.create(username=username)
@@ -81,6 +159,20 @@ class TestCollectionViewSet(BaseTestCase):
 
         assert response.status_code == 200
 
+    def test_update_loads_user_groups_once(self):
+        namespace_group = self._create_group('rh-identity', 'test', users=self.user)
+        self._create_namespace('test', namespace_group)
+        self.collection_api.put.return_value = \
+            galaxy_pulp.models.Collection(namespace='test', name='nginx', deprecated=False)
+
+        # namespace, user groups and owned namespaces
+        with self.assertNumQueries(3):
+            response = self.client.put(f"/{API_PREFIX}/v3/collections/test/nginx/",
+                                       data={'namespace': 'test', 'name': 'nginx'},
+                                       format='json')
+
+        assert response.status_code == 200
+
     def test_update_for_partner(self):
         partner_group = self._create_group('system', 'partner-engineers', users=self.user)
         namespace = self._create_namespace('test', partner_group)
@@ -189,6 +281,26 @@ class TestCollectionVersionViewSet(BaseTestCase):
             certification=constants.CertificationStatus.CERTIFIED.value
         )
 
+    @override_settings(PULP_API_PASSTHROUGH=True)
+    def test_list_passthrough(self):
+        self.versions_api.list.return_value = mock.Mock(
+            data=b'{"count": 1, "results": [{"version": "1.2.3"}]}')
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/collections/ansible/nginx/versions/"
+        )
+
+        assert response.status_code == 200
+        assert response.json()['data'] == [{'version': '1.2.3'}]
+
+    @override_settings(PULP_API_PASSTHROUGH=True)
+    def test_list_passthrough_empty(self):
+        self.versions_api.list.return_value = mock.Mock(data=b'{"count": 0, "results": []}')
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/collections/ansible/nginx/versions/"
+        )
+
+        assert response.status_code == 404
+
     def test_list_limit_offset(self):
         self.versions_api.list.return_value = galaxy_pulp.ResultsPage(
             count=1, results=[{}]
@@ -254,6 +366,127 @@ class TestCollectionImportViewSet(BaseTestCase):
         self.imports_api = patcher.start().return_value
         self.addCleanup(patcher.stop)
 
+    def _create_import(self, **kwargs):
+        return models.CollectionImport.objects.create(
+            task_id='3e26b82c-702f-4bdd-a568-7d9db17759c1',
+            pulp_task_id='3e26b82c-702f-4bdd-a568-7d9db17759c1',
+            created_at=timezone.now(),
+            namespace=self._create_namespace('ansible', groups=[]),
+            name='nginx',
+            version='1.2.3',
+            **kwargs
+        )
+
+    @override_settings(IMPORT_TASK_POLL_INTERVAL=0.01)
+    def test_retrieve_wait_state_change(self):
+        self._create_import(state='running')
+        self.imports_api.get.side_effect = [
+            galaxy_pulp.CollectionImport(state='running', messages=[]),
+            galaxy_pulp.CollectionImport(state='running', messages=[]),
+            galaxy_pulp.CollectionImport(state='completed', messages=[]),
+        ]
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/imports/collections/3e26b82c-702f-4bdd-a568-7d9db17759c1/",
+            data={'wait': 5, 'since_state': 'running'},
+        )
+
+        assert response.status_code == 200
+        assert response.data['state'] == 'completed'
+        assert self.imports_api.get.call_count == 3
+
+    @override_settings(IMPORT_TASK_POLL_INTERVAL=0.01)
+    def test_retrieve_wait_messages_change(self):
+        self._create_import(state='running')
+        self.imports_api.get.side_effect = [
+            galaxy_pulp.CollectionImport(state='running', messages=[{}]),
+            galaxy_pulp.CollectionImport(state='running', messages=[{}, {}]),
+        ]
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/imports/collections/3e26b82c-702f-4bdd-a568-7d9db17759c1/",
+            data={'wait': 5},
+        )
+
+        assert response.status_code == 200
+        assert len(response.data['messages']) == 2
+
+    def test_retrieve_wait_finished(self):
+        self._create_import(state='failed')
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/imports/collections/3e26b82c-702f-4bdd-a568-7d9db17759c1/",
+            data={'wait': 5, 'since_state': 'running'},
+        )
+
+        assert response.status_code == 200
+        assert response.data['state'] == 'failed'
+        self.imports_api.get.assert_not_called()
+
+    @override_settings(IMPORT_TASK_MAX_WAITERS=1)
+    def test_retrieve_wait_waiters_limited(self):
+        self._create_import(state='running')
+        self.imports_api.get.return_value = galaxy_pulp.CollectionImport(
+            state='running', messages=[])
+
+        with imports.waiter_limit.slot() as admitted:
+            assert admitted
+            start = time.monotonic()
+            response = self.client.get(
+                f"/{API_PREFIX}/v3/imports/collections/3e26b82c-702f-4bdd-a568-7d9db17759c1/",
+                data={'wait': 5, 'since_state': 'running'},
+            )
+
+        # Answered at once
+        assert time.monotonic() - start < 1
+        assert response.status_code == 200
+        assert response.data['state'] == 'running'
+        assert self.imports_api.get.call_count == 1
+
+    def test_wait_polled_by_other_waiter(self):
+        task = self._create_import(state='running')
+        stale_task = models.CollectionImport.objects.select_related('namespace').get(pk=task.pk)
+        # Another waiter holds the poll lock and saved the new state
+        caches[settings.PULP_CACHE_ALIAS].add(f'imports:task:{task.pk}:lock', 0, 60)
+        models.CollectionImport.objects.filter(pk=task.pk).update(state='completed')
+
+        task_info = imports.wait_for_task_info(stale_task, timeout=5, since_state='completed')
+
+        assert task_info.state == 'completed'
+        self.imports_api.get.assert_not_called()
+
+    def test_wait_releases_poll_lock(self):
+        task = self._create_import(state='running')
+        self.imports_api.get.return_value = galaxy_pulp.CollectionImport(
+            state='completed', messages=[])
+
+        task_info = imports.wait_for_task_info(task, timeout=5, since_state='running')
+
+        assert task_info.state == 'completed'
+        assert caches[settings.PULP_CACHE_ALIAS].get(f'imports:task:{task.pk}:lock') is None
+
+    def test_retrieve_messages_since(self):
+        self._create_import(state='running')
+        self.imports_api.get.return_value = galaxy_pulp.CollectionImport(
+            state='running', messages=[{'message': 'first'}, {'message': 'second'}])
+
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/imports/collections/3e26b82c-702f-4bdd-a568-7d9db17759c1/",
+            data={'messages_since': 1},
+        )
+
+        assert response.status_code == 200
+        assert response.data['messages'] == [{'message': 'second'}]
+        assert response.data['next_messages_since'] == 2
+
+    def test_retrieve_wait_invalid(self):
+        response = self.client.get(
+            f"/{API_PREFIX}/v3/imports/collections/3e26b82c-702f-4bdd-a568-7d9db17759c1/",
+            data={'wait': 'forever'},
+        )
+
+        assert response.status_code == 400
+
     def test_retrieve(self):
         self.imports_api.get.return_value = galaxy_pulp.CollectionImport()
         response = self.client.get(
@@ -264,3 +497,699 @@ class TestCollectionImportViewSet(BaseTestCase):
         self.imports_api.get.assert_called_once_with(
             prefix=API_PREFIX, id="3e26b82c-702f-4bdd-a568-7d9db17759c1"
         )
+
+
+class BaseArtifactUploadTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        group = self._create_group('rh-identity', 'ansible', users=self.user)
+        self.namespace = self._create_namespace('ansible', group)
+
+        patcher = mock.patch('galaxy_api.common.pulp.get_client')
+        self.pulp_client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+        self.pulp_client.configuration.host = 'http://pulp-api:8000'
+        self.pulp_client.default_headers = {}
+        self.pulp_client.call_api.return_value = galaxy_pulp.CollectionImport(
+            id='3e26b82c-702f-4bdd-a568-7d9db17759c1',
+            created_at=timezone.now(),
+            state='waiting',
+            messages=[],
+        )
+        self.urlopen = self.pulp_client.rest_client.pool_manager.urlopen
+        self.urlopen.side_effect = self._urlopen
+        self.artifact = build_collection_artifact()
+        self.upload_response = mock.Mock(
+            status=202, data=b'{"task": "/tasks/3e26b82c/"}')
+
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings_override = override_settings(UPLOAD_SESSION_DIR=upload_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _urlopen(self, method, url, body, headers, **kwargs):
+        self.sent_body = b''.join(body)
+        return self.upload_response
+
+
+class TestCollectionArtifactUploadView(BaseArtifactUploadTestCase):
+    def _upload(self, content=None, **data):
+        artifact = SimpleUploadedFile('ansible-nginx-1.2.3.tar.gz', content or self.artifact)
+        return self.client.post(
+            f"/{API_PREFIX}/v3/artifacts/collections/",
+            data={'file': artifact, **data},
+            format='multipart',
+        )
+
+    def test_upload(self):
+        response = self._upload()
+
+        assert response.status_code == 202
+        assert response.data == {'task': '/tasks/3e26b82c/'}
+
+        task = models.CollectionImport.objects.get()
+        assert (task.namespace, task.name, task.version) == (self.namespace, 'nginx', '1.2.3')
+
+        (method, url), kwargs = self.urlopen.call_args
+        assert method == 'POST'
+        assert url == f'http://pulp-api:8000/{API_PREFIX}/v3/artifacts/collections/'
+        assert kwargs['retries'] is False
+        assert (kwargs['timeout'].connect_timeout, kwargs['timeout'].read_timeout) == (5, 300)
+
+        body = self.sent_body
+        assert int(kwargs['headers']['Content-Length']) == len(body)
+        assert self.artifact in body
+        assert b'name="expected_name"\r\n\r\nnginx\r\n' in body
+
+    def test_upload_pulp_error(self):
+        self.upload_response = mock.Mock(
+            status=400, reason='Bad Request', data=b'{"errors": []}',
+            getheaders=mock.Mock(return_value={'Content-Type': 'application/json'}))
+
+        response = self._upload()
+
+        assert response.status_code == 400
+        assert response.content == b'{"errors": []}'
+        assert not models.CollectionImport.objects.exists()
+
+    def test_upload_sha256_computed(self):
+        self._upload()
+
+        digest = hashlib.sha256(self.artifact).hexdigest()
+        assert f'name="sha256"\r\n\r\n{digest}\r\n'.encode() in self.sent_body
+
+    def test_upload_sha256_match(self):
+        digest = hashlib.sha256(self.artifact).hexdigest()
+        response = self._upload(sha256=digest.upper())
+
+        assert response.status_code == 202
+        assert f'name="sha256"\r\n\r\n{digest}\r\n'.encode() in self.sent_body
+
+    def test_upload_sha256_mismatch(self):
+        response = self._upload(sha256=hashlib.sha256(b'other').hexdigest())
+
+        assert response.status_code == 400
+        assert response.data['errors'][0]['source'] == {'parameter': 'sha256'}
+        self.urlopen.assert_not_called()
+
+    def test_upload_invalid_archive(self):
+        response = self._upload(content=b'artifact')
+
+        assert response.status_code == 400
+        assert response.data['errors'][0]['source'] == {'parameter': 'file'}
+        self.urlopen.assert_not_called()
+
+    def test_upload_manifest_mismatch(self):
+        response = self._upload(content=build_collection_artifact(version='1.0.0'))
+
+        assert response.status_code == 400
+        assert 'version' in response.data['errors'][0]['detail']
+        self.urlopen.assert_not_called()
+
+    def test_upload_duplicate(self):
+        models.CollectionArtifact.objects.create(
+            namespace=self.namespace, name='nginx', version='1.2.3',
+            sha256=hashlib.sha256(self.artifact).hexdigest())
+
+        response = self._upload()
+
+        assert response.status_code == 409
+        assert response.data['errors'][0]['code'] == 'duplicate_artifact'
+        self.urlopen.assert_not_called()
+
+    def test_upload_duplicate_not_inspected(self):
+        models.CollectionArtifact.objects.create(
+            namespace=self.namespace, name='nginx', version='1.2.3',
+            sha256=hashlib.sha256(self.artifact).hexdigest())
+
+        with mock.patch('galaxy_api.api.artifacts.inspect') as inspect:
+            response = self._upload()
+
+        assert response.status_code == 409
+        inspect.assert_not_called()
+
+    def test_upload_forbidden_not_inspected(self):
+        self.namespace.groups.clear()
+
+        with mock.patch('galaxy_api.api.artifacts.inspect') as inspect:
+            response = self._upload()
+
+        assert response.status_code == 403
+        inspect.assert_not_called()
+        self.urlopen.assert_not_called()
+
+    def test_upload_existing_version(self):
+        models.CollectionArtifact.objects.create(
+            namespace=self.namespace, name='nginx', version='1.2.3', sha256='a' * 64)
+
+        response = self._upload()
+
+        assert response.status_code == 409
+        assert response.data['errors'][0]['code'] == 'conflict'
+        self.urlopen.assert_not_called()
+
+    @override_settings(UPLOAD_MAX_IN_FLIGHT=1)
+    def test_upload_throttled(self):
+        with admission.upload_slot():
+            response = self._upload()
+
+        assert response.status_code == 429
+        assert response['Retry-After'] == '5'
+        assert response.data['errors'][0]['code'] == 'throttled'
+        self.urlopen.assert_not_called()
+
+        # The slot is released after the upload
+        assert self._upload().status_code == 202
+
+    @override_settings(UPLOAD_MAX_IN_FLIGHT_PER_NAMESPACE=1)
+    def test_upload_throttled_namespace(self):
+        with admission.upload_slot(self.namespace):
+            response = self._upload()
+
+        assert response.status_code == 429
+        assert 'namespace "ansible"' in response.data['errors'][0]['detail']
+        self.urlopen.assert_not_called()
+
+    @override_settings(COLLECTION_MAX_SIZE=10)
+    def test_upload_too_large(self):
+        response = self._upload()
+
+        assert response.status_code == 400
+        assert response.data['errors'][0]['source'] == {'parameter': 'file'}
+
+
+class TestUploadSessionViewSet(BaseArtifactUploadTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f"/{API_PREFIX}/v3/artifacts/collections/uploads/"
+
+    def _create_session(self, size=8, **data):
+        response = self.client.post(self.url, data={
+            'filename': 'ansible-nginx-1.2.3.tar.gz', 'size': size, **data})
+        assert response.status_code == 201
+        return response.data['id']
+
+    def _put(self, session_id, data, content_range):
+        return self.client.put(
+            f'{self.url}{session_id}/', data=data,
+            content_type='application/octet-stream', HTTP_CONTENT_RANGE=content_range,
+        )
+
+    def _commit(self, session_id):
+        return self.client.post(f'{self.url}{session_id}/commit/')
+
+    def test_upload(self):
+        size = len(self.artifact)
+        half = size // 2
+        session_id = self._create_session(size=size)
+
+        response = self._put(session_id, self.artifact[half:], f'bytes {half}-{size - 1}/{size}')
+        assert response.status_code == 200
+        assert response.data['ranges'] == [[half, size]]
+
+        response = self._put(session_id, self.artifact[:half], f'bytes 0-{half - 1}/*')
+        assert response.data['ranges'] == [[0, size]]
+        assert response.data['received'] == size
+
+        response = self._commit(session_id)
+        assert response.status_code == 202
+        assert response.data == {'task': '/tasks/3e26b82c/'}
+        assert self.artifact in self.sent_body
+
+        session = models.UploadSession.objects.get(pk=session_id)
+        assert session.state == 'committed'
+        assert session.task == models.CollectionImport.objects.get()
+
+        response = self._put(session_id, self.artifact[:half], f'bytes 0-{half - 1}/{size}')
+        assert response.status_code == 409
+
+    def test_resume(self):
+        session_id = self._create_session()
+        self._put(session_id, b'arti', 'bytes 0-3/8')
+
+        response = self.client.get(f'{self.url}{session_id}/')
+        assert response.status_code == 200
+        assert response.data['received'] == 4
+        assert response.data['ranges'] == [[0, 4]]
+
+    def test_commit_incomplete(self):
+        session_id = self._create_session()
+        self._put(session_id, b'arti', 'bytes 0-3/8')
+
+        response = self._commit(session_id)
+        assert response.status_code == 400
+        self.urlopen.assert_not_called()
+
+    def test_commit_sha256_mismatch(self):
+        size = len(self.artifact)
+        session_id = self._create_session(
+            size=size, sha256=hashlib.sha256(b'other').hexdigest())
+        self._put(session_id, self.artifact, f'bytes 0-{size - 1}/{size}')
+
+        response = self._commit(session_id)
+        assert response.status_code == 400
+        self.urlopen.assert_not_called()
+
+        session = models.UploadSession.objects.get(pk=session_id)
+        assert (session.state, session.ranges) == ('open', [])
+
+    def test_commit_invalid_archive(self):
+        session_id = self._create_session()
+        self._put(session_id, b'artifact', 'bytes 0-7/8')
+
+        response = self._commit(session_id)
+        assert response.status_code == 400
+        assert response.data['errors'][0]['source'] == {'parameter': 'file'}
+        self.urlopen.assert_not_called()
+        assert models.UploadSession.objects.get(pk=session_id).state == 'open'
+
+    def test_put_invalid_range(self):
+        session_id = self._create_session()
+
+        for content_range in ('', 'bytes 0-3/9', 'bytes 6-9/8', 'bytes 4-3/8'):
+            response = self._put(session_id, b'arti', content_range)
+            assert response.status_code == 400, content_range
+
+        response = self._put(session_id, b'art', 'bytes 0-3/8')
+        assert response.status_code == 400
+
+    def test_create_forbidden(self):
+        self._create_namespace('community', groups=[])
+
+        response = self.client.post(self.url, data={
+            'filename': 'community-nginx-1.2.3.tar.gz', 'size': 8})
+        assert response.status_code == 403
+
+    @override_settings(UPLOAD_MAX_IN_FLIGHT_PER_NAMESPACE=1)
+    def test_put_throttled(self):
+        session_id = self._create_session()
+
+        with admission.upload_slot(self.namespace):
+            response = self._put(session_id, b'arti', 'bytes 0-3/8')
+        assert response.status_code == 429
+
+        response = self._put(session_id, b'arti', 'bytes 0-3/8')
+        assert response.status_code == 200
+
+    def test_create_existing_version(self):
+        models.CollectionArtifact.objects.create(
+            namespace=self.namespace, name='nginx', version='1.2.3', sha256='a' * 64)
+
+        response = self.client.post(self.url, data={
+            'filename': 'ansible-nginx-1.2.3.tar.gz', 'size': 8})
+        assert response.status_code == 409
+        assert not models.UploadSession.objects.exists()
+
+    def test_destroy(self):
+        session_id = self._create_session()
+        path = models.UploadSession.objects.get(pk=session_id).path
+
+        response = self.client.delete(f'{self.url}{session_id}/')
+        assert response.status_code == 204
+        assert not models.UploadSession.objects.exists()
+        assert not os.path.exists(path)
+
+
+@override_settings(COLLECTION_PUBLISH_ASYNC=True)
+class TestAsyncPublish(BaseArtifactUploadTestCase):
+    def _upload(self):
+        artifact = SimpleUploadedFile('ansible-nginx-1.2.3.tar.gz', self.artifact)
+        response = self.client.post(
+            f"/{API_PREFIX}/v3/artifacts/collections/",
+            data={'file': artifact},
+            format='multipart',
+        )
+        assert response.status_code == 202
+        return response
+
+    def test_upload_queued(self):
+        response = self._upload()
+
+        task = models.CollectionImport.objects.get()
+        assert task.state == 'queued'
+        assert task.pulp_task_id is None
+        assert response.data == {'task': task.get_absolute_url()}
+        self.urlopen.assert_not_called()
+
+        response = self.client.get(task.get_absolute_url())
+        assert response.status_code == 200
+        assert response.data['state'] == 'queued'
+
+    def test_publish(self):
+        self._upload()
+
+        call_command('publish_collection_imports')
+
+        assert self.artifact in self.sent_body
+        task = models.CollectionImport.objects.get()
+        assert str(task.pulp_task_id) == '3e26b82c-702f-4bdd-a568-7d9db17759c1'
+        assert task.state == 'waiting'
+
+        session = models.UploadSession.objects.get()
+        assert session.state == 'committed'
+        assert not os.path.exists(session.path)
+
+    def test_publish_claims_session(self):
+        self._upload()
+
+        sessions = artifacts._claim_queued(4)
+
+        # Claimed before the upload, so that other workers skip it
+        session = models.UploadSession.objects.get()
+        assert [s.pk for s in sessions] == [session.pk]
+        assert session.state == 'publishing'
+        assert session.retry_at > timezone.now()
+        assert artifacts._claim_queued(4) == []
+
+    def test_publish_claimed_skipped(self):
+        self._upload()
+        models.UploadSession.objects.update(
+            state='publishing', retry_at=timezone.now() + datetime.timedelta(minutes=1))
+
+        call_command('publish_collection_imports')
+
+        self.urlopen.assert_not_called()
+        assert models.UploadSession.objects.get().state == 'publishing'
+
+    def test_publish_claim_expired(self):
+        self._upload()
+        models.UploadSession.objects.update(
+            state='publishing', retry_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        call_command('publish_collection_imports')
+
+        assert self.artifact in self.sent_body
+        assert models.UploadSession.objects.get().state == 'committed'
+
+    def test_publish_retry(self):
+        self._upload()
+        self.urlopen.side_effect = ProtocolError('Connection aborted.')
+
+        call_command('publish_collection_imports')
+
+        session = models.UploadSession.objects.get()
+        assert (session.state, session.attempts) == ('queued', 1)
+        assert session.retry_at > timezone.now()
+        assert session.task.state == 'queued'
+
+        # Not retried before retry_at
+        call_command('publish_collection_imports')
+        assert self.urlopen.call_count == 1
+
+    def test_publish_task_fetch_retry(self):
+        self._upload()
+        task_detail = self.pulp_client.call_api.return_value
+        self.pulp_client.call_api.side_effect = ProtocolError('Connection aborted.')
+
+        call_command('publish_collection_imports')
+
+        session = models.UploadSession.objects.get()
+        assert (session.state, session.attempts) == ('queued', 1)
+        assert session.task_href == '/tasks/3e26b82c/'
+
+        # Retried without uploading the artifact again
+        models.UploadSession.objects.update(retry_at=None)
+        self.pulp_client.call_api.side_effect = None
+        self.pulp_client.call_api.return_value = task_detail
+        call_command('publish_collection_imports')
+
+        assert self.urlopen.call_count == 1
+        self.pulp_client.call_api.assert_called_with(
+            '/tasks/3e26b82c/', 'GET', auth_settings=mock.ANY, response_type='CollectionImport',
+            _return_http_data_only=True)
+        assert models.UploadSession.objects.get().state == 'committed'
+        assert models.CollectionImport.objects.get().state == 'waiting'
+
+    @override_settings(COLLECTION_PUBLISH_MAX_ATTEMPTS=1)
+    def test_publish_failed(self):
+        self._upload()
+        self.urlopen.side_effect = ProtocolError('Connection aborted.')
+
+        call_command('publish_collection_imports')
+
+        task = models.CollectionImport.objects.get()
+        assert task.state == 'failed'
+        assert task.error['code'] == 'publish_failed'
+        assert models.UploadSession.objects.get().state == 'committed'
+
+    def test_publish_rejected(self):
+        self._upload()
+        self.upload_response = mock.Mock(
+            status=400, reason='Bad Request', data=b'{"errors": []}',
+            getheaders=mock.Mock(return_value={'Content-Type': 'application/json'}))
+
+        call_command('publish_collection_imports')
+
+        task = models.CollectionImport.objects.get()
+        assert task.state == 'failed'
+        assert task.error == {'code': 'publish_failed', 'description': '{"errors": []}'}
+
+    def test_commit_session_queued(self):
+        url = f"/{API_PREFIX}/v3/artifacts/collections/uploads/"
+        size = len(self.artifact)
+        session_id = self.client.post(url, data={
+            'filename': 'ansible-nginx-1.2.3.tar.gz', 'size': size}).data['id']
+        self.client.put(
+            f'{url}{session_id}/', data=self.artifact, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 0-{size - 1}/{size}',
+        )
+
+        response = self.client.post(f'{url}{session_id}/commit/')
+
+        assert response.status_code == 202
+        session = models.UploadSession.objects.get()
+        assert session.state == 'queued'
+        assert response.data == {'task': session.task.get_absolute_url()}
+        self.urlopen.assert_not_called()
+
+
+@override_settings(DOWNLOAD_COUNT_FLUSH_INTERVAL=0)
+class TestCollectionArtifactDownloadView(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.namespace = self._create_namespace('ansible', groups=[])
+        self.url = f"/{API_PREFIX}/v3/artifacts/collections/ansible-nginx-1.2.3.tar.gz"
+
+        patcher = mock.patch('galaxy_api.common.pulp.get_content_session')
+        self.session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def _content_response(self, status_code, **headers):
+        response = mock.Mock(status_code=status_code, headers=CaseInsensitiveDict(headers))
+        response.raw.stream.return_value = iter([b'arti', b'fact'])
+        self.session.request.return_value = response
+        return response
+
+    @override_settings(PULP_CONTENT_CHUNK_SIZE=4, PULP_CONTENT_READ_TIMEOUT=30)
+    def test_download(self):
+        content_response = self._content_response(200, **{'Content-Type': 'application/gzip'})
+
+        response = self.client.get(self.url)
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/gzip'
+        assert b''.join(response.streaming_content) == b'artifact'
+        content_response.raw.stream.assert_called_once_with(4, decode_content=False)
+        content_response.close.assert_called_once_with()
+
+        (method, url), kwargs = self.session.request.call_args
+        assert method == 'GET'
+        assert url.endswith('/automation-hub/ansible-nginx-1.2.3.tar.gz')
+        assert kwargs['timeout'] == (5, 30)
+
+    def test_download_encoded(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        body = gzip.compress(b'artifact')
+        headers = {
+            'Content-Type': 'application/gzip',
+            'Content-Encoding': 'gzip',
+            'Content-Length': str(len(body)),
+        }
+        content_response = requests.Response()
+        content_response.status_code = 200
+        content_response.headers = CaseInsensitiveDict(headers)
+        content_response.raw = urllib3.HTTPResponse(
+            body=io.BytesIO(body), headers=headers, status=200, preload_content=False)
+        self.session.request.return_value = content_response
+
+        with override_settings(ARTIFACT_CACHE_DIR=cache_dir):
+            response = self.client.get(self.url)
+
+            # Body matches the forwarded headers
+            assert response.status_code == 200
+            assert response['Content-Encoding'] == 'gzip'
+            assert response['Content-Length'] == str(len(body))
+            assert b''.join(response.streaming_content) == body
+            assert os.listdir(cache_dir) == []
+
+    def test_download_counted(self):
+        for _ in range(2):
+            self._content_response(200, **{'Content-Type': 'application/gzip'})
+            response = self.client.get(self.url)
+            b''.join(response.streaming_content)
+
+        self._content_response(206, **{'Content-Type': 'application/gzip'})
+        self.client.get(self.url, HTTP_RANGE='bytes=4-')
+
+        download_count = models.CollectionDownloadCount.objects.get()
+        assert (download_count.namespace, download_count.name, download_count.version) == \
+            (self.namespace, 'nginx', '1.2.3')
+        assert download_count.count == 2
+
+    def test_download_aborted_not_counted(self):
+        self._content_response(200, **{'Content-Type': 'application/gzip'})
+
+        response = self.client.get(self.url)
+        next(iter(response.streaming_content))
+
+        assert not models.CollectionDownloadCount.objects.exists()
+
+    def test_download_range(self):
+        self._content_response(206, **{
+            'Content-Type': 'application/gzip',
+            'Content-Length': '4',
+            'Content-Range': 'bytes 4-7/8',
+            'Accept-Ranges': 'bytes',
+            'ETag': '"abc"',
+            'Server': 'content-app',
+        })
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=4-', HTTP_IF_RANGE='"abc"')
+
+        assert response.status_code == 206
+        assert response['Content-Length'] == '4'
+        assert response['Content-Range'] == 'bytes 4-7/8'
+        assert response['Accept-Ranges'] == 'bytes'
+        assert response['ETag'] == '"abc"'
+        assert not response.has_header('Server')
+
+        _, kwargs = self.session.request.call_args
+        assert kwargs['headers'] == {'Range': 'bytes=4-', 'If-Range': '"abc"'}
+
+    def test_download_not_modified(self):
+        content_response = self._content_response(
+            304, ETag='"abc"', **{'Last-Modified': 'Tue, 05 Nov 2019 10:14:45 GMT'})
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"abc"')
+
+        assert response.status_code == 304
+        assert response['ETag'] == '"abc"'
+        assert response['Last-Modified'] == 'Tue, 05 Nov 2019 10:14:45 GMT'
+        content_response.raw.stream.assert_not_called()
+
+        _, kwargs = self.session.request.call_args
+        assert kwargs['headers'] == {'If-None-Match': '"abc"'}
+
+    def test_download_without_content_type(self):
+        self._content_response(200, **{'Content-Length': '8'})
+
+        response = self.client.get(self.url)
+
+        assert response.status_code == 200
+        assert b''.join(response.streaming_content) == b'artifact'
+
+    def test_download_range_not_satisfiable(self):
+        self._content_response(416, **{'Content-Range': 'bytes */8'})
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+
+        assert response.status_code == 416
+        assert response['Content-Range'] == 'bytes */8'
+
+    def test_head(self):
+        content_response = self._content_response(200, **{
+            'Content-Type': 'application/gzip', 'Content-Length': '8', 'Accept-Ranges': 'bytes'})
+
+        response = self.client.head(self.url)
+
+        assert response.status_code == 200
+        assert response['Content-Length'] == '8'
+        assert response['Accept-Ranges'] == 'bytes'
+        assert self.session.request.call_args[0][0] == 'HEAD'
+        content_response.raw.stream.assert_not_called()
+
+    def test_download_cached(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+
+        with override_settings(ARTIFACT_CACHE_DIR=cache_dir):
+            self._content_response(200, **{
+                'Content-Type': 'application/gzip', 'Content-Length': '8',
+                'Accept-Ranges': 'bytes', 'ETag': '"abc"',
+                'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+            response = self.client.get(self.url)
+            assert b''.join(response.streaming_content) == b'artifact'
+
+            # Range requests are not served from cache
+            self._content_response(206, **{'Content-Type': 'application/gzip'})
+            response = self.client.get(self.url, HTTP_RANGE='bytes=4-')
+            assert response.status_code == 206
+
+            self.session.request.reset_mock()
+            response = self.client.get(self.url)
+
+            assert response.status_code == 200
+            assert response['Content-Type'] == 'application/gzip'
+            assert response['Content-Length'] == '8'
+            # Validators of the cached artifact
+            assert response['Accept-Ranges'] == 'bytes'
+            assert response['ETag'] == '"abc"'
+            assert response['Last-Modified'] == 'Wed, 21 Oct 2015 07:28:00 GMT'
+            assert b''.join(response.streaming_content) == b'artifact'
+            self.session.request.assert_not_called()
+
+    @override_settings(ARTIFACT_DOWNLOAD_MODE='accel-redirect',
+                       ARTIFACT_DOWNLOAD_ACCEL_REDIRECT_LOCATION='/_pulp_content/')
+    def test_download_accel_redirect(self):
+        response = self.client.get(self.url)
+
+        assert response.status_code == 200
+        assert response['X-Accel-Redirect'] == '/_pulp_content/ansible-nginx-1.2.3.tar.gz'
+        assert response['Content-Type'] == 'application/gzip'
+        assert response.content == b''
+        self.session.request.assert_not_called()
+
+    @override_settings(ARTIFACT_DOWNLOAD_MODE='sendfile')
+    def test_download_sendfile(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+
+        with override_settings(ARTIFACT_CACHE_DIR=cache_dir):
+            # Artifacts missing in cache are proxied
+            self._content_response(200, **{'Content-Type': 'application/gzip'})
+            response = self.client.get(self.url)
+            assert b''.join(response.streaming_content) == b'artifact'
+            assert not response.has_header('X-Sendfile')
+
+            self.session.request.reset_mock()
+            response = self.client.get(self.url)
+
+            assert response.status_code == 200
+            path = response['X-Sendfile']
+            assert os.path.dirname(path) == cache_dir
+            with open(path, 'rb') as fp:
+                assert fp.read() == b'artifact'
+            self.session.request.assert_not_called()
+
+    def test_download_not_found(self):
+        self._content_response(404)
+
+        response = self.client.get(self.url)
+        assert response.status_code == 404
+
+    def test_download_redirect(self):
+        self._content_response(302, Location='http://storage/artifact')
+
+        response = self.client.get(self.url)
+        assert response.status_code == 302
+        assert response['Location'] == 'http://storage/artifact'
+
+    def test_download_connection_error(self):
+        self.session.request.side_effect = requests.ConnectionError('Connection refused')
+
+        response = self.client.get(self.url)
+        assert response.status_code == 500
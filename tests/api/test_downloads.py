@@ -0,0 +1,50 @@
+from django.test import override_settings
+
+from galaxy_api.api import downloads, models
+
+from .base import BaseTestCase
+
+
+class TestDownloadCounts(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.namespace = self._create_namespace('ansible', groups=[])
+
+    def test_save_counts(self):
+        models.CollectionDownloadCount.objects.create(
+            namespace=self.namespace, name='nginx', version='1.0.0', count=5)
+
+        downloads.save_counts({
+            ('ansible', 'nginx', '1.0.0'): 2,
+            ('ansible', 'nginx', '2.0.0'): 3,
+            ('unknown', 'nginx', '1.0.0'): 1,
+        })
+
+        counts = models.CollectionDownloadCount.objects.order_by('version')
+        assert [(c.version, c.count) for c in counts] == [('1.0.0', 7), ('2.0.0', 3)]
+
+    def test_get_collection_counts(self):
+        for version, count in (('1.0.0', 2), ('2.0.0', 3)):
+            models.CollectionDownloadCount.objects.create(
+                namespace=self.namespace, name='nginx', version=version, count=count)
+
+        counts = downloads.get_collection_counts([('ansible', 'nginx'), ('ansible', 'apache')])
+        assert counts == {('ansible', 'nginx'): 5}
+
+    @override_settings(DOWNLOAD_COUNT_FLUSH_INTERVAL=0)
+    def test_counter_unbuffered(self):
+        counter = downloads.DownloadCounter()
+        counter.add('ansible', 'nginx', '1.0.0')
+
+        assert models.CollectionDownloadCount.objects.get().count == 1
+
+    @override_settings(DOWNLOAD_COUNT_FLUSH_INTERVAL=3600)
+    def test_counter_buffered(self):
+        counter = downloads.DownloadCounter()
+        for _ in range(3):
+            counter.add('ansible', 'nginx', '1.0.0')
+        assert not models.CollectionDownloadCount.objects.exists()
+
+        counter.flush()
+
+        assert models.CollectionDownloadCount.objects.get().count == 3
@@ -0,0 +1,120 @@
+import uuid
+from unittest import mock
+
+import galaxy_pulp
+from django.core.management import call_command
+from django.utils import timezone
+from urllib3.exceptions import ProtocolError
+
+from galaxy_api.api import imports, models
+
+from .base import BaseTestCase
+
+
+class TestSyncCollectionImports(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        namespace = self._create_namespace('ansible', groups=[])
+        self.running, self.completed = [
+            models.CollectionImport.objects.create(
+                task_id=task_id,
+                pulp_task_id=task_id,
+                created_at=timezone.now(),
+                namespace=namespace,
+                name='nginx',
+                version='1.0.0',
+                state=state,
+            ) for state, task_id in (('running', uuid.uuid4()), ('completed', uuid.uuid4()))
+        ]
+
+        patcher = mock.patch("galaxy_pulp.GalaxyImportsApi", spec=True)
+        self.imports_api = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_sync(self):
+        finished_at = timezone.now()
+        self.imports_api.get.return_value = galaxy_pulp.CollectionImport(
+            id=str(self.running.task_id), state='completed', finished_at=finished_at,
+        )
+
+        call_command('sync_collection_imports')
+
+        self.imports_api.get.assert_called_once_with(
+            prefix=mock.ANY, id=str(self.running.task_id))
+        self.running.refresh_from_db()
+        assert self.running.state == 'completed'
+        assert self.running.finished_at == finished_at
+
+    def test_sync_indexes_artifact(self):
+        self.running.sha256 = 'a' * 64
+        self.running.save()
+        self.imports_api.get.return_value = galaxy_pulp.CollectionImport(
+            id=str(self.running.task_id), state='completed', finished_at=timezone.now(),
+        )
+
+        call_command('sync_collection_imports')
+
+        artifact = models.CollectionArtifact.objects.get()
+        assert (artifact.name, artifact.version, artifact.sha256) == ('nginx', '1.0.0', 'a' * 64)
+        assert artifact.task == self.running
+
+    def test_sync_task_not_found(self):
+        self.imports_api.get.side_effect = galaxy_pulp.ApiException(status=404)
+
+        assert imports.sync_unfinished_tasks() == 1
+
+        self.running.refresh_from_db()
+        assert self.running.state == 'failed'
+        assert self.running.error['code'] == 'not_found'
+        assert self.running.finished_at is not None
+
+    def test_sync_connection_error(self):
+        self.imports_api.get.side_effect = ProtocolError('Connection aborted.')
+
+        assert imports.sync_unfinished_tasks() == 0
+
+        self.running.refresh_from_db()
+        assert self.running.state == 'running'
+
+
+class TestReconcileArtifactIndex(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.namespace = self._create_namespace('ansible', groups=[])
+        models.CollectionArtifact.objects.create(
+            namespace=self.namespace, name='nginx', version='1.0.0', sha256='a' * 64)
+        models.CollectionArtifact.objects.create(
+            namespace=self.namespace, name='nginx', version='0.1.0', sha256='b' * 64)
+
+        patcher = mock.patch("galaxy_pulp.PulpCollectionsApi", spec=True)
+        self.collections_api = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch("galaxy_pulp.GalaxyCollectionVersionsApi", spec=True)
+        self.versions_api = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_reconcile(self):
+        versions = [
+            {'namespace': 'ansible', 'name': 'nginx', 'version': '1.0.0'},
+            {'namespace': 'ansible', 'name': 'nginx', 'version': '2.0.0'},
+            {'namespace': 'unknown', 'name': 'nginx', 'version': '1.0.0'},
+        ]
+
+        def list_collections(offset, limit, **params):
+            return galaxy_pulp.ResultsPage(
+                count=len(versions), results=versions[offset:offset + limit])
+
+        self.collections_api.list.side_effect = list_collections
+        self.versions_api.get.return_value = {'artifact': {'sha256': 'c' * 64}}
+
+        call_command('reconcile_artifact_index', page_size=2)
+
+        assert self.collections_api.list.call_count == 2
+        self.versions_api.get.assert_called_once_with(
+            prefix=mock.ANY, namespace='ansible', name='nginx', version='2.0.0')
+        artifacts = models.CollectionArtifact.objects.order_by('version')
+        assert [(a.version, a.sha256) for a in artifacts] == [
+            ('1.0.0', 'a' * 64), ('2.0.0', 'c' * 64)]
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from galaxy_api.api import models, ownership
+from galaxy_api.auth import models as auth_models
+
+
+class TestOwnedNamespaces(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = auth_models.User.objects.create(username='test')
+        self.group = auth_models.Group.objects.create_identity('rh-identity', 'test')
+        self.group.user_set.add(self.user)
+        self.namespace = models.Namespace.objects.create(name='test')
+        self.namespace.groups.add(self.group)
+        self.other_namespace = models.Namespace.objects.create(name='other')
+        self.addCleanup(ownership.invalidate_users, [self.user.pk])
+
+    def _request(self):
+        request = self.factory.get('/')
+        request.user = self.user
+        return request
+
+    def test_loaded_once_per_request(self):
+        request = self._request()
+
+        with self.assertNumQueries(1):
+            assert ownership.get_owned_namespaces(request) == {self.namespace.pk}
+            assert ownership.get_owned_namespaces(request) == {self.namespace.pk}
+
+    def test_anonymous_user(self):
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+
+        with self.assertNumQueries(0):
+            assert ownership.get_owned_namespaces(request) == set()
+
+    @override_settings(NAMESPACE_OWNERSHIP_CACHE_TIMEOUT=60)
+    def test_cached_across_requests(self):
+        ownership.get_owned_namespaces(self._request())
+
+        with self.assertNumQueries(0):
+            assert ownership.get_owned_namespaces(self._request()) == {self.namespace.pk}
+
+    @override_settings(NAMESPACE_OWNERSHIP_CACHE_TIMEOUT=60)
+    def test_cache_invalidated_on_namespace_groups_change(self):
+        ownership.get_owned_namespaces(self._request())
+
+        self.other_namespace.groups.add(self.group)
+        assert ownership.get_owned_namespaces(self._request()) == {
+            self.namespace.pk, self.other_namespace.pk}
+
+        self.group.namespaces.remove(self.other_namespace)
+        assert ownership.get_owned_namespaces(self._request()) == {self.namespace.pk}
+
+        self.namespace.groups.clear()
+        assert ownership.get_owned_namespaces(self._request()) == set()
+
+    @override_settings(NAMESPACE_OWNERSHIP_CACHE_TIMEOUT=60)
+    def test_cache_invalidated_on_user_groups_change(self):
+        other_group = auth_models.Group.objects.create_identity('rh-identity', 'other')
+        self.other_namespace.groups.add(other_group)
+        ownership.get_owned_namespaces(self._request())
+
+        self.user.groups.add(other_group)
+        assert ownership.get_owned_namespaces(self._request()) == {
+            self.namespace.pk, self.other_namespace.pk}
+
+        self.group.user_set.clear()
+        assert ownership.get_owned_namespaces(self._request()) == {self.other_namespace.pk}
+
+        other_group.delete()
+        assert ownership.get_owned_namespaces(self._request()) == set()
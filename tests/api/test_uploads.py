@@ -0,0 +1,114 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from galaxy_api.api import models, uploads
+from galaxy_api.api.exceptions import Conflict
+
+from .base import BaseTestCase
+
+
+class TestUploadSession(BaseTestCase):
+    def test_add_range(self):
+        session = models.UploadSession(size=10)
+        for start, end in [(6, 8), (0, 2), (2, 4), (7, 9)]:
+            session.add_range(start, end)
+
+        assert session.ranges == [[0, 4], [6, 9]]
+        assert session.received == 7
+        assert not session.is_complete
+
+        session.add_range(3, 10)
+        assert session.is_complete
+
+
+class TestWriteChunk(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings_override = override_settings(UPLOAD_SESSION_DIR=upload_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        namespace = self._create_namespace('ansible', groups=[])
+        self.session = uploads.create_session(namespace, 'ansible-nginx-1.0.0.tar.gz', 8)
+
+    def test_write(self):
+        uploads.write_chunk(self.session, 4, io.BytesIO(b'fact'), 4)
+        session = uploads.write_chunk(self.session, 0, io.BytesIO(b'arti'), 4)
+
+        assert session.is_complete
+        with open(session.path, 'rb') as fp:
+            assert fp.read() == b'artifact'
+
+    def test_commit_while_receiving(self):
+        session = self.session
+
+        class Stream(io.BytesIO):
+            def read(self, size=-1):
+                # Committed while the chunk is being received
+                models.UploadSession.objects.filter(pk=session.pk).update(state='committing')
+                return super().read(size)
+
+        with pytest.raises(Conflict):
+            uploads.write_chunk(session, 0, Stream(b'arti'), 4)
+
+        # Spool file read by the commit is left untouched
+        assert os.path.getsize(session.path) == 0
+        assert models.UploadSession.objects.get().ranges == []
+
+
+class TestCleanupUploadSessions(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings_override = override_settings(UPLOAD_SESSION_DIR=upload_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        namespace = self._create_namespace('ansible', groups=[])
+        self.sessions = [
+            uploads.create_session(namespace, 'ansible-nginx-1.0.0.tar.gz', 8)
+            for _ in range(3)
+        ]
+
+    @override_settings(UPLOAD_SESSION_COMMIT_TIMEOUT=3 * 24 * 60 * 60)
+    def test_cleanup(self):
+        expired, committing, active = self.sessions
+        models.UploadSession.objects.filter(pk__in=[expired.pk, committing.pk]).update(
+            updated_at=timezone.now() - datetime.timedelta(days=2))
+        models.UploadSession.objects.filter(pk=committing.pk).update(state='committing')
+
+        call_command('cleanup_upload_sessions')
+
+        remaining = set(models.UploadSession.objects.values_list('pk', flat=True))
+        assert remaining == {committing.pk, active.pk}
+        assert not os.path.exists(expired.path)
+        assert os.path.exists(active.path)
+
+    @override_settings(UPLOAD_SESSION_COMMIT_TIMEOUT=60 * 60)
+    def test_cleanup_stale_commits(self):
+        expired, stale, committing = self.sessions
+        models.UploadSession.objects.update(state='committing')
+        models.UploadSession.objects.filter(pk=expired.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(days=2))
+        models.UploadSession.objects.filter(pk=stale.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(hours=2))
+
+        call_command('cleanup_upload_sessions')
+
+        states = dict(models.UploadSession.objects.values_list('pk', 'state'))
+        assert states == {stale.pk: 'open', committing.pk: 'committing'}
+        assert not os.path.exists(expired.path)
+        assert os.path.exists(stale.path)
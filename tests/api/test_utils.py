@@ -0,0 +1,66 @@
+import io
+import tracemalloc
+
+from django.test import SimpleTestCase
+
+from galaxy_api.api.utils import inspect_collection_artifact
+
+from .collection_artifact import build_collection_artifact
+
+FILENAME = 'ansible-nginx-1.2.3.tar.gz'
+LIMITS = {'max_files': 10, 'max_unpacked_size': 64 * 1024 * 1024}
+
+
+class TestInspectCollectionArtifact(SimpleTestCase):
+    def _inspect(self, content, filename=FILENAME, **limits):
+        return inspect_collection_artifact(io.BytesIO(content), filename, **dict(LIMITS, **limits))
+
+    def _assert_invalid(self, content, message, **limits):
+        with self.assertRaisesRegex(ValueError, message):
+            self._inspect(content, **limits)
+
+    def test_valid(self):
+        content = build_collection_artifact(files={'README.md': b'nginx'})
+        collection_info = self._inspect(content)
+        assert collection_info == {'namespace': 'ansible', 'name': 'nginx', 'version': '1.2.3'}
+
+    def test_not_archive(self):
+        self._assert_invalid(b'artifact', 'not a valid tar.gz archive')
+
+    def test_truncated_archive(self):
+        content = build_collection_artifact(files={'README.md': b'nginx' * 1000})
+        self._assert_invalid(content[:len(content) // 2], 'not a valid tar.gz archive')
+
+    def test_missing_manifest(self):
+        content = build_collection_artifact(manifest={})
+        self._assert_invalid(content, 'does not contain collection_info')
+
+    def test_manifest_mismatch(self):
+        for field, value in [('namespace', 'other'), ('name', 'apache'), ('version', '1.0.0')]:
+            content = build_collection_artifact(**{field: value})
+            self._assert_invalid(content, f"{field} '{value}' does not match")
+
+    def test_invalid_path(self):
+        for path in ['../README.md', '/etc/passwd', 'roles/../../README.md']:
+            content = build_collection_artifact(files={path: b'nginx'})
+            self._assert_invalid(content, 'invalid path')
+
+    def test_too_many_files(self):
+        content = build_collection_artifact(files={f'file{i}': b'' for i in range(10)})
+        self._assert_invalid(content, 'more than 10 files')
+
+    def test_unpacked_size(self):
+        content = build_collection_artifact(files={'README.md': b'\0' * 1024})
+        self._assert_invalid(content, 'unpacked size exceeds', max_unpacked_size=1024)
+
+    def test_peak_memory_bounded(self):
+        content = build_collection_artifact(files={'data.bin': b'\0' * (32 * 1024 * 1024)})
+
+        tracemalloc.start()
+        try:
+            self._inspect(content)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert peak < 2 * 1024 * 1024
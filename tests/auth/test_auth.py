@@ -0,0 +1,147 @@
+import base64
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from galaxy_api.auth import auth
+from galaxy_api.auth.models import Group, User
+
+
+def _identity_header(username='test', account='12345', **user):
+    header = {
+        'entitlements': {'insights': {'is_entitled': True}},
+        'identity': {
+            'account_number': account,
+            'user': {'username': username, 'email': f'{username}@example.invalid', **user},
+        },
+    }
+    return base64.b64encode(json.dumps(header).encode()).decode()
+
+
+class TestRHIdentityAuthentication(TestCase):
+    def setUp(self):
+        auth.identity_cache.clear()
+        self.addCleanup(auth.identity_cache.clear)
+        self.factory = APIRequestFactory()
+        self.authentication = auth.RHIdentityAuthentication()
+
+    def _authenticate(self, header):
+        request = self.factory.get('/', HTTP_X_RH_IDENTITY=header)
+        return self.authentication.authenticate(request)
+
+    def test_authenticate_new_user(self):
+        user, token = self._authenticate(_identity_header())
+
+        assert user.username == 'test'
+        assert user.email == 'test@example.invalid'
+        assert [group.name for group in user.groups.all()] == [
+            f'{auth.RH_ACCOUNT_SCOPE}:12345']
+        assert token['rh_identity']['identity']['account_number'] == '12345'
+
+    def test_authenticate_cached(self):
+        header = _identity_header()
+        user, _ = self._authenticate(header)
+
+        with self.assertNumQueries(1):
+            cached_user, token = self._authenticate(header)
+
+        assert cached_user == user
+        assert token['rh_identity']['identity']['user']['username'] == 'test'
+
+    def test_authenticate_unchanged_user_not_written(self):
+        self._authenticate(_identity_header())
+        auth.identity_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            self._authenticate(_identity_header())
+
+        assert all(query['sql'].startswith('SELECT') for query in queries.captured_queries)
+
+    def test_authenticate_changed_user(self):
+        self._authenticate(_identity_header())
+
+        user, _ = self._authenticate(_identity_header(first_name='Test'))
+
+        assert User.objects.get(pk=user.pk).first_name == 'Test'
+
+    def test_authenticate_deleted_user(self):
+        header = _identity_header()
+        user, _ = self._authenticate(header)
+        user.delete()
+
+        user, _ = self._authenticate(header)
+        assert User.objects.filter(pk=user.pk).exists()
+
+
+class TestIdentityCache(TestCase):
+    @override_settings(RH_IDENTITY_CACHE_SIZE=2)
+    def test_least_recently_used_evicted(self):
+        cache = auth.IdentityCache()
+        cache.set('a', {}, 1)
+        cache.set('b', {}, 2)
+        cache.get('a')
+        cache.set('c', {}, 3)
+
+        assert cache.get('a') == ({}, 1)
+        assert cache.get('b') is None
+        assert cache.get('c') == ({}, 3)
+
+    @override_settings(RH_IDENTITY_CACHE_TIMEOUT=60)
+    def test_expired(self):
+        cache = auth.IdentityCache()
+        with mock.patch('time.monotonic', return_value=100):
+            cache.set('a', {}, 1)
+        with mock.patch('time.monotonic', return_value=159):
+            assert cache.get('a') == ({}, 1)
+        with mock.patch('time.monotonic', return_value=160):
+            assert cache.get('a') is None
+
+
+class TestUserGroups(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create(username='test')
+        self.group = Group.objects.create(name='system:partner-engineers')
+        self.group.user_set.add(self.user)
+
+    def _request(self):
+        request = self.factory.get('/')
+        request.user = self.user
+        return request
+
+    def test_loaded_once_per_request(self):
+        request = self._request()
+
+        with self.assertNumQueries(1):
+            assert auth.get_user_groups(request) == {self.group.name: self.group.pk}
+            assert auth.get_user_groups(request) == {self.group.name: self.group.pk}
+
+        with self.assertNumQueries(1):
+            auth.get_user_groups(self._request())
+
+    @override_settings(USER_GROUPS_CACHE_TIMEOUT=60)
+    def test_cached_across_requests(self):
+        self.addCleanup(auth.invalidate_user_groups, [self.user.pk])
+        auth.get_user_groups(self._request())
+
+        with self.assertNumQueries(0):
+            assert auth.get_user_groups(self._request()) == {self.group.name: self.group.pk}
+
+    @override_settings(USER_GROUPS_CACHE_TIMEOUT=60)
+    def test_cache_invalidated_on_membership_change(self):
+        self.addCleanup(auth.invalidate_user_groups, [self.user.pk])
+        other_group = Group.objects.create(name='rh-identity-account:12345')
+        auth.get_user_groups(self._request())
+
+        self.user.groups.add(other_group)
+        assert set(auth.get_user_groups(self._request())) == {self.group.name, other_group.name}
+
+        other_group.user_set.remove(self.user)
+        assert set(auth.get_user_groups(self._request())) == {self.group.name}
+
+        self.group.user_set.clear()
+        assert auth.get_user_groups(self._request()) == {}
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from galaxy_api.common.artifact_cache import ArtifactCache
+
+
+class TestArtifactCache(SimpleTestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(ARTIFACT_CACHE_DIR=cache_dir,
+                                              ARTIFACT_CACHE_MAX_SIZE=16)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.cache_dir = cache_dir
+        self.cache = ArtifactCache()
+
+    def _store(self, filename, content, headers=None):
+        writer = self.cache.writer(filename, size=len(content), headers=headers)
+        writer.write(content)
+        writer.commit()
+
+    def _read(self, filename):
+        fp = self.cache.open(filename)
+        if fp is None:
+            return None
+        with fp:
+            return fp.read()
+
+    def test_store(self):
+        assert self.cache.open('ansible-nginx-1.2.3.tar.gz') is None
+
+        self._store('ansible-nginx-1.2.3.tar.gz', b'artifact')
+
+        assert self._read('ansible-nginx-1.2.3.tar.gz') == b'artifact'
+        assert len(os.listdir(self.cache_dir)) == 1
+
+    def test_store_headers(self):
+        writer = self.cache.writer('ansible-nginx-1.2.3.tar.gz', headers={'ETag': '"abc"'})
+        writer.write(b'artifact')
+        writer.commit()
+
+        assert self.cache.get_headers('ansible-nginx-1.2.3.tar.gz') == {'ETag': '"abc"'}
+        assert self.cache.get_headers('ansible-nginx-2.0.0.tar.gz') == {}
+
+    def test_incomplete_discarded(self):
+        writer = self.cache.writer('ansible-nginx-1.2.3.tar.gz', size=8)
+        writer.write(b'arti')
+        writer.commit()
+
+        writer = self.cache.writer('ansible-nginx-1.2.3.tar.gz')
+        writer.write(b'arti')
+        writer.discard()
+
+        assert self.cache.open('ansible-nginx-1.2.3.tar.gz') is None
+        assert os.listdir(self.cache_dir) == []
+
+    def test_too_large(self):
+        assert self.cache.writer('ansible-nginx-1.2.3.tar.gz', size=17) is None
+
+        writer = self.cache.writer('ansible-nginx-1.2.3.tar.gz')
+        writer.write(b'x' * 17)
+        writer.commit()
+        assert self.cache.open('ansible-nginx-1.2.3.tar.gz') is None
+
+    def test_evict_least_recently_used(self):
+        self._store('ansible-a-1.0.0.tar.gz', b'a' * 6)
+        self._store('ansible-b-1.0.0.tar.gz', b'b' * 6, headers={'ETag': '"b"'})
+        for i, filename in enumerate(('ansible-a-1.0.0.tar.gz', 'ansible-b-1.0.0.tar.gz')):
+            os.utime(self.cache._path(filename), (i, i))
+        # A hit makes the artifact most recently used
+        assert self._read('ansible-a-1.0.0.tar.gz') == b'a' * 6
+
+        self._store('ansible-c-1.0.0.tar.gz', b'c' * 6)
+
+        assert self._read('ansible-a-1.0.0.tar.gz') == b'a' * 6
+        assert self._read('ansible-b-1.0.0.tar.gz') is None
+        # Headers are evicted with the artifact
+        assert len(os.listdir(self.cache_dir)) == 2
+        assert self._read('ansible-c-1.0.0.tar.gz') == b'c' * 6
@@ -0,0 +1,83 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from galaxy_api.common.concurrency import SharedExecutor, SingleFlight
+
+
+class TestSingleFlight(SimpleTestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _slow_call(self, result=None, exception=None):
+        def func():
+            self.started.set()
+            self.release.wait(5)
+            if exception is not None:
+                raise exception
+            return result
+        return mock.Mock(side_effect=func)
+
+    def _call_concurrently(self, key, func, count):
+        outcomes = []
+
+        def worker():
+            try:
+                outcomes.append(self.single_flight.call(key, func))
+            except Exception as exc:
+                outcomes.append(exc)
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        self.started.wait(5)
+        followers = [threading.Thread(target=worker) for _ in range(count - 1)]
+        for thread in followers:
+            thread.start()
+        # Wait until all followers block on the in-flight call
+        done = self.single_flight._calls[key].done
+        deadline = time.monotonic() + 5
+        while len(done._cond._waiters) < count - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        return outcomes
+
+    def test_concurrent_calls_coalesced(self):
+        func = self._slow_call(result='result')
+        outcomes = self._call_concurrently('key', func, 3)
+
+        func.assert_called_once_with()
+        assert sorted(outcomes) == [('result', False), ('result', True), ('result', True)]
+
+    def test_exception_shared(self):
+        error = ValueError('error')
+        func = self._slow_call(exception=error)
+        outcomes = self._call_concurrently('key', func, 2)
+
+        func.assert_called_once_with()
+        assert outcomes == [error, error]
+
+    def test_sequential_calls_not_coalesced(self):
+        func = mock.Mock(return_value='result')
+        assert self.single_flight.call('key', func) == ('result', False)
+        assert self.single_flight.call('key', func) == ('result', False)
+        assert func.call_count == 2
+
+
+class TestSharedExecutor(SimpleTestCase):
+    def setUp(self):
+        self.executor = SharedExecutor(max_workers=2)
+
+    def test_submit(self):
+        assert self.executor.submit(sum, [1, 2]).result(5) == 3
+
+    def test_new_pool_after_fork(self):
+        pool = self.executor._get_executor()
+        assert self.executor._get_executor() is pool
+        with mock.patch('os.getpid', return_value=-1):
+            assert self.executor._get_executor() is not pool
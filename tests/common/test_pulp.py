@@ -0,0 +1,207 @@
+import tracemalloc
+from unittest import mock
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from galaxy_api.common import pulp
+
+
+class TestProcessLocal(SimpleTestCase):
+    def setUp(self):
+        self.factory = mock.Mock(side_effect=object)
+        self.close = mock.Mock()
+        self.holder = pulp.ProcessLocal(self.factory, self.close)
+
+    def test_object_is_shared(self):
+        obj = self.holder.get()
+        assert self.holder.get() is obj
+        self.factory.assert_called_once_with()
+        self.close.assert_not_called()
+
+    def test_new_object_after_fork(self):
+        obj = self.holder.get()
+        with mock.patch('os.getpid', return_value=-1):
+            assert self.holder.get() is not obj
+        # Connections of the parent process are left alone
+        self.close.assert_not_called()
+
+    @override_settings(PULP_API_POOL_IDLE_TIMEOUT=0)
+    def test_idle_connections_closed(self):
+        obj = self.holder.get()
+        assert self.holder.get() is obj
+        self.close.assert_called_once_with(obj)
+
+    def test_reset(self):
+        obj = self.holder.get()
+        self.holder.reset()
+        self.close.assert_called_once_with(obj)
+        assert self.holder.get() is not obj
+
+
+class TestClientManager(SimpleTestCase):
+    def setUp(self):
+        self.manager = pulp.ClientManager()
+        self.addCleanup(self.manager.reset)
+
+    def test_client_is_shared(self):
+        client = self.manager.get_client()
+        assert self.manager.get_client() is client
+
+    @override_settings(PULP_API_POOL_MAXSIZE=3)
+    def test_pool_settings(self):
+        client = self.manager.get_client()
+        pool = client.rest_client.pool_manager.connection_from_host('pulp-api', 8000)
+
+        assert isinstance(pool, pulp._HTTPConnectionPool)
+        assert pool.pool.maxsize == 3
+        assert pool.block
+
+    def test_new_client_after_fork(self):
+        client = self.manager.get_client()
+        with mock.patch('os.getpid', return_value=-1):
+            assert self.manager.get_client() is not client
+
+    @override_settings(PULP_API_POOL_IDLE_TIMEOUT=0)
+    def test_idle_connections_evicted(self):
+        client = self.manager.get_client()
+        with mock.patch.object(client.rest_client.pool_manager, 'clear') as clear:
+            assert self.manager.get_client() is client
+        clear.assert_called_once_with()
+
+
+class TestContentSessionManager(SimpleTestCase):
+    def setUp(self):
+        self.manager = pulp.ContentSessionManager()
+
+    def test_session_is_shared(self):
+        session = self.manager.get_session()
+        assert self.manager.get_session() is session
+
+    @override_settings(PULP_CONTENT_POOL_MAXSIZE=3)
+    def test_pool_settings(self):
+        adapter = self.manager.get_session().get_adapter('http://pulp-content-app:24816/')
+        assert adapter.poolmanager.connection_pool_kw['maxsize'] == 3
+        assert not adapter.poolmanager.connection_pool_kw['block']
+
+    def test_new_session_after_fork(self):
+        session = self.manager.get_session()
+        with mock.patch('os.getpid', return_value=-1):
+            assert self.manager.get_session() is not session
+
+
+class TestResponseCache(SimpleTestCase):
+    def setUp(self):
+        self.cache = pulp.ResponseCache()
+        self.cache.clear()
+        self.func = mock.Mock(side_effect=lambda **params: dict(params))
+
+    def test_get_or_call(self):
+        for _ in range(2):
+            assert self.cache.get_or_call(
+                'collections', self.func, namespace='ansible', name='nginx') == \
+                {'namespace': 'ansible', 'name': 'nginx'}
+        self.func.assert_called_once_with(namespace='ansible', name='nginx')
+
+    def test_key_depends_on_params(self):
+        self.cache.get_or_call('collections', self.func, limit=10, offset=0)
+        self.cache.get_or_call('collections', self.func, offset=0, limit=10)
+        self.cache.get_or_call('collections', self.func, limit=10, offset=10)
+        assert self.func.call_count == 2
+
+    @override_settings(PULP_CACHE_TIMEOUTS={})
+    def test_endpoint_not_cached(self):
+        self.cache.get_or_call('collections', self.func, limit=10)
+        self.cache.get_or_call('collections', self.func, limit=10)
+        assert self.func.call_count == 2
+
+    def test_invalidate(self):
+        calls = [
+            {'limit': 10},
+            {'namespace': 'ansible'},
+            {'namespace': 'ansible', 'name': 'nginx'},
+            {'namespace': 'ansible', 'name': 'apache'},
+            {'namespace': 'community', 'name': 'nginx'},
+        ]
+        for params in calls:
+            self.cache.get_or_call('collections', self.func, **params)
+
+        self.cache.invalidate('ansible', 'nginx')
+        self.func.reset_mock()
+        for params in calls:
+            self.cache.get_or_call('collections', self.func, **params)
+
+        assert self.func.call_args_list == [
+            mock.call(limit=10),
+            mock.call(namespace='ansible'),
+            mock.call(namespace='ansible', name='nginx'),
+        ]
+
+    def test_culled_generation_not_reused(self):
+        params = {'namespace': 'ansible', 'name': 'nginx'}
+        self.cache.get_or_call('collections', self.func, **params)
+        self.cache.invalidate('ansible', 'nginx')
+        self.cache.get_or_call('collections', self.func, **params)
+
+        # Generation tokens may be culled from a cache with limited size
+        self.cache.cache.delete(self.cache._generation_key('ansible', 'nginx'))
+        self.cache.get_or_call('collections', self.func, **params)
+
+        assert self.func.call_count == 3
+
+    @override_settings(PULP_CACHE_TIMEOUTS={})
+    def test_coalesced_response_copied(self):
+        response = {'results': [{'name': 'nginx'}]}
+        with mock.patch.object(self.cache._single_flight, 'call',
+                               return_value=(response, True)):
+            result = self.cache.get_or_call('collections', self.func, limit=10)
+
+        assert result == response
+        assert result['results'][0] is not response['results'][0]
+
+
+class TestMultipartBody(SimpleTestCase):
+    def _upload(self, content):
+        upload = TemporaryUploadedFile('ansible-nginx-1.2.3.tar.gz', 'application/gzip',
+                                       len(content), None)
+        upload.write(content)
+        self.addCleanup(upload.close)
+        return upload
+
+    def test_body(self):
+        upload = self._upload(b'artifact')
+        body = pulp.MultipartBody([
+            ('file', (upload.name, upload, 'application/gzip')),
+            ('sha256', 'abc'),
+        ])
+        data = b''.join(body)
+
+        assert len(data) == body.content_length
+        assert body.content_type == f'multipart/form-data; boundary={body.boundary}'
+        assert data == (
+            f'--{body.boundary}\r\n'
+            'Content-Disposition: form-data; name="file"; '
+            'filename="ansible-nginx-1.2.3.tar.gz"\r\n'
+            'Content-Type: application/gzip\r\n\r\n'
+            'artifact\r\n'
+            f'--{body.boundary}\r\n'
+            'Content-Disposition: form-data; name="sha256"\r\n\r\n'
+            'abc\r\n'
+            f'--{body.boundary}--\r\n'
+        ).encode()
+
+    def test_peak_memory_bounded(self):
+        size = 32 * 1024 * 1024
+        upload = self._upload(b'\0' * size)
+        body = pulp.MultipartBody(
+            [('file', (upload.name, upload, 'application/gzip'))], chunk_size=64 * 1024)
+
+        tracemalloc.start()
+        try:
+            sent = sum(len(chunk) for chunk in body)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert sent == body.content_length
+        assert peak < 2 * 1024 * 1024
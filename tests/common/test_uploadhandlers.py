@@ -0,0 +1,17 @@
+import hashlib
+
+from django.test import SimpleTestCase
+
+from galaxy_api.common.uploadhandlers import Sha256UploadHandler
+
+
+class TestSha256UploadHandler(SimpleTestCase):
+    def test_digest(self):
+        handler = Sha256UploadHandler()
+        handler.new_file('file', 'ansible-nginx-1.2.3.tar.gz', 'application/gzip', 12)
+
+        assert handler.receive_data_chunk(b'arti', 0) == b'arti'
+        assert handler.receive_data_chunk(b'fact', 4) == b'fact'
+        assert handler.file_complete(8) is None
+
+        assert handler.digests == {'file': hashlib.sha256(b'artifact').hexdigest()}